@@ -1,6 +1,21 @@
- # Placeholder script to keep the container running
-import time
+import asyncio
+import logging
+import os
+import sys
 
-print("Container is running. Waiting for updates...")
-while True:
-    time.sleep(10)
+# The agents.runtime and messaging packages live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from agents.runtime import AgentRuntime
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+logger = logging.getLogger("research_agent")
+
+
+async def handle_task(task: dict, runtime: AgentRuntime) -> None:
+    # Placeholder until the agent does real work on the task
+    logger.info("Received task %s: %s", task.get("task_id"), task.get("name"))
+
+
+if __name__ == "__main__":
+    asyncio.run(AgentRuntime("research_agent", handle_task, capabilities=["research"], metrics_port=8003).run())
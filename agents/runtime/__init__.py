@@ -0,0 +1,3 @@
+# Shared worker runtime for the agent containers
+from .config import AgentSettings
+from .runtime import AgentRuntime, TaskHandler
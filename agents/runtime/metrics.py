@@ -0,0 +1,14 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Initialize the Prometheus metrics (one agent per process, so no agent label)
+tasks_counter = Counter("agent_tasks", "Tasks handled by this agent", ["outcome"])  # completed | cached | failed | requeued
+tasks_in_flight_gauge = Gauge("agent_tasks_in_flight", "Tasks currently being executed")
+queue_depth_gauge = Gauge("agent_queue_depth", "Messages waiting in a consumed queue", ["queue"])
+task_duration_histogram = Histogram(
+    "agent_task_duration_seconds", "Time spent executing a task",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+task_wait_histogram = Histogram(
+    "agent_task_wait_seconds", "Time a delivered task waited for a free in-flight slot",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60),
+)
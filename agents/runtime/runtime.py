@@ -0,0 +1,256 @@
+import asyncio
+import functools
+import json
+import logging
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import httpx
+from prometheus_client import start_http_server
+
+from messaging import DEFAULT_TASK_QUEUE, Consumer, Requeue, agent_queue, get_broker, task_queue
+
+from .config import AgentSettings, settings as default_settings
+from .metrics import (queue_depth_gauge, task_duration_histogram, task_wait_histogram,
+                      tasks_counter, tasks_in_flight_gauge)
+
+logger = logging.getLogger(__name__)
+
+# Executes one task message; gets the runtime so it can offload CPU-bound work with run_cpu.
+# A JSON-serializable return value is cached and reused for identical tasks.
+TaskHandler = Callable[[dict, "AgentRuntime"], Awaitable[Any]]
+
+
+class AgentRuntime:
+    """
+    Runs an agent: consumes its own and its capability queues and executes tasks concurrently.
+
+    Tasks run as coroutines on the event loop, so I/O-bound work overlaps freely; CPU-bound
+    steps go to a process pool through `run_cpu`. At most `max_in_flight` tasks execute at
+    once. On SIGTERM or SIGINT the runtime stops consuming, waits up to `drain_timeout` for
+    running tasks to finish and then disconnects, so unfinished deliveries are redelivered.
+    Before running a task it claims its result from the Primary API's result cache, so identical
+    tasks reuse one result; while an identical task is still running elsewhere, the task is
+    requeued without counting an attempt. Task progress is reported through `PUT /tasks/{id}`:
+    IN_PROGRESS when it starts, COMPLETED when it is done and FAILED when it is dead-lettered.
+    It also heartbeats to the Primary API and serves Prometheus metrics. Without AGENT_ID the
+    agent's node is looked up by name, or registered, on startup.
+    """
+
+    def __init__(self, name: str, handler: TaskHandler, capabilities: Optional[Iterable[str]] = None,
+                 metrics_port: int = 8002, settings: Optional[AgentSettings] = None):
+        self.settings = settings or default_settings
+        self.name = name
+        # The id of the agent's node; without AGENT_ID it is resolved from the name when the runtime starts
+        self.agent_id = self.settings.agent_id
+        if self.settings.capabilities:
+            capabilities = self.settings.capabilities.split(",")
+        self.capabilities = [capability.strip() for capability in capabilities or [name] if capability.strip()]
+        self.queues: list[str] = []
+        self.metrics_port = self.settings.metrics_port or metrics_port
+        self.handler = handler
+
+        self.broker = get_broker(self.settings.broker_url)
+        self.consumer = Consumer(self.broker, self._execute, self.settings.prefetch,
+                                 self.settings.max_retries, self.settings.retry_delay, self._dead_lettered)
+        self.process_pool: Optional[ProcessPoolExecutor] = None
+        self.api = httpx.AsyncClient(base_url=self.settings.primary_api_url, timeout=5)
+        self.in_flight = 0
+        # Deliveries handed to this process, including those waiting for an in-flight slot
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self._slots = asyncio.Semaphore(self.settings.max_in_flight)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._stopping = asyncio.Event()
+
+    async def resolve_agent_id(self) -> str:
+        """
+        The id of this agent's node: AGENT_ID, else the first agent with this name, else the id of a
+        newly registered agent. The API allocates `<name>_<n>` ids, so the name is not the id.
+        """
+        if self.settings.agent_id:
+            return self.settings.agent_id
+        async with self.api.stream("GET", "/agents/", headers={"Accept": "application/x-ndjson"}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                agent = json.loads(line) if line.strip() else {}
+                if agent.get("name") == self.name:
+                    return agent["id"]
+        response = await self.api.post("/agents/", json={"name": self.name, "capabilities": self.capabilities})
+        response.raise_for_status()
+        logger.info("Registered agent %s as %s", self.name, response.json()["id"])
+        return response.json()["id"]
+
+    async def run_cpu(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Run a CPU-bound function in the process pool. It and its arguments must be picklable.
+        """
+        if self.process_pool is None:
+            self.process_pool = ProcessPoolExecutor(max_workers=self.settings.cpu_workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.process_pool, functools.partial(function, *args, **kwargs))
+
+    async def _execute(self, task: dict) -> None:
+        delivered = time.perf_counter()
+        self.pending += 1
+        self._idle.clear()
+        try:
+            async with self._slots:
+                started = time.perf_counter()
+                task_wait_histogram.observe(started - delivered)
+                self.in_flight += 1
+                tasks_in_flight_gauge.inc()
+                try:
+                    outcome = await self._run_task(task)
+                except Requeue:
+                    tasks_counter.labels(outcome="requeued").inc()
+                    raise
+                except Exception:
+                    self.failed += 1
+                    tasks_counter.labels(outcome="failed").inc()
+                    raise  # the Consumer retries or dead-letters the message
+                else:
+                    self.completed += 1
+                    tasks_counter.labels(outcome=outcome).inc()
+                finally:
+                    task_duration_histogram.observe(time.perf_counter() - started)
+                    tasks_in_flight_gauge.dec()
+                    self.in_flight -= 1
+        finally:
+            self.pending -= 1
+            if self.pending == 0:
+                self._idle.set()
+
+    async def _claim(self, task: dict) -> Optional[dict]:
+        try:
+            response = await self.api.post("/results/claim", json={
+                "task_id": task["task_id"], "agent_id": self.agent_id, "wait": self.settings.result_wait,
+            }, timeout=self.settings.result_wait + 5)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, KeyError) as e:
+            # The cache only saves work; without it the task simply runs
+            logger.warning("Result cache unavailable, executing task: %s", e)
+            return None
+
+    async def _report(self, task: dict, status: str) -> None:
+        """
+        Set the task's status on the Primary API, which buffers these updates (write-behind).
+
+        A task that is in progress or completed must have an assignee, so a task taken from a
+        shared queue without one becomes this agent's; that report is written directly, not buffered.
+        """
+        updates = {"status": status}
+        if not task.get("assignee"):
+            updates["assignee"] = self.agent_id
+        try:
+            response = await self.api.put(f"/tasks/{task['task_id']}", json={"updates": updates})
+            response.raise_for_status()
+        except (httpx.HTTPError, KeyError) as e:
+            # The task's outcome does not depend on it, so a failed report is only logged
+            logger.warning("Reporting %s for task %s failed: %s", status, task.get("task_id"), e)
+
+    async def _dead_lettered(self, task: dict, error: Exception) -> None:
+        await self._report(task, "FAILED")
+
+    async def _run_task(self, task: dict) -> str:
+        """
+        Execute a task through the Primary API's result cache.
+
+        Returns:
+            str: "cached" if an identical task's result was reused, otherwise "completed".
+        """
+        claim = await self._claim(task) if self.settings.cache_results else None
+        if claim is not None and claim["status"] == "hit":
+            logger.info("Reusing the cached result of task %s", task.get("task_id"))
+            await self._report(task, "COMPLETED")
+            return "cached"
+        if claim is not None and claim["status"] == "pending":
+            # Not a failure: the identical task's result will be a hit once it is stored
+            raise Requeue(f"An identical task is still running (result {claim['key'][:12]})", self.settings.retry_delay)
+        await self._report(task, "IN_PROGRESS")
+        try:
+            result = await self.handler(task, self)
+        except BaseException:
+            if claim is not None:
+                await self.api.delete(f"/results/{claim['key']}/claim")
+            raise
+        if claim is not None:
+            if result is None:
+                await self.api.delete(f"/results/{claim['key']}/claim")
+            else:
+                response = await self.api.put(f"/results/{claim['key']}", json={"task_id": task["task_id"], "result": result})
+                response.raise_for_status()
+        await self._report(task, "COMPLETED")
+        return "completed"
+
+    async def heartbeat(self) -> None:
+        """
+        Refresh the queue depth gauges and report this agent's state to the Primary API.
+        """
+        depth = 0
+        for queue in self.queues:
+            queue_depth = await self.broker.depth(queue)
+            queue_depth_gauge.labels(queue=queue).set(queue_depth)
+            depth += queue_depth
+        response = await self.api.post(f"/agents/{self.agent_id}/heartbeat", json={
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "queue_depth": depth,
+        })
+        response.raise_for_status()
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.warning("Heartbeat failed: %s", e)
+            await asyncio.sleep(self.settings.heartbeat_interval)
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def drain(self) -> None:
+        """
+        Stop taking tasks and wait for the running ones, up to the drain timeout.
+        """
+        await self.consumer.stop()
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.settings.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Drain timed out with %d tasks unfinished", self.pending)
+
+    async def run(self) -> None:
+        """
+        Serve until SIGTERM or SIGINT, then drain and shut down.
+        """
+        try:
+            self.agent_id = await self.resolve_agent_id()
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            await self.api.aclose()
+            raise RuntimeError(f"Could not resolve the id of agent {self.name}, set AGENT_ID: {e}") from e
+        # Its own queue carries the tasks assigned to this agent; the shared ones tasks without an assignee
+        self.queues = [agent_queue(self.agent_id)] + [task_queue(capability) for capability in self.capabilities] + [DEFAULT_TASK_QUEUE]
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.stop)
+        start_http_server(self.metrics_port)
+        await self.consumer.start(self.queues)
+        heartbeats = asyncio.create_task(self._heartbeat_loop())
+        logger.info("%s consuming %s, metrics on :%d", self.agent_id, ", ".join(self.queues), self.metrics_port)
+        try:
+            await self._stopping.wait()
+            logger.info("Draining %d delivered tasks", self.pending)
+            await self.drain()
+        finally:
+            heartbeats.cancel()
+            await self.broker.close()
+            await self.api.aclose()
+            if self.process_pool is not None:
+                self.process_pool.shutdown(cancel_futures=True)
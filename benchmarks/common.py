@@ -0,0 +1,91 @@
+import json
+import os
+import platform
+import statistics
+from typing import Optional
+
+# Relative increase of p95 latency (or drop in throughput) reported as a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: list[float], elapsed: Optional[float] = None, errors: int = 0) -> dict:
+    """
+    Latency percentiles in milliseconds and throughput for one benchmark.
+
+    `elapsed` is the wall time of a concurrent run; sequential runs use the sum of the samples.
+    """
+    total = elapsed if elapsed is not None else sum(samples)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "ops_per_s": len(samples) / total if total else 0.0,
+    }
+
+
+def print_table(results: dict[str, dict]) -> None:
+    print(f"{'benchmark':<40} {'count':>8} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>11}")
+    for name, result in results.items():
+        print(
+            f"{name:<40} {result['count']:>8} {result['errors']:>5} {result['p50_ms']:>9.3f} "
+            f"{result['p95_ms']:>9.3f} {result['p99_ms']:>9.3f} {result['ops_per_s']:>11.1f}"
+        )
+
+
+def save_baseline(path: str, results: dict[str, dict]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"machine": platform.platform(), "python": platform.python_version(), "results": results}, f, indent=2)
+    print(f"Baseline written to {path}")
+
+
+def compare_baseline(path: str, results: dict[str, dict], tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Compare against a stored baseline and return the benchmarks that regressed.
+    """
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\n{'benchmark':<40} {'p95 base':>9} {'p95 now':>9} {'change':>8} {'ops/s change':>13}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        p95_change = result["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        ops_change = result["ops_per_s"] / base["ops_per_s"] - 1 if base["ops_per_s"] else 0.0
+        regressed = p95_change > tolerance or ops_change < -tolerance
+        print(f"{name:<40} {base['p95_ms']:>9.3f} {result['p95_ms']:>9.3f} {p95_change:>+8.1%} {ops_change:>+13.1%}"
+              + ("  REGRESSION" if regressed else ""))
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def add_baseline_arguments(parser, default_path: str) -> None:
+    parser.add_argument("--baseline", default=default_path, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare with the baseline; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative regression")
+
+
+def finish(args, results: dict[str, dict]) -> int:
+    print_table(results)
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+    if args.compare:
+        regressions = compare_baseline(args.baseline, results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions over {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
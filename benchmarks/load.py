@@ -0,0 +1,141 @@
+"""
+Concurrent HTTP load generator for the primary_api routes.
+
+    python -m benchmarks.load [--concurrency 32] [--duration 10] [--save-baseline | --compare]
+    python -m benchmarks.load --url http://localhost:8000   # against a running server
+
+Without --url the app is served in-process through httpx's ASGI transport on the embedded
+memory graph backend, so no network or Neo4j is needed; Cypher scenarios are then skipped. Each worker picks a
+weighted random scenario per request; latency percentiles and throughput are reported per
+scenario and overall.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional
+
+# Imported first: it configures the environment before primary_api reads its settings
+from . import memory  # noqa: F401
+
+import httpx
+
+from primary_api.services.stats import stats_service
+
+from .common import add_baseline_arguments, finish, summarize
+
+BASELINE = os.path.join(os.path.dirname(__file__), "results", "load_baseline.json")
+
+STATS_QUERY = "MATCH (t:Task) RETURN t.id AS id LIMIT 100"
+
+Scenario = Callable[[httpx.AsyncClient, random.Random, dict], Awaitable[httpx.Response]]
+
+
+def _pick(state: dict, label: str, rng: random.Random) -> str:
+    return rng.choice(state[label])
+
+
+async def create(client, rng, state, path: str, label: str, body: dict) -> httpx.Response:
+    response = await client.post(path, json=body)
+    if response.status_code == 200:
+        state[label].append(response.json()["id"])
+    return response
+
+
+# name -> (weight, scenario)
+SCENARIOS: dict[str, tuple[int, Scenario]] = {
+    "POST /agents/": (2, lambda c, r, s: create(c, r, s, "/agents/", "Agent", {"name": f"Agent {r.randrange(10 ** 6)}", "capabilities": []})),
+    "GET /agents/{id}": (8, lambda c, r, s: c.get(f"/agents/{_pick(s, 'Agent', r)}")),
+    "GET /agents/?limit=100": (3, lambda c, r, s: c.get("/agents/", params={"limit": 100, "after": _pick(s, "Agent", r)})),
+    "PUT /agents/{id}": (2, lambda c, r, s: c.put(f"/agents/{_pick(s, 'Agent', r)}", json={"updates": {"description": "updated"}})),
+    "POST /tasks/": (4, lambda c, r, s: create(c, r, s, "/tasks/", "Task", {"name": f"Task {r.randrange(10 ** 6)}", "description": "Load test"})),
+    "GET /tasks/{id}": (8, lambda c, r, s: c.get(f"/tasks/{_pick(s, 'Task', r)}")),
+    "GET /tasks/?limit=100": (3, lambda c, r, s: c.get("/tasks/", params={"limit": 100, "after": _pick(s, "Task", r)})),
+    "PUT /tasks/{id}": (4, lambda c, r, s: c.put(f"/tasks/{_pick(s, 'Task', r)}", json={"updates": {"description": "updated"}})),
+    "PUT /tasks/{id}[progress]": (4, lambda c, r, s: c.put(f"/tasks/{_pick(s, 'Task', r)}", json={"updates": {"progress": str(r.randrange(100))}})),
+    "POST /capabilities/": (1, lambda c, r, s: create(c, r, s, "/capabilities/", "Capability", {"name": f"Capability {r.randrange(10 ** 6)}"})),
+    "GET /capabilities/{id}": (4, lambda c, r, s: c.get(f"/capabilities/{_pick(s, 'Capability', r)}")),
+    "GET /capabilities/?limit=100": (2, lambda c, r, s: c.get("/capabilities/", params={"limit": 100})),
+    "PUT /capabilities/{id}": (1, lambda c, r, s: c.put(f"/capabilities/{_pick(s, 'Capability', r)}", json={"updates": {"description": "updated"}})),
+    "POST /neo4j/query[cached]": (2, lambda c, r, s: c.post("/neo4j/query", json={"query": STATS_QUERY, "access_mode": "read", "cache": True})),
+    "GET /neo4j/stats": (2, lambda c, r, s: c.get("/neo4j/stats")),
+}
+
+
+# Scenarios that need the Neo4j backend
+CYPHER_SCENARIOS = ("POST /neo4j/query[cached]",)
+
+
+async def seed(client: httpx.AsyncClient, count: int) -> dict:
+    state = {"Agent": [], "Task": [], "Capability": []}
+    for label, path in (("Capability", "/capabilities/bulk"), ("Agent", "/agents/bulk"), ("Task", "/tasks/bulk")):
+        for start in range(0, count, 1000):
+            body = [{"name": f"{label} {i}", "description": f"Seeded {label.lower()} {i}"} for i in range(start, min(count, start + 1000))]
+            response = await client.post(path, json=body)
+            response.raise_for_status()
+            state[label].extend(item["id"] for item in response.json()["items"] if item["status"] == "created")
+    return state
+
+
+def prepare_in_process() -> httpx.AsyncClient:
+    from primary_api.main import app
+
+    # Warm the /neo4j/stats cache, as a running server would have it
+    stats_service._stats = {"node_count": 0, "relationship_count": 0, "labels": {}, "relationship_types": {}, "task_status": {}}
+    stats_service._refreshed_at = time.monotonic()
+    stats_service.ttl = float("inf")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://primary_api")
+
+
+async def run(url: Optional[str], concurrency: int, duration: float, seeded: int, scenarios: list[str]) -> dict[str, dict]:
+    client = httpx.AsyncClient(base_url=url, timeout=30) if url else prepare_in_process()
+    names = scenarios or [name for name in SCENARIOS if url or name not in CYPHER_SCENARIOS]
+    weights = [SCENARIOS[name][0] for name in names]
+    samples: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+
+    async with client:
+        state = await seed(client, seeded)
+        deadline = time.perf_counter() + duration
+
+        async def worker(seed_value: int) -> None:
+            rng = random.Random(seed_value)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    response = await SCENARIOS[name][1](client, rng, state)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                samples[name].append(time.perf_counter() - started)
+                errors[name] += failed
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    results = {name: summarize(samples[name], elapsed, errors[name]) for name in names if samples[name]}
+    results["all"] = summarize([sample for name in names for sample in samples[name]], elapsed, sum(errors.values()))
+    return results
+
+
+def main() -> int:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Base URL of a running primary_api; in-process if omitted")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to generate load")
+    parser.add_argument("--seed", type=int, default=2000, help="Nodes per label created before measuring")
+    parser.add_argument("--scenario", action="append", default=[], choices=list(SCENARIOS), help="Only run these scenarios")
+    add_baseline_arguments(parser, BASELINE)
+    args = parser.parse_args()
+    return finish(args, asyncio.run(run(args.url, args.concurrency, args.duration, args.seed, args.scenario)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
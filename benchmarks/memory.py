@@ -0,0 +1,13 @@
+"""
+Benchmark environment that needs no Neo4j, so benchmarks run on a laptop.
+
+Importing this module selects the embedded graph backend (GRAPH_BACKEND=memory, see
+primary_api/db/memory_store.py) before primary_api reads its settings, and turns off the
+node cache and the background services that would add noise or need a message broker.
+"""
+import os
+
+os.environ.setdefault("GRAPH_BACKEND", "memory")
+os.environ.setdefault("ASSIGNMENT_ENABLED", "false")
+os.environ.setdefault("DISPATCH_ENABLED", "false")
+os.environ.setdefault("CACHE_BACKEND", "none")
@@ -0,0 +1,99 @@
+"""
+In-process micro-benchmarks of the primary_api hot paths.
+
+    python -m benchmarks.micro [--iterations 2000] [--save-baseline | --compare]
+
+NodeManager calls run against the embedded memory graph backend (benchmarks/memory.py), so
+they measure the Python side: model validation, keyset paging and id allocation. `/neo4j/query` and
+`/neo4j/stats` are measured on their cached paths, which are the ones that do not need Neo4j.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Imported first: it configures the environment before primary_api reads its settings
+from . import memory  # noqa: F401
+
+from primary_api.db.NodeManager import NodeManager
+from primary_api.db.ids import IdAllocator, slugify
+from primary_api.db.query import query_cache, query_limits, run_query
+from primary_api.db.search import build_fulltext_query
+from primary_api.models.models import Agent, Capability, CypherQuery, NodeBase, Task
+from primary_api.models.trusted import trusted
+from primary_api.services.stats import stats_service
+
+from .common import add_baseline_arguments, finish, summarize
+
+BASELINE = os.path.join(os.path.dirname(__file__), "results", "micro_baseline.json")
+
+
+async def measure(function, iterations: int, warmup: int = 50) -> dict:
+    for i in range(warmup):
+        await function(i)
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await function(warmup + i)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+async def seed(manager: NodeManager, count: int) -> None:
+    await manager.create_nodes("Capability", [Capability(name=f"Capability {i}", description="Seeded capability") for i in range(count)])
+    await manager.create_nodes("Agent", [Agent(name=f"Agent {i}", capabilities=[f"Capability {i}"]) for i in range(count)])
+    await manager.create_nodes("Task", [Task(name=f"Task {i}", description=f"Research topic {i}") for i in range(count)])
+
+
+async def run(iterations: int, seeded: int) -> dict[str, dict]:
+    manager = NodeManager(cache=None)
+    await seed(manager, seeded)
+    agent_ids = [agent.id for agent in await manager.get_page("Agent", limit=seeded)]
+    task_ids = [task.id for task in await manager.get_page("Task", limit=seeded)]
+    allocator = IdAllocator()
+    task_models = await manager.get_page("Task", limit=100)
+
+    # Cached /neo4j/query result and /neo4j/stats snapshot, as a warm server would have them
+    cached_query = CypherQuery(query="MATCH (t:Task) RETURN t.id AS id LIMIT 100", access_mode="read", cache=True)
+    query_cache.set(query_cache.key(cached_query, query_limits(cached_query)[1]),
+                    {"result": [{"id": task_id} for task_id in task_ids[:100]], "truncated": False})
+    stats_service._stats = {"node_count": 3 * seeded, "relationship_count": seeded, "labels": {}, "relationship_types": {}, "task_status": {}}
+    stats_service._refreshed_at = time.monotonic()
+    stats_service.ttl = float("inf")
+
+    benchmarks = {
+        "nodemanager.create_node[Agent]": lambda i: manager.create_node("Agent", Agent(name=f"Bench agent {i}", capabilities=["Capability 1"])),
+        "nodemanager.create_node[Task]": lambda i: manager.create_node("Task", Task(name=f"Bench task {i}")),
+        "nodemanager.create_nodes[Task x100]": lambda i: manager.create_nodes("Task", [Task(name=f"Bulk task {i}.{j}") for j in range(100)]),
+        "nodemanager.get_node[Agent]": lambda i: manager.get_node("Agent", agent_ids[i % len(agent_ids)]),
+        "nodemanager.get_page[Task x100]": lambda i: manager.get_page("Task", task_ids[i % len(task_ids)], 100),
+        "nodemanager.update_node[Task]": lambda i: manager.update_node("Task", task_ids[i % len(task_ids)], {"description": f"Updated {i}"}),
+        "nodemanager.get_like_nodes[Task]": lambda i: manager.get_like_nodes("description", f"topic {i % seeded}", "Task"),
+        "ids.assign[x1]": lambda i: allocator.assign("Task", [NodeBase(name=f"Task {i}")]),
+        "ids.assign[x100]": lambda i: allocator.assign("Task", [NodeBase(name=f"Task {i}.{j}") for j in range(100)]),
+        "ids.slugify": lambda i: asyncio.sleep(0, slugify(f"Web Search Capability {i}")),
+        "search.build_fulltext_query": lambda i: asyncio.sleep(0, build_fulltext_query(f"web search: topic {i}", "name")),
+        "query.run_query[cached]": lambda i: run_query(cached_query),
+        "stats.get[cached]": lambda i: stats_service.get(),
+        "models.validate[Agent]": lambda i: asyncio.sleep(0, Agent(name=f"Agent {i}", capabilities=["a", "b"], description="x")),
+        "models.construct[Agent]": lambda i: asyncio.sleep(0, trusted(Agent).construct({"name": f"Agent {i}", "capabilities": ["a", "b"], "description": "x"})),
+        "models.dump_json[Task x100]": lambda i: asyncio.sleep(0, trusted(Task).dump_json(task_models)),
+    }
+    results = {}
+    for name, function in benchmarks.items():
+        results[name] = await measure(function, iterations)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=10000, help="Nodes per label created before measuring")
+    add_baseline_arguments(parser, BASELINE)
+    args = parser.parse_args()
+    return finish(args, asyncio.run(run(args.iterations, args.seed)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import os
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+def _env(name: str, default: str) -> str:
+    return os.getenv(name, default)
+
+
+def _optional_env(name: str) -> Optional[str]:
+    return os.getenv(name) or None
+
+
+class Settings(BaseModel):
+    """
+    Runtime configuration for the Evolving API, read from environment variables.
+    """
+    # Dynamically added functions
+    functions_dir: str         = Field(default_factory=lambda: _env("FUNCTIONS_DIR", "/app/functions"))
+    function_cache_dir: str    = Field(default_factory=lambda: _env("FUNCTION_CACHE_DIR", "/app/function_cache"))
+    watch_enabled: bool        = Field(default_factory=lambda: _env("WATCH_ENABLED", "true").lower() == "true")
+    watch_interval: float      = Field(default_factory=lambda: float(_env("WATCH_INTERVAL", "1")))
+
+    # Uploads run arbitrary Python in this process, so they are off unless explicitly enabled
+    upload_enabled: bool         = Field(default_factory=lambda: _env("FUNCTION_UPLOAD_ENABLED", "false").lower() == "true")
+    upload_token: Optional[str]  = Field(default_factory=lambda: _optional_env("FUNCTION_UPLOAD_TOKEN"))
+
+
+settings = Settings()
@@ -1,7 +1,71 @@
-from fastapi import FastAPI
+import secrets
+from contextlib import asynccontextmanager
+from typing import Optional
 
-app = FastAPI()
+from fastapi import Body, Depends, FastAPI, Header, HTTPException
+from prometheus_fastapi_instrumentator import Instrumentator
+
+from .config import settings
+from .registry import FunctionRegistry, FunctionValidationError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load every function module before serving, then follow the directory for changes
+    await registry.scan()
+    if settings.watch_enabled:
+        registry.start(settings.watch_interval)
+    yield
+    await registry.stop()
+
+app = FastAPI(title="Evolving API", lifespan=lifespan)
+
+# Register Prometheus Instrumentator
+Instrumentator().instrument(app).expose(app)
+
+registry = FunctionRegistry(app, settings.functions_dir, settings.function_cache_dir)
 
 @app.get("/")
 async def read_root():
     return {"message": "Hello, World!"}
+
+def require_upload_access(authorization: Optional[str] = Header(default=None)) -> None:
+    """
+    Allow changes to the function modules only when FUNCTION_UPLOAD_ENABLED is set, and with
+    `Authorization: Bearer <FUNCTION_UPLOAD_TOKEN>` when a token is configured.
+    """
+    if not settings.upload_enabled:
+        raise HTTPException(status_code=403, detail="Function uploads are disabled (FUNCTION_UPLOAD_ENABLED).")
+    if settings.upload_token and not secrets.compare_digest(authorization or "", f"Bearer {settings.upload_token}"):
+        raise HTTPException(status_code=401, detail="Invalid or missing upload token.", headers={"WWW-Authenticate": "Bearer"})
+
+@app.get("/registry/functions", tags=["Registry"])
+async def list_functions() -> list[dict]:
+    """
+    List the loaded function modules and their routes.
+    """
+    return [module.describe() for module in registry.modules.values()]
+
+@app.put("/registry/functions/{name}", tags=["Registry"], dependencies=[Depends(require_upload_access)])
+async def upload_function(name: str, source: str = Body(..., media_type="text/plain")) -> dict:
+    """
+    Add or replace a function module.
+
+    The body is the module's Python source; it must define `router`, a FastAPI APIRouter,
+    whose routes are served under /functions/{name}. Invalid modules are rejected with 422
+    and the live version, if any, keeps serving.
+
+    The module runs in this process with its full permissions, so uploads are refused unless
+    FUNCTION_UPLOAD_ENABLED is set; set FUNCTION_UPLOAD_TOKEN as well on any shared network.
+    """
+    try:
+        module = await registry.save(name, source.encode())
+    except FunctionValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return module.describe()
+
+@app.delete("/registry/functions/{name}", tags=["Registry"], dependencies=[Depends(require_upload_access)])
+async def delete_function(name: str) -> dict:
+    if not await registry.unload(name, delete_file=True):
+        raise HTTPException(status_code=404, detail="Function module not found.")
+    return {"message": "Function module removed"}
@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import logging
+import marshal
+import os
+import re
+import sys
+import time
+import types
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fastapi import APIRouter, FastAPI
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+# Initialize the Prometheus Counters
+function_load_counter = Counter("function_load_count", "Function module loads", ["outcome"])  # loaded | cached | invalid
+function_unload_counter = Counter("function_unload_count", "Function modules removed")
+
+# Function modules are named like Python identifiers and mounted at /functions/<name>
+MODULE_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+ROUTE_PREFIX = "/functions"
+# Parent package name in sys.modules, so function modules never shadow real modules
+MODULE_PACKAGE = "evolving_functions"
+
+
+class FunctionValidationError(ValueError):
+    pass
+
+
+@dataclass
+class FunctionModule:
+    name: str
+    digest: str                 # sha256 of the source
+    module: types.ModuleType
+    routes: list = field(default_factory=list)
+    loaded_at: float = field(default_factory=time.time)
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "digest": self.digest,
+            "loaded_at": self.loaded_at,
+            "routes": [{"path": route.path, "methods": sorted(getattr(route, "methods", None) or [])} for route in self.routes],
+        }
+
+
+def validate_module_name(name: str) -> str:
+    if not MODULE_NAME_PATTERN.match(name):
+        raise FunctionValidationError(f"Invalid function module name: {name!r}")
+    return name
+
+
+class FunctionRegistry:
+    """
+    Loads function modules from a directory and serves their routes without a restart.
+
+    A function module is a Python file that defines `router`, a FastAPI APIRouter; its routes
+    are mounted under /functions/<module name>. Only modules whose source changed are
+    re-imported. New routes are built off to the side and swapped in with a single assignment
+    of `app.router.routes`, so requests already being routed keep the old list and never see
+    a half-registered module. A module that fails validation leaves the live version in place.
+
+    Compiled code is cached in `cache_dir` keyed by the source hash, so a cold start only
+    compiles modules it has never seen.
+    """
+
+    def __init__(self, app: FastAPI, directory: str, cache_dir: Optional[str] = None):
+        self.app = app
+        self.directory = directory
+        self.cache_dir = cache_dir
+        self.modules: dict[str, FunctionModule] = {}
+        # name -> (mtime_ns, size) of the file when it was last looked at
+        self._seen: dict[str, tuple[int, int]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{validate_module_name(name)}.py")
+
+    def _cache_path(self, name: str, digest: str) -> str:
+        # Marshalled code is only valid for the interpreter version that wrote it
+        return os.path.join(self.cache_dir, f"{name}.{digest[:16]}.{sys.implementation.cache_tag}.pyc")
+
+    def _prune_cache(self, name: str, keep: Optional[str] = None) -> None:
+        """
+        Remove cached code of a module's previous versions.
+        """
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        keep = os.path.basename(self._cache_path(name, keep)) if keep else None
+        for entry in os.listdir(self.cache_dir):
+            if entry.startswith(f"{name}.") and entry.endswith(".pyc") and entry != keep:
+                os.remove(os.path.join(self.cache_dir, entry))
+
+    def _compile(self, name: str, source: bytes, digest: str) -> tuple[types.CodeType, bool]:
+        """
+        Compile a module's source, or load its code from the cache.
+
+        Returns:
+            tuple: The code object and whether it came from the cache.
+        """
+        cached = self._cache_path(name, digest) if self.cache_dir else None
+        if cached and os.path.exists(cached):
+            with open(cached, "rb") as f:
+                return marshal.load(f), True
+        try:
+            code = compile(source, self.path(name), "exec", dont_inherit=True)
+        except SyntaxError as e:
+            raise FunctionValidationError(f"Syntax error in {name}: {e}") from e
+        if cached:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporary = f"{cached}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as f:
+                marshal.dump(code, f)
+            os.replace(temporary, cached)
+        return code, False
+
+    def _build(self, name: str, source: bytes) -> tuple[FunctionModule, bool]:
+        """
+        Compile and execute a module off to the side and collect its routes.
+        """
+        digest = hashlib.sha256(source).hexdigest()
+        code, cached = self._compile(name, source, digest)
+        module = types.ModuleType(f"{MODULE_PACKAGE}.{name}")
+        module.__file__ = self.path(name)
+        try:
+            exec(code, module.__dict__)
+        except Exception as e:
+            raise FunctionValidationError(f"Importing {name} failed: {e!r}") from e
+        router = getattr(module, "router", None)
+        if not isinstance(router, APIRouter):
+            raise FunctionValidationError(f"{name}.router is not an APIRouter")
+        mounted = APIRouter()
+        try:
+            mounted.include_router(router, prefix=f"{ROUTE_PREFIX}/{name}", tags=[name])
+        except Exception as e:
+            raise FunctionValidationError(f"Mounting {name}.router failed: {e!r}") from e
+        return FunctionModule(name, digest, module, list(mounted.routes)), cached
+
+    def _swap(self, name: str, loaded: Optional[FunctionModule]) -> None:
+        previous = self.modules.get(name)
+        stale = {id(route) for route in previous.routes} if previous else set()
+        routes = [route for route in self.app.router.routes if id(route) not in stale]
+        if loaded is not None:
+            routes.extend(loaded.routes)
+            self.modules[name] = loaded
+            sys.modules[loaded.module.__name__] = loaded.module
+        else:
+            self.modules.pop(name, None)
+            sys.modules.pop(f"{MODULE_PACKAGE}.{name}", None)
+        # One reference assignment: the router either sees the old list or the new one
+        self.app.router.routes = routes
+        self.app.openapi_schema = None
+
+    async def load(self, name: str, source: Optional[bytes] = None) -> FunctionModule:
+        """
+        Import (or re-import) one module and swap its routes in.
+
+        Raises:
+            FunctionValidationError: The module is invalid; the live version is kept.
+        """
+        validate_module_name(name)
+        async with self._lock:
+            if source is None:
+                with open(self.path(name), "rb") as f:
+                    source = f.read()
+            current = self.modules.get(name)
+            if current is not None and current.digest == hashlib.sha256(source).hexdigest():
+                return current
+            try:
+                loaded, cached = await asyncio.to_thread(self._build, name, source)
+            except FunctionValidationError as e:
+                function_load_counter.labels(outcome="invalid").inc()
+                logger.warning("Rejected function module %s: %s", name, e)
+                raise
+            self._swap(name, loaded)
+            self._prune_cache(name, loaded.digest)
+            function_load_counter.labels(outcome="cached" if cached else "loaded").inc()
+            logger.info("Loaded function module %s (%s)", name, loaded.digest[:12])
+            return loaded
+
+    async def save(self, name: str, source: bytes) -> FunctionModule:
+        """
+        Validate and load an uploaded module, then persist it to the watched directory.
+        """
+        loaded = await self.load(name, source)
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{self.path(name)}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(source)
+        os.replace(temporary, self.path(name))
+        stat = os.stat(self.path(name))
+        self._seen[name] = (stat.st_mtime_ns, stat.st_size)
+        return loaded
+
+    async def unload(self, name: str, delete_file: bool = False) -> bool:
+        async with self._lock:
+            if name not in self.modules:
+                return False
+            self._swap(name, None)
+            self._prune_cache(name)
+            function_unload_counter.inc()
+            logger.info("Unloaded function module %s", name)
+        if delete_file and os.path.exists(self.path(name)):
+            os.remove(self.path(name))
+        self._seen.pop(name, None)
+        return True
+
+    async def scan(self) -> None:
+        """
+        Load new or modified modules in the directory and unload deleted ones.
+        """
+        present: dict[str, tuple[int, int]] = {}
+        if os.path.isdir(self.directory):
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    name, extension = os.path.splitext(entry.name)
+                    if extension == ".py" and MODULE_NAME_PATTERN.match(name) and entry.is_file():
+                        stat = entry.stat()
+                        present[name] = (stat.st_mtime_ns, stat.st_size)
+        for name, signature in present.items():
+            if self._seen.get(name) != signature:
+                self._seen[name] = signature
+                try:
+                    await self.load(name)
+                except (FunctionValidationError, OSError):
+                    pass  # Already logged; the file is retried once it changes again
+        for name in list(self._seen):
+            if name not in present:
+                self._seen.pop(name)
+                await self.unload(name)
+
+    def start(self, interval: float) -> None:
+        """
+        Poll the directory for changes every `interval` seconds in the background.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.scan()
+            except Exception as e:
+                logger.warning("Scanning %s failed: %s", self.directory, e)
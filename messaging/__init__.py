@@ -0,0 +1,3 @@
+# Shared message broker transport for the Primary API and the agents
+from .broker import DEFAULT_TASK_QUEUE, Broker, InMemoryBroker, Message, RabbitMQBroker, agent_queue, get_broker, task_queue
+from .consumer import Consumer, Requeue, dead_letter_queue
@@ -0,0 +1,233 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, Optional
+
+# Called once per delivered message; must ack or nack it
+MessageHandler = Callable[["Message"], Awaitable[None]]
+
+
+def task_queue(capability: str) -> str:
+    """
+    Queue carrying tasks whose primary required capability is `capability` (in slug form).
+    """
+    return f"tasks.{capability}"
+
+# Queue for tasks without required capabilities
+DEFAULT_TASK_QUEUE = task_queue("default")
+
+
+def agent_queue(agent_id: str) -> str:
+    """
+    Queue carrying tasks assigned to the agent with id `agent_id`, consumed by that agent only.
+    """
+    return f"agents.{agent_id}"
+
+
+class Message:
+    """
+    A delivered message. The body is a JSON object, headers carry delivery metadata
+    such as the retry count.
+    """
+
+    def __init__(self, queue: str, body: dict, headers: Optional[dict] = None):
+        self.queue = queue
+        self.body = body
+        self.headers = headers or {}
+
+    @property
+    def attempts(self) -> int:
+        return int(self.headers.get("x-attempts", 0))
+
+    async def ack(self) -> None:
+        raise NotImplementedError
+
+    async def nack(self, requeue: bool = True) -> None:
+        raise NotImplementedError
+
+
+class Broker:
+    """
+    Transport used to push tasks from the Primary API to agents.
+    """
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def publish(self, queue: str, body: dict, headers: Optional[dict] = None) -> None:
+        raise NotImplementedError
+
+    async def consume(self, queue: str, handler: MessageHandler, prefetch: int = 10) -> None:
+        """
+        Start delivering messages from a queue to `handler`, with at most `prefetch`
+        unacknowledged messages in flight. Returns once the subscription is set up.
+        """
+        raise NotImplementedError
+
+    async def cancel(self, queue: str) -> None:
+        """
+        Stop delivering new messages from a queue to this process's consumers.
+        """
+        raise NotImplementedError
+
+    async def depth(self, queue: str) -> int:
+        """
+        Number of messages waiting in a queue, not counting unacknowledged deliveries.
+        """
+        raise NotImplementedError
+
+
+class InMemoryMessage(Message):
+    def __init__(self, broker: "InMemoryBroker", queue: str, body: dict, headers: Optional[dict], slot: asyncio.Semaphore):
+        super().__init__(queue, body, headers)
+        self._broker = broker
+        self._slot = slot
+        self._settled = False
+
+    async def ack(self) -> None:
+        self._settle()
+
+    async def nack(self, requeue: bool = True) -> None:
+        self._settle()
+        if requeue:
+            await self._broker.publish(self.queue, self.body, self.headers)
+
+    def _settle(self) -> None:
+        if not self._settled:
+            self._settled = True
+            self._slot.release()
+
+
+class InMemoryBroker(Broker):
+    """
+    In-process stand-in for RabbitMQ, for tests and single-process deployments.
+    """
+
+    def __init__(self):
+        self.queues: dict[str, asyncio.Queue] = {}
+        self._consumers: dict[str, list[asyncio.Task]] = {}
+
+    def queue(self, name: str) -> asyncio.Queue:
+        if name not in self.queues:
+            self.queues[name] = asyncio.Queue()
+        return self.queues[name]
+
+    async def publish(self, queue: str, body: dict, headers: Optional[dict] = None) -> None:
+        # Round-trip through JSON so consumers never share mutable state with publishers
+        await self.queue(queue).put((json.loads(json.dumps(body, default=str)), dict(headers or {})))
+
+    async def consume(self, queue: str, handler: MessageHandler, prefetch: int = 10) -> None:
+        self._consumers.setdefault(queue, []).append(asyncio.create_task(self._deliver(queue, handler, prefetch)))
+
+    async def cancel(self, queue: str) -> None:
+        for consumer in self._consumers.pop(queue, []):
+            consumer.cancel()
+
+    async def depth(self, queue: str) -> int:
+        return self.queue(queue).qsize()
+
+    async def _deliver(self, queue: str, handler: MessageHandler, prefetch: int) -> None:
+        slot = asyncio.Semaphore(prefetch)
+        pending = self.queue(queue)
+        while True:
+            await slot.acquire()
+            body, headers = await pending.get()
+            asyncio.create_task(handler(InMemoryMessage(self, queue, body, headers, slot)))
+
+    async def close(self) -> None:
+        for queue in list(self._consumers):
+            await self.cancel(queue)
+
+
+class RabbitMQMessage(Message):
+    def __init__(self, queue: str, incoming):
+        super().__init__(queue, json.loads(incoming.body), dict(incoming.headers or {}))
+        self._incoming = incoming
+
+    async def ack(self) -> None:
+        await self._incoming.ack()
+
+    async def nack(self, requeue: bool = True) -> None:
+        await self._incoming.nack(requeue=requeue)
+
+
+class RabbitMQBroker(Broker):
+    """
+    RabbitMQ transport over aio-pika, with durable queues and persistent messages.
+    """
+
+    def __init__(self, url: str):
+        try:
+            import aio_pika
+        except ImportError as e:
+            raise RuntimeError("An amqp:// broker URL requires the 'aio-pika' package") from e
+        self._aio_pika = aio_pika
+        self.url = url
+        self._connection = None
+        self._channel = None
+        self._declared: set[str] = set()
+        # queue name -> (declared queue, consumer tag) for each subscription
+        self._subscriptions: dict[str, list[tuple]] = {}
+
+    async def connect(self) -> None:
+        if self._connection is None:
+            self._connection = await self._aio_pika.connect_robust(self.url)
+            self._channel = await self._connection.channel()
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = self._channel = None
+            self._declared.clear()
+            self._subscriptions.clear()
+
+    async def _declare(self, channel, name: str):
+        return await channel.declare_queue(name, durable=True)
+
+    async def publish(self, queue: str, body: dict, headers: Optional[dict] = None) -> None:
+        await self.connect()
+        if queue not in self._declared:
+            await self._declare(self._channel, queue)
+            self._declared.add(queue)
+        message = self._aio_pika.Message(
+            json.dumps(body, default=str).encode(),
+            headers=headers or {},
+            content_type="application/json",
+            delivery_mode=self._aio_pika.DeliveryMode.PERSISTENT,
+        )
+        await self._channel.default_exchange.publish(message, routing_key=queue)
+
+    async def consume(self, queue: str, handler: MessageHandler, prefetch: int = 10) -> None:
+        await self.connect()
+        # One channel per consumer so each queue gets its own prefetch window
+        channel = await self._connection.channel()
+        await channel.set_qos(prefetch_count=prefetch)
+        declared = await self._declare(channel, queue)
+        tag = await declared.consume(lambda incoming: handler(RabbitMQMessage(queue, incoming)))
+        self._subscriptions.setdefault(queue, []).append((declared, tag))
+
+    async def cancel(self, queue: str) -> None:
+        for declared, tag in self._subscriptions.pop(queue, []):
+            await declared.cancel(tag)
+
+    async def depth(self, queue: str) -> int:
+        await self.connect()
+        declared = await self._declare(self._channel, queue)
+        return declared.declaration_result.message_count
+
+
+_memory_broker: Optional[InMemoryBroker] = None
+
+def get_broker(url: str) -> Broker:
+    """
+    Build the broker for a URL: "memory://" for the in-process broker (shared by every
+    caller in the process), "amqp://..." for RabbitMQ.
+    """
+    global _memory_broker
+    if url.startswith("memory://"):
+        if _memory_broker is None:
+            _memory_broker = InMemoryBroker()
+        return _memory_broker
+    return RabbitMQBroker(url)
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable, Optional
+
+from .broker import Broker, Message
+
+logger = logging.getLogger(__name__)
+
+# Processes one task message body; raising marks the delivery as failed
+TaskHandler = Callable[[dict], Awaitable[None]]
+# Called with a message body and the last error when the message is dead-lettered
+DeadLetterHandler = Callable[[dict, Exception], Awaitable[None]]
+
+
+def dead_letter_queue(queue: str) -> str:
+    return f"{queue}.dead"
+
+
+class Requeue(Exception):
+    """
+    Raised by a handler to put a message back after `delay` seconds without counting an attempt,
+    e.g. while an identical task is still running elsewhere.
+    """
+
+    def __init__(self, reason: str, delay: float = 1.0):
+        super().__init__(reason)
+        self.delay = delay
+
+
+class Consumer:
+    """
+    Consumes task messages from one or more queues with bounded prefetch.
+
+    A handler that returns acks the message. A handler that raises gets the message
+    republished with an incremented `x-attempts` header, after `retry_delay` seconds,
+    until `max_retries` is exceeded; the message then moves to `<queue>.dead` and
+    `on_dead_letter` is called. A handler that raises Requeue gets the message republished
+    unchanged after the requested delay. Retries are done by republishing so they work the
+    same on every transport.
+    """
+
+    def __init__(self, broker: Broker, handler: TaskHandler, prefetch: int = 10,
+                 max_retries: int = 3, retry_delay: float = 1.0, on_dead_letter: Optional[DeadLetterHandler] = None):
+        self.broker = broker
+        self.handler = handler
+        self.on_dead_letter = on_dead_letter
+        self.prefetch = prefetch
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.queues: list[str] = []
+
+    async def start(self, queues: Iterable[str]) -> None:
+        await self.broker.connect()
+        for queue in queues:
+            await self.broker.consume(queue, self._on_message, self.prefetch)
+            self.queues.append(queue)
+            logger.info("Consuming %s (prefetch %d)", queue, self.prefetch)
+
+    async def stop(self) -> None:
+        """
+        Stop taking new messages. Deliveries already handed to the handler still finish.
+        """
+        for queue in self.queues:
+            await self.broker.cancel(queue)
+        self.queues.clear()
+
+    async def _on_message(self, message: Message) -> None:
+        try:
+            await self.handler(message.body)
+        except Requeue as e:
+            await self._requeue(message, e)
+        except Exception as e:
+            await self._retry(message, e)
+        else:
+            await message.ack()
+
+    async def _retry(self, message: Message, error: Exception) -> None:
+        attempts = message.attempts + 1
+        headers = {**message.headers, "x-attempts": attempts, "x-last-error": str(error)[:500]}
+        if attempts > self.max_retries:
+            logger.error("Dead-lettering message from %s after %d attempts: %s", message.queue, attempts, error)
+            await self.broker.publish(dead_letter_queue(message.queue), message.body, headers)
+            if self.on_dead_letter is not None:
+                try:
+                    await self.on_dead_letter(message.body, error)
+                except Exception as e:
+                    logger.warning("Dead-letter handler failed: %s", e)
+        else:
+            logger.warning("Retrying message from %s (attempt %d): %s", message.queue, attempts, error)
+            await asyncio.sleep(self.retry_delay * attempts)
+            await self.broker.publish(message.queue, message.body, headers)
+        # The copy is published before the original is acked, so a crash can only duplicate it
+        await message.ack()
+
+    async def _requeue(self, message: Message, requeue: Requeue) -> None:
+        logger.info("Requeuing message from %s in %.1fs: %s", message.queue, requeue.delay, requeue)
+        await asyncio.sleep(requeue.delay)
+        await self.broker.publish(message.queue, message.body, message.headers)
+        await message.ack()
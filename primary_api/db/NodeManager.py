@@ -1,120 +1,332 @@
-from typing import Dict
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional
 
-from ..models.models import NodeBase
-from .neo4j import get_neo4j_driver, node_exists
+from ..config import settings
+from ..models.models import BulkItemResult, BulkResult, NodeBase
+from ..models.trusted import trusted_node_model
+from ..utils.instrumentation import timed, timed_validation
+from ..utils.logger import get_logger
+from .cache import NodeCache, node_cache
+from .ids import id_allocator
+from .store import DuplicateNodeError, GraphStore, get_store
+from .vectors import vector_store
+
+logger = get_logger(__name__)
+
+# Called after every successful write as listener(event, label, node_id, properties), where
+# event is "create", "update", "delete" or "relationship"
+WriteListener = Callable[[str, str, str, Optional[dict]], Awaitable[None]]
+_write_listeners: list[WriteListener] = []
+
+def add_write_listener(listener: WriteListener) -> None:
+    """
+    Register a coroutine that keeps derived state (indexes, feeds) in step with graph writes.
+    """
+    _write_listeners.append(listener)
+
+# Called on every batch of rows read as overlay(label, rows) -> rows, so writes that have
+# not reached the store yet (see services.write_behind) are visible to reads
+ReadOverlay = Callable[[Optional[str], list[dict]], list[dict]]
+_read_overlays: list[ReadOverlay] = []
+
+def add_read_overlay(overlay: ReadOverlay) -> None:
+    """
+    Register a function that patches rows read from the store or the cache.
+    """
+    _read_overlays.append(overlay)
 
 class NodeManager:
-    def __init__(self, driver):
-        self.driver = driver
-
-    def create_node(self, node_type: str, data: NodeBase) -> dict: 
-        with self.driver.session() as session:
-            query = f"""
-            CREATE (n:{node_type} {{ id: $id, {', '.join([f"{key}: ${key}" for key in data.dict().keys() if key != 'id'])} }})
-            RETURN n
-            """
-            return session.run(query, **data.dict()).single()
-
-    def update_node(self, node_type: str, node_id: str, updates: Dict, operation: str = "overwrite") -> dict:
-        with self.driver.session() as session:
-            if operation == "overwrite":
-                # Overwrite specified properties
-                update_string = ', '.join([f"{key}: ${key}" for key in updates.keys()])
-                query = f"""
-                MATCH (n:{node_type} {{ id: $id }})
-                SET n += {{ {update_string} }}
-                RETURN n
-                """
-                return session.run(query, id=node_id, **updates).single()
-            
-            elif operation == "remove":
-                # Remove (unset) specified properties
-                remove_string = ', '.join([f"n.{key} = null" for key in updates.keys()])
-                query = f"""
-                MATCH (n:{node_type} {{ id: $id }})
-                SET {remove_string}
-                RETURN n
-                """
-                return session.run(query, id=node_id).single()
-
-            elif operation == "append":
-                # Overwrite existing properties and add new properties
-                append_string = ', '.join([f"n.{key} = $value_{key}" for key in updates.keys()])
-                query = f"""
-                MATCH (n:{node_type} {{ id: $id }})
-                SET {append_string}
-                RETURN n
-                """
-                params = {f"value_{key}": value for key, value in updates.items()}
-                params["id"] = node_id
-                return session.run(query, **params).single()
-
-    def delete_node(self, node_type: str, node_id: str) -> None:
-        query = f"""
-        MATCH (n:{node_type} {{ id: $id }})
-        DETACH DELETE n
-        """
-        with self.driver.session() as session:
-            session.run(query, id=node_id)
-
-    def create_relationship( self, 
-            start_node_label: str = "Task", start_node_id: str = "", 
-            end_node_label: str = "Agent", end_node_id: str = "", 
-            relationship_type: str = "ASSIGNED_TO" ) -> None:
-
-        query = f"""
-        MATCH (start:{start_node_label} {{id: $start_id}}), (end:{end_node_label} {{id: $end_id}})
-        CREATE (start)-[:{relationship_type}]->(end)
-        """
-        with self.driver.session() as session:
-            session.run(query, start_id=start_node_id, end_id=end_node_id)
-            
-    def get_node(self, node_type: str, node_id: str) -> NodeBase:
-        with self.driver.session() as session:
-            result = session.run(f"MATCH (n:{node_type} {{id: $id}}) RETURN n", id=node_id).single()
-        return NodeBase(**result["n"])
-    
-    def get_nodes(self, node_type: str) -> list[NodeBase]:
-        with self.driver.session() as session:
-            results = session.run(f"MATCH (n:{node_type}) RETURN n").data()
-        return [NodeBase(**record["n"]) for record in results]
-    
-    def get_nodes(self, node_type: str, property_name: str, property_value: str) -> list[NodeBase]:
-        with self.driver.session() as session:
-            results = session.run(f"MATCH (n:{node_type} {{ {property_name}: $property_value }}) RETURN n", property_value=property_value).data()
-        return [NodeBase(**record["n"]) for record in results]
-    
-    def get_nodes(self, property_name: str, property_value: str) -> list[NodeBase]:
-        with self.driver.session() as session:
-            results = session.run(f"MATCH (n {{ {property_name}: $property_value }}) RETURN n", property_value=property_value).data()
-        return [NodeBase(**record["n"]) for record in results]
-    
-    def get_like_nodes(self, node_type: str, property_name: str, property_value: str) -> list[NodeBase]:
-        with self.driver.session() as session:
-            results = session.run(
-                f"""
-                MATCH (n:{node_type})
-                WHERE n.{property_name} CONTAINS $property_value
-                RETURN n
-                """, 
-                property_value=property_value
-            ).data()
-        return [NodeBase(**record["n"]) for record in results]
-    
-    def get_like_nodes(self, property_name: str, property_value: str) -> list[NodeBase]:
-        with self.driver.session() as session:
-            results = session.run(
-                f"""
-                MATCH (n)
-                WHERE n.{property_name} CONTAINS $property_value
-                RETURN n
-                """, 
-                property_value=property_value
-            ).data()
-        return [NodeBase(**record["n"]) for record in results]
-    
-    def node_exists(self, node_type: str, property_name: str, property_value: str) -> bool:
-        return node_exists(node_type, property_name, property_value)
-    
-    def node_exists(self, property_name: str, property_value: str) -> bool:
-        return node_exists(property_name, property_value)
\ No newline at end of file
+    def __init__(self, store: Optional[GraphStore] = None, cache: Optional[NodeCache] = node_cache):
+        self._store = store
+        self.cache = cache
+
+    @property
+    def store(self) -> GraphStore:
+        # Resolve the shared, lifespan-owned store (GRAPH_BACKEND) unless one was injected
+        return self._store or get_store()
+
+    @staticmethod
+    def _models(node_type: Optional[str], rows: Iterable[dict]) -> list[NodeBase]:
+        for overlay in _read_overlays:
+            rows = overlay(node_type, list(rows))
+        # Store rows were validated on write, so the label's model is built without validators
+        with timed_validation(node_type):
+            return trusted_node_model(node_type).construct_many(rows)
+
+    @timed
+    async def create_node(self, node_type: str, data: NodeBase) -> dict:
+        await self.store.ensure_label(node_type)
+        generated = not data.id
+        for attempt in range(settings.id_max_retries):
+            await id_allocator.assign(node_type, [data])
+            properties = self._properties(data)
+            try:
+                await self.store.create(node_type, properties)
+            except DuplicateNodeError:
+                # A caller-chosen id already took this one; only allocated ids are retried
+                if not generated or attempt == settings.id_max_retries - 1:
+                    raise
+                data.id = None
+                continue
+            await self._invalidate(node_type)
+            await self._embed(node_type, [properties])
+            await self._notify("create", node_type, data.id, properties)
+            return properties
+
+    @timed
+    async def create_nodes(self, node_type: str, data: Iterable[NodeBase],
+            link_property: Optional[str] = None, link_label: str = "Capability",
+            relationship_type: str = "CAN_EXECUTE", batch_size: Optional[int] = None) -> BulkResult:
+        """
+        Create many nodes with one store transaction (an UNWIND statement on Neo4j) per chunk.
+
+        Args:
+            node_type (str): Label of the new nodes.
+            data (Iterable[NodeBase]): The nodes to create.
+            link_property (str): Optional list property naming nodes to link to in the same
+                transaction (e.g. an Agent's "capabilities").
+            link_label (str): Label of the linked nodes.
+            relationship_type (str): Type of the created relationships.
+            batch_size (int): Rows per transaction, defaults to settings.bulk_batch_size.
+
+        Returns:
+            BulkResult: Per-item results; a failed chunk marks each of its items as failed.
+        """
+        batch_size = batch_size or settings.bulk_batch_size
+        data = list(data)
+        await self.store.ensure_label(node_type)
+        await id_allocator.assign(node_type, data)
+        names = [(getattr(node, link_property, None) or []) if link_property else [] for node in data]
+        resolved = await self.resolve_links(link_label, [name for node_names in names for name in node_names])
+        rows = [
+            {
+                "index": index,
+                "props": self._properties(node),
+                "links": [resolved[name] for name in names[index] if name in resolved],
+                "unresolved": [name for name in names[index] if name not in resolved],
+            }
+            for index, node in enumerate(data)
+        ]
+        unresolved = {row["index"]: row.pop("unresolved") for row in rows}
+        bulk = BulkResult()
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            try:
+                records = await self.store.create_many(node_type, chunk, link_label, relationship_type)
+            except Exception as e:
+                bulk.failed += len(chunk)
+                bulk.items.extend(
+                    BulkItemResult(index=row["index"], id=row["props"].get("id"), status="failed", error=str(e))
+                    for row in chunk
+                )
+                continue
+            await self._invalidate(node_type)
+            await self._embed(node_type, [row["props"] for row in chunk])
+            for row in chunk:
+                await self._notify("create", node_type, row["props"]["id"], row["props"])
+            bulk.created += len(records)
+            bulk.items.extend(
+                BulkItemResult(index=record["index"], id=record["id"], status="created",
+                               unresolved_links=unresolved[record["index"]])
+                for record in records
+            )
+        return bulk
+
+    async def resolve_links(self, link_label: str, names: Iterable[str]) -> dict[str, str]:
+        """
+        Map the names in a link property (e.g. an Agent's "capabilities") to node ids.
+
+        A name that is a node's id links to that node, otherwise to the node whose `name`
+        property equals it (the lowest id if several do). Names that match no node are left out.
+        """
+        names = set(names)
+        if not names:
+            return {}
+        existing = await self.store.get_many(link_label, list(names))
+        resolved = {name: name for name in names if name in existing}
+        for name in names - resolved.keys():
+            matches = await self.store.page(link_label, None, 1, {"name": name}, fields=["id"])
+            if matches:
+                resolved[name] = matches[0]["id"]
+        return resolved
+
+    async def link_node(self, node_type: str, node_id: str, names: Iterable[str], link_label: str = "Capability",
+            relationship_type: str = "CAN_EXECUTE") -> list[str]:
+        """
+        Relate a node to the nodes named in one of its link properties (see resolve_links).
+
+        Returns:
+            list[str]: The names that matched no node, so were not linked.
+        """
+        names = list(names)
+        resolved = await self.resolve_links(link_label, names)
+        for name in names:
+            if name in resolved:
+                await self.create_relationship(node_type, node_id, link_label, resolved[name], relationship_type)
+        unresolved = [name for name in names if name not in resolved]
+        if unresolved:
+            logger.warning("%s %s not linked to unknown %s nodes: %s", node_type, node_id, link_label, ", ".join(unresolved))
+        return unresolved
+
+    @staticmethod
+    def _properties(data: NodeBase) -> dict:
+        # Graph properties must be primitives or lists of primitives, so nested models are dropped
+        return {
+            key: value for key, value in data.model_dump(mode="json", exclude_none=True).items()
+            if not isinstance(value, dict)
+        }
+
+    async def _invalidate(self, node_type: str, *node_ids: str) -> None:
+        # Drop the written nodes and every cached list of their label
+        if self.cache is None:
+            return
+        for node_id in node_ids:
+            await self.cache.invalidate_node(node_type, node_id)
+        await self.cache.invalidate_lists(node_type)
+
+    async def _embed(self, node_type: str, nodes: list[dict]) -> None:
+        # The write itself succeeded, so a failed embedding is logged rather than raised
+        if node_type not in vector_store.labels:
+            return
+        try:
+            await vector_store.upsert(node_type, nodes)
+        except Exception as e:
+            logger.warning("Embedding %d %s nodes failed: %s", len(nodes), node_type, e)
+
+    async def _notify(self, event: str, node_type: str, node_id: str, properties: Optional[dict]) -> None:
+        for listener in _write_listeners:
+            try:
+                await listener(event, node_type, node_id, properties)
+            except Exception as e:
+                logger.warning("Write listener %s failed on %s %s: %s", listener.__qualname__, event, node_id, e)
+
+    @timed
+    async def update_node(self, node_type: str, node_id: str, updates: Dict, operation: str = "overwrite") -> Optional[dict]:
+        """
+        Set (`overwrite`, `append`) or unset (`remove`) properties of a node.
+
+        The updated node is validated against the label's model before it is written; an
+        update that would leave it invalid raises ValueError and writes nothing.
+
+        Returns:
+            dict: The node's new properties, or None if it does not exist.
+        """
+        updates = updates or {}
+        current = await self.get_node(node_type, node_id)
+        if current is None:
+            return None
+        trusted_node_model(node_type).validate_update(current, updates, operation)
+        properties = await self.store.update(node_type, node_id, updates, operation)
+        await self._invalidate(node_type, node_id)
+        if properties and {"name", "description"} & updates.keys():
+            await self._embed(node_type, [properties])
+        if properties:
+            await self._notify("update", node_type, node_id, properties)
+        return properties
+
+    @timed
+    async def update_nodes(self, node_type: str, rows: list[dict], link_label: Optional[str] = None,
+            relationship_type: Optional[str] = None) -> list[dict]:
+        """
+        Conditionally update many nodes in one store transaction (see GraphStore.update_many).
+
+        Rows carry the node's `id`, the properties to `set`, optionally the `expected` current
+        values and, with a `link_label`, the `link_id` of a node to connect it to.
+
+        Returns:
+            list[dict]: The new properties of every updated node.
+        """
+        updated = await self.store.update_many(node_type, rows, link_label, relationship_type)
+        await self._invalidate(node_type, *(properties["id"] for properties in updated))
+        for properties in updated:
+            await self._notify("update", node_type, properties["id"], properties)
+        return updated
+
+    @timed
+    async def delete_node(self, node_type: str, node_id: str) -> None:
+        await self.store.delete(node_type, node_id)
+        await self._invalidate(node_type, node_id)
+        vector_store.remove(node_type, node_id)
+        await self._notify("delete", node_type, node_id, None)
+
+    @timed
+    async def create_relationship( self,
+            start_node_label: str = "Task", start_node_id: str = "",
+            end_node_label: str = "Agent", end_node_id: str = "",
+            relationship_type: str = "ASSIGNED_TO", merge: bool = False ) -> bool:
+        """
+        Relate two nodes; with `merge`, an existing identical relationship is not duplicated.
+
+        Returns:
+            bool: False if the start or end node does not exist.
+        """
+        created = await self.store.relate(start_node_label, start_node_id, end_node_label, end_node_id, relationship_type, merge=merge)
+        if not created:
+            return False
+        if self.cache is not None:
+            await self.cache.invalidate_node(start_node_label, start_node_id)
+            await self.cache.invalidate_node(end_node_label, end_node_id)
+        await self._notify("relationship", start_node_label, start_node_id, {
+            "type": relationship_type, "end_label": end_node_label, "end_id": end_node_id
+        })
+        return True
+
+    @timed
+    async def get_node(self, node_type: str, node_id: str) -> Optional[NodeBase]:
+        if self.cache is not None:
+            cached = await self.cache.get(node_type, self.cache.node_key(node_type, node_id))
+            if cached is not None:
+                return self._models(node_type, [cached])[0]
+        properties = await self.store.get(node_type, node_id)
+        if properties is None:
+            return None
+        if self.cache is not None:
+            await self.cache.set(node_type, self.cache.node_key(node_type, node_id), properties)
+        return self._models(node_type, [properties])[0]
+
+    async def _cached_list(self, node_type: Optional[str], args: tuple, fetch: Callable[[], Awaitable[list[dict]]]) -> list[NodeBase]:
+        # Label-less reads cannot be invalidated by label, so they always go to the database
+        if self.cache is None or node_type is None:
+            return self._models(node_type, await fetch())
+        key = await self.cache.list_key(node_type, *args)
+        rows = await self.cache.get(node_type, key)
+        if rows is None:
+            rows = await fetch()
+            await self.cache.set(node_type, key, rows)
+        return self._models(node_type, rows)
+
+    @timed
+    async def get_nodes(self, node_type: Optional[str] = None, property_name: Optional[str] = None, property_value: Optional[str] = None) -> list[NodeBase]:
+        async def fetch() -> list[dict]:
+            return await self.store.find(node_type, {property_name: property_value} if property_name else {})
+
+        return await self._cached_list(node_type, ("nodes", property_name, property_value), fetch)
+
+    @timed
+    async def get_page(self, node_type: str, after: Optional[str] = None, limit: int = 100, filters: Optional[Dict] = None) -> list[NodeBase]:
+        """
+        Return up to `limit` nodes ordered by id, starting after the `after` cursor.
+        """
+        filters = filters or {}
+
+        async def fetch() -> list[dict]:
+            return await self.store.page(node_type, after, limit, filters)
+
+        return await self._cached_list(node_type, ("page", after, limit, filters), fetch)
+
+    @timed
+    async def stream_nodes(self, node_type: str, after: Optional[str] = None, filters: Optional[Dict] = None) -> AsyncIterator[dict]:
+        """
+        Yield node properties straight from the store's cursor, so memory stays constant.
+        """
+        async for properties in self.store.stream(node_type, after, filters):
+            for overlay in _read_overlays:
+                properties = overlay(node_type, [properties])[0]
+            yield properties
+
+    @timed
+    async def get_like_nodes(self, property_name: str, property_value: str, node_type: Optional[str] = None) -> list[NodeBase]:
+        return self._models(node_type, await self.store.like(property_name, property_value, node_type))
+
+    @timed
+    async def node_exists(self, property_name: str, property_value: str, node_type: Optional[str] = None) -> bool:
+        return await self.store.exists(node_type, property_name, property_value)
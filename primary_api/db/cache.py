@@ -0,0 +1,175 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from prometheus_client import Counter
+
+from ..config import settings
+
+# Initialize the Prometheus Counters
+cache_hit_counter      = Counter("node_cache_hits", "Node cache hits", ["label"])
+cache_miss_counter     = Counter("node_cache_misses", "Node cache misses", ["label"])
+cache_eviction_counter = Counter("node_cache_evictions", "Entries evicted from the node cache", ["reason"])
+
+
+class CacheBackend:
+    """
+    Key/value store used by NodeCache. Values are JSON-compatible.
+    """
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def counter(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU with per-entry expiry. Only valid for a single API worker.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            cache_eviction_counter.labels(reason="expired").inc()
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            cache_eviction_counter.labels(reason="size").inc()
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Shared store for deployments with several API workers. Eviction is left to Redis
+    (TTL per key plus its configured maxmemory policy).
+    """
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self._redis.get(key)
+        return None if value is None else json.loads(value)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._redis.set(key, json.dumps(value, default=str), px=int(ttl * 1000))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        return await self._redis.incr(key)
+
+    async def counter(self, key: str) -> int:
+        return int(await self._redis.get(key) or 0)
+
+
+class NodeCache:
+    """
+    Read-through cache for NodeManager reads.
+
+    Single nodes are keyed by label and id. List results are keyed under a per-label
+    generation number: any write to a label bumps the generation, which orphans every
+    cached list for that label in O(1) while leaving unrelated labels untouched.
+    """
+
+    def __init__(self, backend: CacheBackend, default_ttl: float, ttl_overrides: Optional[dict[str, float]] = None):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.ttl_overrides = ttl_overrides or {}
+
+    def ttl(self, label: str) -> float:
+        return self.ttl_overrides.get(label, self.default_ttl)
+
+    @staticmethod
+    def node_key(label: str, node_id: str) -> str:
+        return f"node:{label}:{node_id}"
+
+    async def list_key(self, label: str, *args: Any) -> str:
+        generation = await self.backend.counter(f"gen:{label}")
+        return f"list:{label}:{generation}:{json.dumps(args, sort_keys=True, default=str)}"
+
+    async def get(self, label: str, key: str) -> Optional[Any]:
+        value = await self.backend.get(key)
+        (cache_miss_counter if value is None else cache_hit_counter).labels(label=label).inc()
+        return value
+
+    async def set(self, label: str, key: str, value: Any) -> None:
+        await self.backend.set(key, value, self.ttl(label))
+
+    async def invalidate_node(self, label: str, node_id: str) -> None:
+        await self.backend.delete(self.node_key(label, node_id))
+
+    async def invalidate_nodes(self, label: str, node_ids: list[str]) -> None:
+        await self.backend.delete(*(self.node_key(label, node_id) for node_id in node_ids))
+
+    async def invalidate_lists(self, label: str) -> None:
+        await self.backend.incr(f"gen:{label}")
+
+
+def _parse_ttl_overrides(value: str) -> dict[str, float]:
+    # "Task=5,Agent=60" -> {"Task": 5.0, "Agent": 60.0}
+    overrides = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        label, ttl = item.split("=", 1)
+        overrides[label.strip()] = float(ttl)
+    return overrides
+
+
+def build_node_cache() -> Optional[NodeCache]:
+    """
+    Build the cache selected by settings.cache_backend, or None when caching is disabled.
+    """
+    if settings.cache_backend == "none":
+        return None
+    if settings.cache_backend == "redis":
+        backend = RedisCacheBackend(settings.redis_url)
+    else:
+        backend = MemoryCacheBackend(settings.cache_max_entries)
+    return NodeCache(backend, settings.cache_ttl, _parse_ttl_overrides(settings.cache_ttl_overrides))
+
+
+# Shared by every NodeManager in the process
+node_cache = build_node_cache()
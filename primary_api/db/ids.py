@@ -0,0 +1,59 @@
+import asyncio
+import re
+from typing import Iterable, Optional
+
+from ..config import settings
+from ..models.models import NodeBase
+from .store import get_store
+
+
+def slugify(name: str) -> str:
+    """
+    Convert a human readable name into the id prefix used for nodes (e.g. "Web Search" -> "web_search").
+    """
+    return re.sub(r"\W+", "_", name.strip().lower())
+
+
+class IdAllocator:
+    """
+    Hands out node ids without touching the graph per node.
+
+    Each label has an atomic counter in the graph store (an `IdCounter` node on Neo4j). A
+    worker reserves a block of sequence numbers in one write and then serves ids from memory,
+    so concurrent workers never share a suffix and bulk creates need a single round trip.
+    """
+
+    def __init__(self, block_size: Optional[int] = None):
+        self.block_size = block_size or settings.id_block_size
+        # label -> (next sequence number, end of the reserved block)
+        self._blocks: dict[str, tuple[int, int]] = {}
+        self._lock = asyncio.Lock()
+
+    async def next_ids(self, label: str, count: int = 1) -> list[int]:
+        """
+        Return `count` unique sequence numbers for a label, reserving new blocks as needed.
+        """
+        async with self._lock:
+            start, end = self._blocks.get(label, (0, 0))
+            if end - start < count:
+                # Discard the remainder of the current block rather than stitching two blocks
+                start, end = await self._reserve(label, max(self.block_size, count))
+            self._blocks[label] = (start + count, end)
+        return list(range(start, start + count))
+
+    async def assign(self, label: str, nodes: Iterable[NodeBase]) -> None:
+        """
+        Set an id on every node that does not have one yet.
+        """
+        pending = [node for node in nodes if not node.id]
+        if not pending:
+            return
+        for node, sequence in zip(pending, await self.next_ids(label, len(pending))):
+            node.id = f"{slugify(node.name)}_{sequence}"
+
+    async def _reserve(self, label: str, size: int) -> tuple[int, int]:
+        return await get_store().reserve_ids(label, size)
+
+
+# Shared by every NodeManager in the process
+id_allocator = IdAllocator()
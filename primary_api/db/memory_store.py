@@ -0,0 +1,477 @@
+import asyncio
+import bisect
+import json
+import os
+import re
+from collections import defaultdict
+from typing import Any, AsyncIterator, Iterable, Optional
+
+from ..config import settings
+from ..models.models import TaskStatus
+from ..utils.logger import get_logger
+from .schema import DEFAULT_LABELS, FULLTEXT_PROPERTIES, INDEXED_PROPERTIES, validate_label
+from .store import DuplicateNodeError, GraphStore
+
+logger = get_logger(__name__)
+
+SNAPSHOT_VERSION = 1
+# Rows taken per step of a stream, so writes between steps never shift the cursor
+STREAM_CHUNK_SIZE = 500
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _indexable(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool))
+
+
+def _discard(ids: list[str], node_id: str) -> None:
+    position = bisect.bisect_left(ids, node_id)
+    if position < len(ids) and ids[position] == node_id:
+        del ids[position]
+
+
+class MemoryStore(GraphStore):
+    """
+    Embedded GraphStore that keeps the whole graph in the API process.
+
+    Nodes live in per-label dicts keyed by id, next to a sorted id list per label for keyset
+    pages and a sorted id list per value of every indexed property (`status`, `name`), so a
+    filtered page is a bisect seek instead of a scan. Relationships are kept as outgoing and
+    incoming adjacency lists per node. Nothing is shared between processes, so it suits a
+    single API worker, tests and benchmarks.
+
+    With GRAPH_SNAPSHOT_PATH set, the graph is loaded from a JSON snapshot on start and written
+    back every GRAPH_SNAPSHOT_INTERVAL seconds (when it changed) and on close.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None, snapshot_interval: Optional[float] = None):
+        self.snapshot_path = settings.graph_snapshot_path if snapshot_path is None else snapshot_path
+        self.snapshot_interval = snapshot_interval or settings.graph_snapshot_interval
+        self._labels = list(DEFAULT_LABELS)
+        self._clear()
+        # Bumped by every write; a snapshot is only written when it moved
+        self._changes = 0
+        self._saved_changes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _clear(self) -> None:
+        self._nodes: dict[str, dict[str, dict]] = defaultdict(dict)
+        self._ids: dict[str, list[str]] = defaultdict(list)
+        # (label, property) -> value -> sorted ids of the nodes with that value
+        self._index: dict[tuple[str, str], dict[Any, list[str]]] = defaultdict(dict)
+        # (label, id) -> [(relationship type, other label, other id)]
+        self._out: dict[tuple[str, str], list[tuple[str, str, str]]] = defaultdict(list)
+        self._in: dict[tuple[str, str], list[tuple[str, str, str]]] = defaultdict(list)
+        self._embeddings: dict[str, dict[str, list[float]]] = defaultdict(dict)
+        self._counters: dict[str, int] = {}
+
+    #region Lifecycle
+
+    async def start(self) -> None:
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            data = await asyncio.to_thread(self._read, self.snapshot_path)
+            self._restore(data)
+            logger.info("Graph loaded from %s: %d nodes", self.snapshot_path, self._node_count())
+        if self.snapshot_path and self._task is None:
+            self._task = asyncio.create_task(self._snapshot_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.snapshot_path and self._changes != self._saved_changes:
+            await self.save_snapshot()
+
+    async def ensure_label(self, label: str) -> None:
+        validate_label(label)
+        if label not in self._labels:
+            self._labels.append(label)
+
+    @property
+    def labels(self) -> list[str]:
+        return self._labels
+
+    async def health(self) -> dict:
+        return {
+            "backend": "memory",
+            "node_count": self._node_count(),
+            "snapshot_path": self.snapshot_path or None,
+            "unsaved_changes": self._changes - self._saved_changes,
+        }
+
+    #endregion
+
+    #region Snapshots
+
+    async def save_snapshot(self) -> None:
+        """
+        Write the graph to GRAPH_SNAPSHOT_PATH, replacing the previous snapshot atomically.
+        """
+        changes = self._changes
+        # Copied on the event loop so the thread never sees a graph that is being written to
+        data = self._dump()
+        await asyncio.to_thread(self._write, self.snapshot_path, data)
+        self._saved_changes = changes
+
+    async def _snapshot_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            if self._changes == self._saved_changes:
+                continue
+            try:
+                await self.save_snapshot()
+            except Exception as e:
+                logger.warning("Graph snapshot to %s failed: %s", self.snapshot_path, e)
+
+    def _dump(self) -> dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "labels": list(self._labels),
+            "nodes": {label: [dict(node) for node in nodes.values()] for label, nodes in self._nodes.items() if nodes},
+            "relationships": [
+                [label, node_id, rel_type, end_label, end_id]
+                for (label, node_id), edges in self._out.items() for rel_type, end_label, end_id in edges
+            ],
+            "embeddings": {label: dict(vectors) for label, vectors in self._embeddings.items() if vectors},
+            "counters": dict(self._counters),
+        }
+
+    def _restore(self, data: dict) -> None:
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported graph snapshot version: {data.get('version')!r}")
+        self._clear()
+        for label in data["labels"]:
+            if label not in self._labels:
+                self._labels.append(label)
+        for label, nodes in data["nodes"].items():
+            self._nodes[label] = {node["id"]: node for node in nodes}
+            self._ids[label] = sorted(self._nodes[label])
+            for node in nodes:
+                for prop in INDEXED_PROPERTIES:
+                    if _indexable(node.get(prop)):
+                        self._index[(label, prop)].setdefault(node[prop], []).append(node["id"])
+        for values in self._index.values():
+            for ids in values.values():
+                ids.sort()
+        for label, node_id, rel_type, end_label, end_id in data["relationships"]:
+            self._out[(label, node_id)].append((rel_type, end_label, end_id))
+            self._in[(end_label, end_id)].append((rel_type, label, node_id))
+        for label, vectors in data["embeddings"].items():
+            self._embeddings[label] = vectors
+        self._counters = data["counters"]
+        self._changes = self._saved_changes = 0
+
+    @staticmethod
+    def _read(path: str) -> dict:
+        with open(path) as file:
+            return json.load(file)
+
+    @staticmethod
+    def _write(path: str, data: dict) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temporary, path)
+
+    #endregion
+
+    #region Internal indexes
+
+    def _node_count(self) -> int:
+        return sum(len(nodes) for nodes in self._nodes.values())
+
+    def _index_add(self, label: str, node: dict) -> None:
+        for prop in INDEXED_PROPERTIES:
+            if _indexable(node.get(prop)):
+                bisect.insort(self._index[(label, prop)].setdefault(node[prop], []), node["id"])
+
+    def _index_remove(self, label: str, node: dict) -> None:
+        for prop in INDEXED_PROPERTIES:
+            if _indexable(node.get(prop)):
+                values = self._index[(label, prop)]
+                ids = values.get(node[prop])
+                if ids is not None:
+                    _discard(ids, node["id"])
+                    if not ids:
+                        del values[node[prop]]
+
+    def _insert(self, label: str, node: dict) -> None:
+        self._nodes[label][node["id"]] = node
+        bisect.insort(self._ids[label], node["id"])
+        self._index_add(label, node)
+        self._changes += 1
+
+    def _replace(self, label: str, old: dict, new: dict) -> None:
+        self._index_remove(label, old)
+        self._nodes[label][new["id"]] = new
+        self._index_add(label, new)
+        self._changes += 1
+
+    def _remove(self, label: str, node_id: str) -> bool:
+        node = self._nodes.get(label, {}).pop(node_id, None)
+        if node is None:
+            return False
+        _discard(self._ids[label], node_id)
+        self._index_remove(label, node)
+        self._embeddings.get(label, {}).pop(node_id, None)
+        # Detach: drop the node's edges from the adjacency lists of its neighbours too
+        for rel_type, other_label, other_id in self._out.pop((label, node_id), []):
+            self._in[(other_label, other_id)].remove((rel_type, label, node_id))
+        for rel_type, other_label, other_id in self._in.pop((label, node_id), []):
+            self._out[(other_label, other_id)].remove((rel_type, label, node_id))
+        self._changes += 1
+        return True
+
+    def _link(self, start_label: str, start_id: str, end_label: str, end_id: str, relationship_type: str) -> None:
+        self._out[(start_label, start_id)].append((relationship_type, end_label, end_id))
+        self._in[(end_label, end_id)].append((relationship_type, start_label, start_id))
+        self._changes += 1
+
+    def _has(self, label: str, node_id: str) -> bool:
+        return node_id in self._nodes.get(label, {})
+
+    def _all_labels(self, label: Optional[str]) -> list[str]:
+        return [label] if label else list(self._nodes)
+
+    @staticmethod
+    def _project(node: dict, fields: Optional[Iterable[str]]) -> dict:
+        if not fields:
+            return dict(node)
+        return {field: node.get(field) for field in dict.fromkeys(["id", *fields])}
+
+    def _select(self, label: str, after: Optional[str], limit: Optional[int], filters: dict,
+                fields: Optional[Iterable[str]]) -> list[dict]:
+        # Walk the sorted ids of the first indexed filter, or of the whole label
+        ids = self._ids.get(label, [])
+        for key, value in filters.items():
+            if key in INDEXED_PROPERTIES and _indexable(value):
+                ids = self._index.get((label, key), {}).get(value, [])
+                break
+        nodes = self._nodes.get(label, {})
+        rows = []
+        for position in range(bisect.bisect_right(ids, after) if after is not None else 0, len(ids)):
+            node = nodes[ids[position]]
+            if all(node.get(key) == value for key, value in filters.items()):
+                rows.append(self._project(node, fields))
+                if limit is not None and len(rows) >= limit:
+                    break
+        return rows
+
+    #endregion
+
+    #region GraphStore
+
+    async def reserve_ids(self, label: str, size: int) -> tuple[int, int]:
+        start = self._counters.get(label, 1)
+        self._counters[label] = start + size
+        self._changes += 1
+        return start, start + size
+
+    async def id_counters(self) -> dict[str, int]:
+        return dict(self._counters)
+
+    async def restore_id_counters(self, counters: dict[str, int]) -> None:
+        for label, value in counters.items():
+            self._counters[label] = max(self._counters.get(label, 1), value)
+        self._changes += 1
+
+    async def create(self, label: str, properties: dict) -> None:
+        if self._has(label, properties["id"]):
+            raise DuplicateNodeError(f"{label} {properties['id']} already exists")
+        self._insert(label, dict(properties))
+
+    async def create_many(self, label: str, rows: list[dict], link_label: str, relationship_type: str) -> list[dict]:
+        # All or nothing, like one Neo4j transaction
+        ids = [row["props"]["id"] for row in rows]
+        duplicates = {node_id for node_id in ids if self._has(label, node_id)}
+        if duplicates or len(set(ids)) != len(ids):
+            raise DuplicateNodeError(f"{label} ids already exist: {', '.join(sorted(duplicates)) or 'within the batch'}")
+        for row in rows:
+            node_id = row["props"]["id"]
+            self._insert(label, dict(row["props"]))
+            for link_id in row.get("links") or []:
+                if self._has(link_label, link_id):
+                    self._link(label, node_id, link_label, link_id, relationship_type)
+        return [{"index": row["index"], "id": row["props"]["id"]} for row in rows]
+
+    async def upsert_many(self, label: str, rows: list[dict]) -> int:
+        nodes = self._nodes[label]
+        for row in rows:
+            node = nodes.get(row["id"])
+            if node is None:
+                self._insert(label, dict(row))
+            else:
+                self._replace(label, node, dict(row))
+        return len(rows)
+
+    async def update(self, label: str, node_id: str, updates: dict, operation: str = "overwrite") -> Optional[dict]:
+        node = self._nodes.get(label, {}).get(node_id)
+        if node is None:
+            return None
+        new = dict(node)
+        for key, value in updates.items():
+            # Setting a property to null removes it, as in Neo4j
+            if operation == "remove" or value is None:
+                new.pop(key, None)
+            else:
+                new[key] = value
+        self._replace(label, node, new)
+        return dict(new)
+
+    async def update_many(self, label: str, rows: list[dict], link_label: Optional[str] = None,
+                          relationship_type: Optional[str] = None) -> list[dict]:
+        nodes = self._nodes.get(label, {})
+        updated = []
+        for row in rows:
+            node = nodes.get(row["id"])
+            if node is None or any(node.get(key) != value for key, value in (row.get("expected") or {}).items()):
+                continue
+            if link_label and not self._has(link_label, row["link_id"]):
+                continue
+            new = {**node, **row["set"]}
+            self._replace(label, node, {key: value for key, value in new.items() if value is not None})
+            if link_label:
+                self._link(label, row["id"], link_label, row["link_id"], relationship_type)
+            updated.append(dict(nodes[row["id"]]))
+        return updated
+
+    async def delete(self, label: str, node_id: str) -> None:
+        self._remove(label, node_id)
+
+    async def delete_many(self, label: str, node_ids: list[str]) -> int:
+        return sum(self._remove(label, node_id) for node_id in node_ids)
+
+    async def relate(self, start_label: str, start_id: str, end_label: str, end_id: str,
+                     relationship_type: str, merge: bool = False) -> bool:
+        if not self._has(start_label, start_id) or not self._has(end_label, end_id):
+            return False
+        if not merge or (relationship_type, end_label, end_id) not in self._out.get((start_label, start_id), []):
+            self._link(start_label, start_id, end_label, end_id, relationship_type)
+        return True
+
+    async def relate_many(self, rows: list[list[str]]) -> int:
+        count = 0
+        for start_label, start_id, rel_type, end_label, end_id in rows:
+            count += await self.relate(start_label, start_id, end_label, end_id, rel_type, merge=True)
+        return count
+
+    async def stream_relationships(self, label: str) -> AsyncIterator[list[str]]:
+        for node_id in list(self._ids.get(label, [])):
+            for rel_type, end_label, end_id in list(self._out.get((label, node_id), [])):
+                yield [node_id, rel_type, end_label, end_id]
+
+    async def relationships(self, label: str, node_id: str) -> list[dict]:
+        return [
+            {"relationship_type": rel_type, "end_node_labels": [end_label], "end_node_id": end_id}
+            for rel_type, end_label, end_id in self._out.get((label, node_id), [])
+        ]
+
+    async def expand(self, nodes: list[tuple[str, str]], direction: str = "out",
+                     relationship_types: Optional[list[str]] = None, fan_out: int = 1000,
+                     fields: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> list[dict]:
+        types = set(relationship_types or ())
+        sides = {"out": ((self._out, True),), "in": ((self._in, False),), "both": ((self._out, True), (self._in, False))}[direction]
+        rows = []
+        for source in nodes:
+            followed = 0
+            for adjacency, outgoing in sides:
+                for rel_type, label, node_id in adjacency.get(source, ()):
+                    if followed >= fan_out or (limit is not None and len(rows) >= limit):
+                        break
+                    if types and rel_type not in types:
+                        continue
+                    rows.append({"source": source, "type": rel_type, "outgoing": outgoing, "label": label,
+                                 "node": self._project(self._nodes[label][node_id], fields)})
+                    followed += 1
+        return rows
+
+    async def get(self, label: str, node_id: str) -> Optional[dict]:
+        node = self._nodes.get(label, {}).get(node_id)
+        return None if node is None else dict(node)
+
+    async def get_many(self, label: str, node_ids: list[str]) -> dict[str, dict]:
+        nodes = self._nodes.get(label, {})
+        return {node_id: dict(nodes[node_id]) for node_id in node_ids if node_id in nodes}
+
+    async def find(self, label: Optional[str] = None, filters: Optional[dict] = None) -> list[dict]:
+        filters = filters or {}
+        return [row for name in self._all_labels(label) for row in self._select(name, None, None, filters, None)]
+
+    async def exists(self, label: Optional[str], property_name: str, property_value) -> bool:
+        if property_name == "id":
+            return any(self._has(name, property_value) for name in self._all_labels(label))
+        return any(self._select(name, None, 1, {property_name: property_value}, ["id"]) for name in self._all_labels(label))
+
+    async def page(self, label: str, after: Optional[str] = None, limit: int = 100, filters: Optional[dict] = None,
+                   fields: Optional[Iterable[str]] = None) -> list[dict]:
+        return self._select(label, after, limit, filters or {}, fields)
+
+    async def stream(self, label: str, after: Optional[str] = None, filters: Optional[dict] = None,
+                     fields: Optional[Iterable[str]] = None) -> AsyncIterator[dict]:
+        while True:
+            rows = self._select(label, after, STREAM_CHUNK_SIZE, filters or {}, fields)
+            for row in rows:
+                yield row
+            if len(rows) < STREAM_CHUNK_SIZE:
+                return
+            after = rows[-1]["id"]
+
+    async def like(self, property_name: str, property_value: str, label: Optional[str] = None) -> list[dict]:
+        return [
+            dict(node) for name in self._all_labels(label) for node in self._nodes.get(name, {}).values()
+            if property_value in str(node.get(property_name, ""))
+        ]
+
+    async def search(self, text: str, labels: Optional[Iterable[str]] = None, limit: int = 20) -> list[dict]:
+        # A scan scored like the full-text indexes: whole words count 1, word prefixes 0.5
+        labels = [validate_label(label) for label in (labels or self._labels)]
+        unknown = set(labels) - set(self._labels)
+        if unknown:
+            raise ValueError(f"No full-text index for labels: {', '.join(sorted(unknown))}")
+        terms = _TOKEN_PATTERN.findall(text.lower())
+        hits = []
+        for label in labels:
+            for node in self._nodes.get(label, {}).values():
+                words = set(_TOKEN_PATTERN.findall(" ".join(str(node.get(prop) or "") for prop in FULLTEXT_PROPERTIES).lower()))
+                score = sum(
+                    1.0 if term in words else 0.5 if any(word.startswith(term) for word in words) else 0.0
+                    for term in terms
+                )
+                if score:
+                    hits.append({"label": label, "score": score, "node": dict(node)})
+        hits.sort(key=lambda hit: -hit["score"])
+        return hits[:limit]
+
+    async def set_embeddings(self, label: str, rows: list[dict]) -> None:
+        for row in rows:
+            if self._has(label, row["id"]):
+                self._embeddings[label][row["id"]] = row["vector"]
+        self._changes += 1
+
+    async def embeddings(self, label: str) -> AsyncIterator[tuple[str, list[float]]]:
+        for node_id, vector in list(self._embeddings.get(label, {}).items()):
+            yield node_id, vector
+
+    async def stats(self) -> dict:
+        relationship_types: dict[str, int] = defaultdict(int)
+        for edges in self._out.values():
+            for rel_type, _, _ in edges:
+                relationship_types[rel_type] += 1
+        statuses = self._index.get(("Task", "status"), {})
+        return {
+            "node_count": self._node_count(),
+            "relationship_count": sum(relationship_types.values()),
+            "labels": {label: len(nodes) for label, nodes in self._nodes.items() if nodes},
+            "relationship_types": dict(relationship_types),
+            "task_status": {status.value: len(statuses.get(status.value, [])) for status in TaskStatus},
+        }
+
+    #endregion
@@ -1,57 +1,59 @@
-from neo4j import GraphDatabase
+from typing import Optional
+
+from neo4j import AsyncDriver, AsyncGraphDatabase
+
+from ..config import settings
+from ..utils.instrumentation import InstrumentedSession
 
 # from ..models.models import NodeBase
 
-def get_neo4j_driver():
-    uri = "bolt://neo4j:7687"
-    user = "neo4j"
-    password = "password"
-    return GraphDatabase.driver(uri, auth=(user, password))
-
-def node_exists(label: str, property_name: str, property_value: str) -> bool:
-    """
-    Check if a node with a specific label and property exists in Neo4j.
-    
-    Args:
-        label (str): The label of the node (e.g., "Task", "Agent").
-        property_name (str): The property to match (e.g., "id").
-        property_value (str): The value of the property to search for.
-    
+# Process-wide driver, owned by the app lifespan (see main.py)
+_driver: Optional[AsyncDriver] = None
+
+def init_neo4j_driver() -> AsyncDriver:
+    """
+    Create the shared, pooled async driver if it does not exist yet.
+
     Returns:
-        bool: True if the node exists, False otherwise.
-    """
-    driver = get_neo4j_driver()
-    query = f"MATCH (n:{label} {{{property_name}: $value}}) RETURN n"
-    with driver.session() as session:
-        result = session.run(query, {"value": property_value})
-        return result.single() is not None
-    
-def node_exists(property_name: str, property_value: str) -> bool:
-        """
-        Check if a node exists with a given property value, regardless of label.
-
-        :param property_name: The name of the property to check (e.g., 'id', 'name').
-        :param property_value: The value of the property to match.
-        :return: True if a node exists with the given property, False otherwise.
-        """
-        query = f"""
-        MATCH (n)
-        WHERE n.{property_name} = $property_value
-        RETURN COUNT(n) > 0 AS exists
-        """
-        driver = get_neo4j_driver()
-        with driver.session() as session:
-            result = session.run(query, property_value=property_value).single()
-            return result["exists"]
-        
-def get_like_nodes(self, node_type: str, property_name: str, property_value: str) -> list[dict]:
-        with self.driver.session() as session:
-            results = session.run(
-                f"""
-                MATCH (n:{node_type})
-                WHERE n.{property_name} CONTAINS $property_value
-                RETURN n
-                """, 
-                property_value=property_value
-            ).data()
-        return [record["n"] for record in results]
\ No newline at end of file
+        AsyncDriver: The process-wide driver.
+    """
+    global _driver
+    if _driver is None:
+        _driver = AsyncGraphDatabase.driver(
+            settings.neo4j_uri,
+            auth=(settings.neo4j_user, settings.neo4j_password),
+            max_connection_pool_size=settings.neo4j_max_pool_size,
+            connection_acquisition_timeout=settings.neo4j_acquisition_timeout,
+            max_connection_lifetime=settings.neo4j_max_connection_lifetime,
+        )
+    return _driver
+
+async def close_neo4j_driver() -> None:
+    """
+    Close the shared driver and release every pooled connection.
+    """
+    global _driver
+    if _driver is not None:
+        await _driver.close()
+        _driver = None
+
+def get_neo4j_driver() -> AsyncDriver:
+    """
+    Return the shared driver, creating it lazily outside of the app lifespan.
+    """
+    return _driver or init_neo4j_driver()
+
+# Internal properties that are never returned to API clients
+HIDDEN_PROPERTIES = frozenset({"embedding"})
+
+def visible_properties(node) -> dict:
+    """
+    Copy a node's properties without the internal ones (e.g. its embedding vector).
+    """
+    return {key: value for key, value in dict(node).items() if key not in HIDDEN_PROPERTIES}
+
+def get_session(**kwargs):
+    """
+    Open an async session on the configured database, with its queries timed.
+    """
+    return InstrumentedSession(get_neo4j_driver().session(database=settings.neo4j_database, **kwargs))
@@ -0,0 +1,471 @@
+from typing import AsyncIterator, Iterable, Optional
+
+from neo4j import READ_ACCESS
+from neo4j.exceptions import ClientError, ConstraintError
+
+from ..models.models import TaskStatus
+from ..utils.logger import get_logger
+from .neo4j import close_neo4j_driver, get_session, init_neo4j_driver, visible_properties
+from .schema import schema_manager, validate_label
+from .search import get_like_nodes, search_nodes
+from .store import DuplicateNodeError, GraphStore
+
+logger = get_logger(__name__)
+
+EMBEDDING_PROPERTY = "embedding"
+
+
+def _quote(name: str) -> str:
+    # Labels and types come from the database itself, but may still need quoting
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _vector_index_name(label: str) -> str:
+    return f"{label.lower()}_embedding"
+
+
+class Neo4jStore(GraphStore):
+    """
+    GraphStore on the shared Neo4j driver. Every operation is one parameterized Cypher statement
+    (or one managed transaction), so batches cost a single round trip.
+    """
+
+    supports_cypher = True
+
+    async def start(self) -> None:
+        init_neo4j_driver()
+
+    async def close(self) -> None:
+        await close_neo4j_driver()
+
+    async def ensure_schema(self) -> None:
+        await schema_manager.ensure()
+
+    async def ensure_label(self, label: str) -> None:
+        await schema_manager.ensure_label(label)
+
+    @property
+    def labels(self) -> list[str]:
+        return schema_manager.labels
+
+    async def health(self) -> dict:
+        async with get_session() as session:
+            result = await session.run("RETURN 1")
+            await result.consume()
+        indexes = await schema_manager.index_status()
+        return {
+            "backend": "neo4j",
+            "indexes_online": all(index["state"] == "ONLINE" for index in indexes),
+            "indexes": indexes,
+        }
+
+    async def reserve_ids(self, label: str, size: int) -> tuple[int, int]:
+        query = """
+        MERGE (c:IdCounter {label: $label})
+        ON CREATE SET c.next = 1
+        SET c.next = c.next + $size
+        RETURN c.next - $size AS start, c.next AS end
+        """
+
+        async def reserve(tx):
+            result = await tx.run(query, label=label, size=size)
+            return await result.single()
+
+        async with get_session() as session:
+            record = await session.execute_write(reserve)
+        return record["start"], record["end"]
+
+    async def id_counters(self) -> dict[str, int]:
+        async with get_session() as session:
+            result = await session.run("MATCH (c:IdCounter) RETURN c.label AS label, c.next AS next")
+            return {record["label"]: record["next"] async for record in result}
+
+    async def restore_id_counters(self, counters: dict[str, int]) -> None:
+        async with get_session() as session:
+            result = await session.run(
+                """
+                UNWIND $rows AS row
+                MERGE (c:IdCounter {label: row.label})
+                SET c.next = CASE WHEN c.next IS NULL OR c.next < row.next THEN row.next ELSE c.next END
+                """,
+                rows=[{"label": label, "next": value} for label, value in counters.items()]
+            )
+            await result.consume()
+
+    async def create(self, label: str, properties: dict) -> None:
+        async with get_session() as session:
+            try:
+                result = await session.run(f"CREATE (n:{label}) SET n = $props", props=properties)
+                await result.consume()
+            except ConstraintError as e:
+                raise DuplicateNodeError(e.message) from e
+
+    async def create_many(self, label: str, rows: list[dict], link_label: str, relationship_type: str) -> list[dict]:
+        query = f"""
+        UNWIND $rows AS row
+        CREATE (n:{label})
+        SET n = row.props
+        WITH n, row
+        CALL {{
+            WITH n, row
+            UNWIND row.links AS link_id
+            MATCH (m:{link_label} {{id: link_id}})
+            CREATE (n)-[:{relationship_type}]->(m)
+            RETURN count(m) AS linked
+        }}
+        RETURN row.index AS index, n.id AS id
+        """
+
+        async def write(tx):
+            result = await tx.run(query, rows=rows)
+            return await result.data()
+
+        async with get_session() as session:
+            return await session.execute_write(write)
+
+    async def upsert_many(self, label: str, rows: list[dict]) -> int:
+        query = f"""
+        UNWIND $rows AS row
+        MERGE (n:{label} {{id: row.id}})
+        SET n = row
+        RETURN count(*) AS count
+        """
+
+        async def write(tx):
+            result = await tx.run(query, rows=rows)
+            return (await result.single())["count"]
+
+        async with get_session() as session:
+            return await session.execute_write(write)
+
+    async def update(self, label: str, node_id: str, updates: dict, operation: str = "overwrite") -> Optional[dict]:
+        if operation == "remove":
+            # Remove (unset) specified properties
+            assignments = ", ".join(f"n.{key} = null" for key in updates)
+        else:
+            # Overwrite existing properties and add new ones
+            assignments = ", ".join(f"n.{key} = $props.{key}" for key in updates)
+        query = f"""
+        MATCH (n:{label} {{id: $id}})
+        {f"SET {assignments}" if assignments else ""}
+        RETURN n
+        """
+        async with get_session() as session:
+            result = await session.run(query, id=node_id, props=updates)
+            record = await result.single()
+        return None if record is None else visible_properties(record["n"])
+
+    async def update_many(self, label: str, rows: list[dict], link_label: Optional[str] = None,
+                          relationship_type: Optional[str] = None) -> list[dict]:
+        rows = [{"expected": {}, **row} for row in rows]
+        query = f"""
+        UNWIND $rows AS row
+        MATCH (n:{label} {{id: row.id}})
+        WHERE all(key IN keys(row.expected) WHERE n[key] = row.expected[key])
+        {f"MATCH (m:{link_label} {{id: row.link_id}})" if link_label else ""}
+        SET n += row.set
+        {f"CREATE (n)-[:{relationship_type}]->(m)" if link_label else ""}
+        RETURN n
+        """
+
+        async def write(tx):
+            result = await tx.run(query, rows=rows)
+            return [visible_properties(record["n"]) async for record in result]
+
+        async with get_session() as session:
+            return await session.execute_write(write)
+
+    async def delete(self, label: str, node_id: str) -> None:
+        async with get_session() as session:
+            result = await session.run(f"MATCH (n:{label} {{id: $id}}) DETACH DELETE n", id=node_id)
+            await result.consume()
+
+    async def delete_many(self, label: str, node_ids: list[str]) -> int:
+        async with get_session() as session:
+            result = await session.run(
+                f"UNWIND $ids AS id MATCH (n:{label} {{id: id}}) DETACH DELETE n RETURN count(*) AS count", ids=node_ids
+            )
+            return (await result.single())["count"]
+
+    async def relate(self, start_label: str, start_id: str, end_label: str, end_id: str,
+                     relationship_type: str, merge: bool = False) -> bool:
+        query = f"""
+        MATCH (start:{start_label} {{id: $start_id}}), (end:{end_label} {{id: $end_id}})
+        {"MERGE" if merge else "CREATE"} (start)-[:{relationship_type}]->(end)
+        RETURN count(*) AS count
+        """
+        async with get_session() as session:
+            result = await session.run(query, start_id=start_id, end_id=end_id)
+            return (await result.single())["count"] > 0
+
+    async def relate_many(self, rows: list[list[str]]) -> int:
+        groups: dict[tuple[str, str, str], list[list[str]]] = {}
+        for start_label, start_id, rel_type, end_label, end_id in rows:
+            key = (validate_label(start_label), validate_label(rel_type), validate_label(end_label))
+            groups.setdefault(key, []).append([start_id, end_id])
+
+        async def write(tx):
+            count = 0
+            # One UNWIND per (start label, type, end label), so both ends are id index seeks
+            for (start_label, rel_type, end_label), pairs in groups.items():
+                result = await tx.run(
+                    f"""
+                    UNWIND $pairs AS pair
+                    MATCH (a:{start_label} {{id: pair[0]}})
+                    MATCH (b:{end_label} {{id: pair[1]}})
+                    MERGE (a)-[:{rel_type}]->(b)
+                    RETURN count(*) AS count
+                    """,
+                    pairs=pairs
+                )
+                count += (await result.single())["count"]
+            return count
+
+        async with get_session() as session:
+            return await session.execute_write(write)
+
+    async def stream_relationships(self, label: str) -> AsyncIterator[list[str]]:
+        async with get_session(default_access_mode=READ_ACCESS) as session:
+            result = await session.run(
+                f"MATCH (n:{label})-[r]->(m) RETURN n.id AS start_id, type(r) AS type, labels(m)[0] AS end_label, m.id AS end_id"
+            )
+            async for record in result:
+                yield [record["start_id"], record["type"], record["end_label"], record["end_id"]]
+
+    async def relationships(self, label: str, node_id: str) -> list[dict]:
+        async with get_session() as session:
+            result = await session.run(
+                f"""
+                MATCH (n:{label} {{id: $id}})-[r]->(m)
+                RETURN type(r) AS relationship_type, labels(m) AS end_node_labels, m.id AS end_node_id
+                """,
+                id=node_id
+            )
+            return await result.data()
+
+    async def expand(self, nodes: list[tuple[str, str]], direction: str = "out",
+                     relationship_types: Optional[list[str]] = None, fan_out: int = 1000,
+                     fields: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> list[dict]:
+        types = ":" + "|".join(validate_label(rel_type) for rel_type in relationship_types) if relationship_types else ""
+        pattern = {"out": f"-[r{types}]->", "in": f"<-[r{types}]-", "both": f"-[r{types}]-"}[direction]
+        projection = f"m {{{', '.join(f'.{field}' for field in dict.fromkeys(['id', *fields]))}}}" if fields else "m"
+        # The total cap is shared by the per-label queries, each taking what the previous ones left
+        cap = "LIMIT $limit" if limit is not None else ""
+        by_label: dict[str, list[str]] = {}
+        for label, node_id in nodes:
+            by_label.setdefault(validate_label(label), []).append(node_id)
+
+        async def read(tx):
+            rows = []
+            # One UNWIND per label keeps every lookup on the label's id index
+            for label, ids in by_label.items():
+                remaining = None if limit is None else limit - len(rows)
+                if remaining is not None and remaining <= 0:
+                    break
+                result = await tx.run(
+                    f"""
+                    UNWIND $ids AS id
+                    MATCH (n:{label} {{id: id}})
+                    CALL {{
+                        WITH n
+                        MATCH (n){pattern}(m)
+                        RETURN r, m
+                        LIMIT $fan_out
+                    }}
+                    RETURN n.id AS id, type(r) AS type, startNode(r) = n AS outgoing,
+                           labels(m)[0] AS label, {projection} AS node
+                    {cap}
+                    """,
+                    ids=ids, fan_out=fan_out, limit=remaining
+                )
+                rows.extend(
+                    {"source": (label, record["id"]), "type": record["type"], "outgoing": record["outgoing"],
+                     "label": record["label"], "node": visible_properties(record["node"])}
+                    async for record in result
+                )
+            return rows
+
+        async with get_session(default_access_mode=READ_ACCESS) as session:
+            return await session.execute_read(read)
+
+    async def get(self, label: str, node_id: str) -> Optional[dict]:
+        async with get_session() as session:
+            result = await session.run(f"MATCH (n:{label} {{id: $id}}) RETURN n", id=node_id)
+            record = await result.single()
+        return None if record is None else visible_properties(record["n"])
+
+    async def get_many(self, label: str, node_ids: list[str]) -> dict[str, dict]:
+        if not node_ids:
+            return {}
+        async with get_session() as session:
+            result = await session.run(f"MATCH (n:{label}) WHERE n.id IN $ids RETURN n", ids=node_ids)
+            return {record["n"]["id"]: visible_properties(record["n"]) async for record in result}
+
+    async def find(self, label: Optional[str] = None, filters: Optional[dict] = None) -> list[dict]:
+        filters = filters or {}
+        pattern = f"n:{label}" if label else "n"
+        where = " AND ".join(f"n.{key} = $filters.{key}" for key in filters)
+        async with get_session() as session:
+            result = await session.run(f"MATCH ({pattern}) {f'WHERE {where}' if where else ''} RETURN n", filters=filters)
+            return [visible_properties(record["n"]) async for record in result]
+
+    async def exists(self, label: Optional[str], property_name: str, property_value) -> bool:
+        pattern = f"n:{label}" if label else "n"
+        query = f"MATCH ({pattern} {{{property_name}: $value}}) RETURN COUNT(n) > 0 AS exists"
+        async with get_session() as session:
+            result = await session.run(query, value=property_value)
+            record = await result.single()
+        return record["exists"]
+
+    @staticmethod
+    def _list_query(label: str, after: Optional[str], filters: dict, limit: Optional[int],
+                    fields: Optional[Iterable[str]]) -> str:
+        # Keyset pagination on id, served in order by the id uniqueness constraint's index
+        conditions = [f"n.{key} = $filters.{key}" for key in filters]
+        if after is not None:
+            conditions.append("n.id > $after")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Projections keep the id, which orders the rows and is the next page's cursor
+        projection = "n"
+        if fields:
+            projection = f"n {{{', '.join(f'.{field}' for field in dict.fromkeys(['id', *fields]))}}}"
+        return f"""
+        MATCH (n:{label})
+        {where}
+        RETURN {projection} AS n
+        ORDER BY n.id
+        {"LIMIT $limit" if limit is not None else ""}
+        """
+
+    async def page(self, label: str, after: Optional[str] = None, limit: int = 100, filters: Optional[dict] = None,
+                   fields: Optional[Iterable[str]] = None) -> list[dict]:
+        filters = filters or {}
+        async with get_session() as session:
+            result = await session.run(self._list_query(label, after, filters, limit, fields),
+                                       after=after, limit=limit, filters=filters)
+            return [visible_properties(record["n"]) async for record in result]
+
+    async def stream(self, label: str, after: Optional[str] = None, filters: Optional[dict] = None,
+                     fields: Optional[Iterable[str]] = None) -> AsyncIterator[dict]:
+        filters = filters or {}
+        async with get_session() as session:
+            result = await session.run(self._list_query(label, after, filters, None, fields), after=after, filters=filters)
+            async for record in result:
+                yield visible_properties(record["n"])
+
+    async def like(self, property_name: str, property_value: str, label: Optional[str] = None) -> list[dict]:
+        return await get_like_nodes(property_name, property_value, label)
+
+    async def search(self, text: str, labels: Optional[Iterable[str]] = None, limit: int = 20) -> list[dict]:
+        return await search_nodes(text, labels, limit)
+
+    async def ensure_vector_index(self, label: str, dimensions: int) -> bool:
+        # Vector indexes need Neo4j 5.11+
+        async with get_session() as session:
+            try:
+                result = await session.run(
+                    f"""
+                    CREATE VECTOR INDEX {_vector_index_name(label)} IF NOT EXISTS
+                    FOR (n:{label}) ON (n.{EMBEDDING_PROPERTY})
+                    OPTIONS {{indexConfig: {{
+                        `vector.dimensions`: {dimensions},
+                        `vector.similarity_function`: 'cosine'
+                    }}}}
+                    """
+                )
+                await result.consume()
+                return True
+            except ClientError as e:
+                logger.warning("No vector index for %s, using the in-process index: %s", label, e.message)
+                return False
+
+    async def vector_query(self, label: str, k: int, vector: Optional[list[float]] = None,
+                           node_id: Optional[str] = None) -> list[dict]:
+        if node_id is not None:
+            query = f"""
+            MATCH (source:{label} {{id: $id}})
+            CALL db.index.vector.queryNodes('{_vector_index_name(label)}', $k + 1, source.{EMBEDDING_PROPERTY})
+            YIELD node, score
+            WHERE node <> source
+            RETURN node, score
+            LIMIT $k
+            """
+        else:
+            query = f"""
+            CALL db.index.vector.queryNodes('{_vector_index_name(label)}', $k, $vector)
+            YIELD node, score
+            RETURN node, score
+            """
+        async with get_session() as session:
+            result = await session.run(query, id=node_id, vector=vector, k=k)
+            return [
+                {"label": label, "score": record["score"], "node": visible_properties(record["node"])}
+                async for record in result
+            ]
+
+    async def set_embeddings(self, label: str, rows: list[dict]) -> None:
+        # db.create.setNodeVectorProperty stores the vector as a float32 array
+        async with get_session() as session:
+            try:
+                result = await session.run(
+                    f"""
+                    UNWIND $rows AS row
+                    MATCH (n:{label} {{id: row.id}})
+                    CALL db.create.setNodeVectorProperty(n, '{EMBEDDING_PROPERTY}', row.vector)
+                    """,
+                    rows=rows
+                )
+                await result.consume()
+            except ClientError:
+                # Servers without the procedure store a plain list property instead
+                result = await session.run(
+                    f"""
+                    UNWIND $rows AS row
+                    MATCH (n:{label} {{id: row.id}})
+                    SET n.{EMBEDDING_PROPERTY} = row.vector
+                    """,
+                    rows=rows
+                )
+                await result.consume()
+
+    async def embeddings(self, label: str) -> AsyncIterator[tuple[str, list[float]]]:
+        async with get_session() as session:
+            result = await session.run(
+                f"MATCH (n:{label}) WHERE n.{EMBEDDING_PROPERTY} IS NOT NULL "
+                f"RETURN n.id AS id, n.{EMBEDDING_PROPERTY} AS vector"
+            )
+            async for record in result:
+                yield record["id"], record["vector"]
+
+    async def stats(self) -> dict:
+        # Unfiltered counts come from the count store and task counts from the :Task(status) index
+        async with get_session(default_access_mode=READ_ACCESS) as session:
+            return await session.execute_read(self._collect)
+
+    @staticmethod
+    async def _collect(tx) -> dict:
+        labels = [record["label"] async for record in await tx.run("CALL db.labels() YIELD label RETURN label")]
+        types = [record["type"] async for record in await tx.run(
+            "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType AS type"
+        )]
+
+        async def count(query: str, **params) -> int:
+            result = await tx.run(query, **params)
+            return (await result.single())["count"]
+
+        stats = {
+            "node_count": await count("MATCH (n) RETURN count(n) AS count"),
+            "relationship_count": await count("MATCH ()-[r]->() RETURN count(r) AS count"),
+            "labels": {},
+            "relationship_types": {},
+            "task_status": {},
+        }
+        for label in labels:
+            stats["labels"][label] = await count(f"MATCH (n:{_quote(label)}) RETURN count(n) AS count")
+        for rel_type in types:
+            stats["relationship_types"][rel_type] = await count(f"MATCH ()-[r:{_quote(rel_type)}]->() RETURN count(r) AS count")
+        for status in TaskStatus:
+            stats["task_status"][status.value] = await count(
+                "MATCH (n:Task) WHERE n.status = $status RETURN count(n) AS count", status=status.value
+            )
+        return stats
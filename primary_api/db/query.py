@@ -0,0 +1,146 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Optional
+
+from neo4j import READ_ACCESS, WRITE_ACCESS, Query
+from prometheus_client import Counter
+
+from ..config import settings
+from ..models.models import CypherQuery
+from .neo4j import get_session
+
+# Initialize the Prometheus Counters
+query_cache_hit_counter  = Counter("custom_query_cache_hits", "Custom query result cache hits")
+query_cache_miss_counter = Counter("custom_query_cache_misses", "Custom query result cache misses")
+query_truncated_counter  = Counter("custom_query_truncated", "Custom queries cut off at the row cap")
+
+
+class QueryResultCache:
+    """
+    LRU of read-only query results bounded by total serialized size, with a TTL per entry.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        # key -> (expires_at, size, value)
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+
+    @staticmethod
+    def key(query: CypherQuery, max_rows: int) -> str:
+        payload = json.dumps([query.query, query.parameters, max_rows], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at < time.monotonic():
+            self._pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        self._pop(key)
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), size, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+query_cache = QueryResultCache(settings.query_cache_max_bytes, settings.query_cache_ttl)
+
+
+def query_limits(query: CypherQuery) -> tuple[float, int]:
+    """
+    Clamp the requested timeout and row cap to the configured maximums.
+    """
+    timeout = min(query.timeout or settings.query_timeout, settings.query_timeout)
+    max_rows = min(query.max_rows or settings.query_max_rows, settings.query_max_rows)
+    return timeout, max_rows
+
+
+def open_query_session(query: CypherQuery):
+    # Read queries run in a read session, so a cluster can route them to a secondary
+    # and the server rejects any write they attempt
+    access_mode = READ_ACCESS if query.access_mode == "read" else WRITE_ACCESS
+    return get_session(default_access_mode=access_mode, fetch_size=min(settings.query_max_rows, 1000))
+
+
+async def run_query(query: CypherQuery) -> dict:
+    """
+    Run a custom query with a transaction timeout and a row cap.
+
+    Returns:
+        dict: `result` (list of records), `truncated` and `cached` flags.
+    """
+    timeout, max_rows = query_limits(query)
+    use_cache = query.cache and query.access_mode == "read"
+    if use_cache:
+        key = query_cache.key(query, max_rows)
+        cached = query_cache.get(key)
+        if cached is not None:
+            query_cache_hit_counter.inc()
+            return {**cached, "cached": True}
+        query_cache_miss_counter.inc()
+
+    records, truncated = [], False
+    async with open_query_session(query) as session:
+        result = await session.run(Query(query.query, timeout=timeout), query.parameters)
+        async for record in result:
+            if len(records) >= max_rows:
+                truncated = True
+                break
+            records.append(record.data())
+    if truncated:
+        query_truncated_counter.inc()
+
+    response = {"result": records, "truncated": truncated}
+    if use_cache:
+        query_cache.set(key, response, query.cache_ttl)
+    return {**response, "cached": False}
+
+
+async def stream_query(query: CypherQuery) -> AsyncIterator[dict]:
+    """
+    Run a custom query and return an iterator over its records, capped at the row limit.
+
+    The query is started before this coroutine returns, so syntax and permission errors
+    are raised here rather than half way through a streamed response. If the cap is hit,
+    a final `{"truncated": true}` item is yielded.
+    """
+    timeout, max_rows = query_limits(query)
+    session = open_query_session(query)
+    try:
+        result = await session.run(Query(query.query, timeout=timeout), query.parameters)
+    except Exception:
+        await session.close()
+        raise
+
+    async def records() -> AsyncIterator[dict]:
+        try:
+            count = 0
+            async for record in result:
+                if count >= max_rows:
+                    query_truncated_counter.inc()
+                    yield {"truncated": True, "max_rows": max_rows}
+                    break
+                count += 1
+                yield record.data()
+        finally:
+            await session.close()
+
+    return records()
@@ -0,0 +1,109 @@
+import re
+from typing import Iterable
+
+from ..utils.logger import get_logger
+from .neo4j import get_session
+
+logger = get_logger(__name__)
+
+# Labels created by the Primary API routes
+DEFAULT_LABELS = ("Task", "Agent", "Capability")
+# Properties that get a range index on every label
+INDEXED_PROPERTIES = ("status", "name")
+# Properties covered by each label's full-text index
+FULLTEXT_PROPERTIES = ("name", "description")
+
+# Labels of bookkeeping nodes, which have no `id` and are not exported
+INTERNAL_LABELS = ("IdCounter",)
+
+# Schema of the bookkeeping nodes, which are not served by the node routes
+INTERNAL_SCHEMA = (
+    "CREATE CONSTRAINT idcounter_label_unique IF NOT EXISTS FOR (c:IdCounter) REQUIRE c.label IS UNIQUE",
+    "CREATE CONSTRAINT cachedresult_id_unique IF NOT EXISTS FOR (r:CachedResult) REQUIRE r.id IS UNIQUE",
+    "CREATE CONSTRAINT promptversion_id_unique IF NOT EXISTS FOR (v:PromptVersion) REQUIRE v.id IS UNIQUE",
+    "CREATE INDEX promptversion_agent_id IF NOT EXISTS FOR (v:PromptVersion) ON (v.agent_id)",
+)
+
+_LABEL_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def validate_label(label: str) -> str:
+    """
+    Reject labels that cannot be safely interpolated into Cypher.
+    """
+    if not _LABEL_PATTERN.match(label):
+        raise ValueError(f"Invalid node label: {label!r}")
+    return label
+
+
+def fulltext_index_name(label: str) -> str:
+    return f"{label.lower()}_text"
+
+
+class SchemaManager:
+    """
+    Idempotently creates the constraints and indexes every node lookup depends on.
+
+    Each label gets a uniqueness constraint on `id` (which is backed by an index), range
+    indexes on `status` and `name` and a full-text index over `name` and `description`.
+    Labels are only sent to Neo4j once per process.
+    """
+
+    def __init__(self, labels: Iterable[str] = DEFAULT_LABELS):
+        self.labels = [validate_label(label) for label in labels]
+        self._ensured: set[str] = set()
+
+    async def ensure(self) -> None:
+        """
+        Create the schema for every known label and for the bookkeeping nodes.
+        """
+        async with get_session() as session:
+            for statement in INTERNAL_SCHEMA:
+                result = await session.run(statement)
+                await result.consume()
+        for label in self.labels:
+            await self.ensure_label(label)
+
+    async def ensure_label(self, label: str) -> None:
+        """
+        Create the constraint, indexes and full-text index for a label if this process has not done so yet.
+        """
+        if label in self._ensured:
+            return
+        validate_label(label)
+        statements = [
+            f"CREATE CONSTRAINT {label.lower()}_id_unique IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+        ] + [
+            f"CREATE INDEX {label.lower()}_{prop} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})"
+            for prop in INDEXED_PROPERTIES
+        ] + [
+            f"CREATE FULLTEXT INDEX {fulltext_index_name(label)} IF NOT EXISTS FOR (n:{label}) "
+            f"ON EACH [{', '.join(f'n.{prop}' for prop in FULLTEXT_PROPERTIES)}]"
+        ]
+        async with get_session() as session:
+            for statement in statements:
+                result = await session.run(statement)
+                await result.consume()
+        if label not in self.labels:
+            self.labels.append(label)
+        self._ensured.add(label)
+        logger.info("Schema ensured for label %s", label)
+
+    async def index_status(self) -> list[dict]:
+        """
+        Report the population state of every index in the database.
+        """
+        async with get_session() as session:
+            result = await session.run(
+                """
+                SHOW INDEXES
+                YIELD name, type, labelsOrTypes, properties, state, populationPercent
+                RETURN name, type, labelsOrTypes, properties, state, populationPercent
+                """
+            )
+            return await result.data()
+
+
+# Shared by the app lifespan, the NodeManager and the Neo4j routes
+schema_manager = SchemaManager()
@@ -0,0 +1,116 @@
+import re
+from typing import Iterable, Optional
+
+from .neo4j import get_session, visible_properties
+from .schema import FULLTEXT_PROPERTIES, fulltext_index_name, schema_manager, validate_label
+
+# Characters with a meaning in Lucene query syntax
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+
+
+def escape_lucene(text: str) -> str:
+    """
+    Escape user input so it is matched literally by a full-text index.
+    """
+    return _LUCENE_SPECIAL.sub(r"\\\1", text)
+
+
+def build_fulltext_query(text: str, property_name: Optional[str] = None) -> str:
+    """
+    Turn free text into a Lucene query that matches each term exactly or as a prefix.
+
+    Args:
+        text (str): The text to search for.
+        property_name (str): Optional property to restrict every term to.
+    """
+    field = f"{property_name}:" if property_name else ""
+    terms = [escape_lucene(term) for term in text.split()]
+    # Wildcard terms skip the analyzer, so the prefix form is lowercased like the index
+    return " ".join(f"({field}{term} OR {field}{term.lower()}*)" for term in terms)
+
+
+async def search_nodes(text: str, labels: Optional[Iterable[str]] = None, limit: int = 20,
+                       property_name: Optional[str] = None) -> list[dict]:
+    """
+    Rank nodes against the per-label full-text indexes.
+
+    Args:
+        text (str): Free text to search for.
+        labels (Iterable[str]): Labels to search, defaults to every label with a schema.
+        limit (int): Maximum number of hits across all labels.
+        property_name (str): Optional full-text property to restrict the search to.
+
+    Returns:
+        list[dict]: Hits with `label`, `score` and `node` (the node's properties), best first.
+    """
+    labels = [validate_label(label) for label in (labels or schema_manager.labels)]
+    unknown = set(labels) - set(schema_manager.labels)
+    if unknown:
+        raise ValueError(f"No full-text index for labels: {', '.join(sorted(unknown))}")
+    query = build_fulltext_query(text, property_name)
+    if not labels or not query:
+        return []
+    branches = "\nUNION ALL\n".join(
+        f"""
+        CALL db.index.fulltext.queryNodes('{fulltext_index_name(label)}', $query, {{limit: $limit}})
+        YIELD node, score
+        RETURN node, score, '{label}' AS label
+        """
+        for label in labels
+    )
+    async with get_session() as session:
+        result = await session.run(
+            f"""
+            CALL {{
+                {branches}
+            }}
+            RETURN node, score, label
+            ORDER BY score DESC
+            LIMIT $limit
+            """,
+            query=query, limit=limit
+        )
+        return [
+            {"label": record["label"], "score": record["score"], "node": visible_properties(record["node"])}
+            async for record in result
+        ]
+
+
+async def get_like_nodes(property_name: str, property_value: str, node_type: Optional[str] = None,
+                         limit: int = 1000) -> list[dict]:
+    """
+    Find nodes whose property contains the given substring.
+
+    Full-text properties are looked up through the full-text indexes, which match whole
+    words and word prefixes, and the candidates are then checked with an exact substring
+    match. Other properties fall back to a CONTAINS scan.
+
+    Returns:
+        list[dict]: The matching nodes' properties.
+    """
+    if property_name not in FULLTEXT_PROPERTIES:
+        return await _scan_like_nodes(property_name, property_value, node_type)
+    labels = None
+    if node_type:
+        await schema_manager.ensure_label(node_type)
+        labels = [node_type]
+    hits = await search_nodes(property_value, labels, limit, property_name)
+    return [
+        hit["node"] for hit in hits
+        if property_value in str(hit["node"].get(property_name, ""))
+    ]
+
+
+async def _scan_like_nodes(property_name: str, property_value: str, node_type: Optional[str]) -> list[dict]:
+    pattern = f"n:{node_type}" if node_type else "n"
+    async with get_session() as session:
+        result = await session.run(
+            f"""
+            MATCH ({pattern})
+            WHERE n.{property_name} CONTAINS $property_value
+            RETURN n
+            """,
+            property_value=property_value
+        )
+        records = await result.data()
+    return [visible_properties(record["n"]) for record in records]
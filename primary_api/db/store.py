@@ -0,0 +1,262 @@
+from typing import AsyncIterator, Iterable, Optional
+
+from ..config import settings
+
+
+class DuplicateNodeError(Exception):
+    """
+    Raised when a created node's id is already taken within its label.
+    """
+
+
+class GraphStore:
+    """
+    Storage backend of the NodeManager and the services built on the graph.
+
+    Nodes are identified by label and `id`; properties are primitives or lists of primitives.
+    Reads return property dicts without internal properties such as the embedding vector.
+    """
+
+    # Whether /neo4j/query can run Cypher against this backend
+    supports_cypher = False
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def ensure_schema(self) -> None:
+        """
+        Create the constraints and indexes of every known label and of the bookkeeping nodes.
+        """
+        pass
+
+    async def ensure_label(self, label: str) -> None:
+        raise NotImplementedError
+
+    @property
+    def labels(self) -> list[str]:
+        raise NotImplementedError
+
+    async def health(self) -> dict:
+        raise NotImplementedError
+
+    async def reserve_ids(self, label: str, size: int) -> tuple[int, int]:
+        """
+        Atomically reserve `size` sequence numbers of a label, returned as [start, end).
+        """
+        raise NotImplementedError
+
+    async def id_counters(self) -> dict[str, int]:
+        """
+        The next unreserved sequence number of every label.
+        """
+        raise NotImplementedError
+
+    async def restore_id_counters(self, counters: dict[str, int]) -> None:
+        """
+        Move id counters forward to at least the given values, never back.
+        """
+        raise NotImplementedError
+
+    async def create(self, label: str, properties: dict) -> None:
+        """
+        Create one node. Raises DuplicateNodeError if the id is taken.
+        """
+        raise NotImplementedError
+
+    async def create_many(self, label: str, rows: list[dict], link_label: str, relationship_type: str) -> list[dict]:
+        """
+        Create nodes in one transaction from rows of `index`, `props` and `links` (ids of existing
+        `link_label` nodes to connect with `relationship_type`).
+
+        Returns:
+            list[dict]: `index` and `id` of every created node.
+        """
+        raise NotImplementedError
+
+    async def upsert_many(self, label: str, rows: list[dict]) -> int:
+        """
+        Create or replace nodes by id in one transaction, each row being the node's full properties.
+
+        Returns:
+            int: Number of nodes written.
+        """
+        raise NotImplementedError
+
+    async def update(self, label: str, node_id: str, updates: dict, operation: str = "overwrite") -> Optional[dict]:
+        """
+        Set (`overwrite`, `append`) or unset (`remove`) properties of a node.
+
+        Returns:
+            dict: The node's new properties, or None if it does not exist.
+        """
+        raise NotImplementedError
+
+    async def update_many(self, label: str, rows: list[dict], link_label: Optional[str] = None,
+                          relationship_type: Optional[str] = None) -> list[dict]:
+        """
+        Conditionally update nodes in one transaction.
+
+        Each row has the node's `id`, the properties to `set` and optionally the property values
+        the node is `expected` to have; nodes that differ are skipped. With a `link_label`, a row's
+        `link_id` names a node the updated one is connected to with `relationship_type`, and the
+        row is skipped if that node does not exist.
+
+        Returns:
+            list[dict]: The new properties of every updated node.
+        """
+        raise NotImplementedError
+
+    async def delete(self, label: str, node_id: str) -> None:
+        """
+        Delete a node and its relationships.
+        """
+        raise NotImplementedError
+
+    async def delete_many(self, label: str, node_ids: list[str]) -> int:
+        raise NotImplementedError
+
+    async def relate(self, start_label: str, start_id: str, end_label: str, end_id: str,
+                     relationship_type: str, merge: bool = False) -> bool:
+        """
+        Connect two existing nodes; with `merge` an identical relationship is not created twice.
+
+        Returns:
+            bool: False if either node does not exist.
+        """
+        raise NotImplementedError
+
+    async def relate_many(self, rows: list[list[str]]) -> int:
+        """
+        Merge relationships in one transaction from rows of
+        [start label, start id, type, end label, end id]; rows whose nodes are missing are skipped.
+
+        Returns:
+            int: Number of rows whose nodes exist.
+        """
+        raise NotImplementedError
+
+    def stream_relationships(self, label: str) -> AsyncIterator[list[str]]:
+        """
+        Every outgoing relationship of the label's nodes as [start id, type, end label, end id].
+        """
+        raise NotImplementedError
+
+    async def relationships(self, label: str, node_id: str) -> list[dict]:
+        """
+        Outgoing relationships of a node as `relationship_type`, `end_node_labels` and `end_node_id`.
+        """
+        raise NotImplementedError
+
+    async def expand(self, nodes: list[tuple[str, str]], direction: str = "out",
+                     relationship_types: Optional[list[str]] = None, fan_out: int = 1000,
+                     fields: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> list[dict]:
+        """
+        Follow one hop from every given (label, id) node, at most `fan_out` relationships each
+        and at most `limit` in total.
+
+        Args:
+            direction (str): `out`, `in` or `both`.
+            relationship_types (list[str]): Only follow these types; all types when empty.
+            fields (Iterable[str]): Only return these properties of the neighbours (plus `id`).
+
+        Returns:
+            list[dict]: Rows of `source` (label, id), relationship `type`, `outgoing` (whether
+            the source is the relationship's start), the neighbour's `label` and its `node` properties.
+        """
+        raise NotImplementedError
+
+    async def get(self, label: str, node_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def get_many(self, label: str, node_ids: list[str]) -> dict[str, dict]:
+        raise NotImplementedError
+
+    async def find(self, label: Optional[str] = None, filters: Optional[dict] = None) -> list[dict]:
+        """
+        Nodes of a label (or of every label) whose properties equal `filters`.
+        """
+        raise NotImplementedError
+
+    async def exists(self, label: Optional[str], property_name: str, property_value) -> bool:
+        raise NotImplementedError
+
+    async def page(self, label: str, after: Optional[str] = None, limit: int = 100, filters: Optional[dict] = None,
+                   fields: Optional[Iterable[str]] = None) -> list[dict]:
+        """
+        Up to `limit` nodes ordered by id after the `after` cursor, optionally only their `fields`.
+        """
+        raise NotImplementedError
+
+    def stream(self, label: str, after: Optional[str] = None, filters: Optional[dict] = None,
+               fields: Optional[Iterable[str]] = None) -> AsyncIterator[dict]:
+        """
+        Every matching node ordered by id, without holding them all in memory.
+        """
+        raise NotImplementedError
+
+    async def like(self, property_name: str, property_value: str, label: Optional[str] = None) -> list[dict]:
+        """
+        Nodes whose property contains the given substring.
+        """
+        raise NotImplementedError
+
+    async def search(self, text: str, labels: Optional[Iterable[str]] = None, limit: int = 20) -> list[dict]:
+        """
+        Rank nodes by how well their name and description match the words of `text`.
+
+        Returns:
+            list[dict]: Hits with `label`, `score` and `node`, best first.
+        """
+        raise NotImplementedError
+
+    async def ensure_vector_index(self, label: str, dimensions: int) -> bool:
+        """
+        Create a native vector index for a label if the backend has one.
+
+        Returns:
+            bool: Whether `vector_query` can be used for the label.
+        """
+        return False
+
+    async def vector_query(self, label: str, k: int, vector: Optional[list[float]] = None,
+                           node_id: Optional[str] = None) -> list[dict]:
+        raise NotImplementedError
+
+    async def set_embeddings(self, label: str, rows: list[dict]) -> None:
+        """
+        Store the `vector` of every row's node `id`.
+        """
+        raise NotImplementedError
+
+    def embeddings(self, label: str) -> AsyncIterator[tuple[str, list[float]]]:
+        raise NotImplementedError
+
+    async def stats(self) -> dict:
+        """
+        Total, per-label and per-relationship-type counts plus task counts per status.
+        """
+        raise NotImplementedError
+
+
+# Process-wide store, owned by the app lifespan (see main.py)
+_store: Optional[GraphStore] = None
+
+
+def get_store() -> GraphStore:
+    """
+    Return the store selected by GRAPH_BACKEND, creating it on first use.
+    """
+    global _store
+    if _store is None:
+        if settings.graph_backend == "memory":
+            from .memory_store import MemoryStore
+            _store = MemoryStore()
+        elif settings.graph_backend == "neo4j":
+            from .neo4j_store import Neo4jStore
+            _store = Neo4jStore()
+        else:
+            raise ValueError(f"Unknown GRAPH_BACKEND: {settings.graph_backend!r}")
+    return _store
@@ -0,0 +1,254 @@
+import asyncio
+import struct
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional
+
+import msgpack
+from prometheus_client import Counter
+
+from ..config import settings
+from ..utils.logger import get_logger
+from .cache import node_cache
+from .schema import INTERNAL_LABELS, validate_label
+from .store import GraphStore, get_store
+from .vectors import vector_store
+
+logger = get_logger(__name__)
+
+# Initialize the Prometheus Counters
+transfer_rows_counter = Counter("graph_transfer_rows", "Rows written to exports or read from imports", ["direction", "kind"])
+
+FORMAT_VERSION = 1
+MEDIA_TYPE = "application/x-msgpack"
+
+# Frames are a 4-byte big-endian payload length followed by one msgpack map
+_LENGTH = struct.Struct(">I")
+
+
+def _frame(payload: dict) -> bytes:
+    body = msgpack.packb(payload, use_bin_type=True)
+    return _LENGTH.pack(len(body)) + body
+
+
+async def export_labels(labels: Optional[Iterable[str]] = None, store: Optional[GraphStore] = None) -> list[str]:
+    """
+    Validate the requested labels, or list every non-internal label with nodes.
+    """
+    store = store or get_store()
+    if labels:
+        return [validate_label(label) for label in labels]
+    stats = await store.stats()
+    return sorted(label for label, count in stats["labels"].items() if count and label not in INTERNAL_LABELS)
+
+
+async def export_graph(labels: list[str], store: Optional[GraphStore] = None) -> AsyncIterator[bytes]:
+    """
+    Stream a snapshot of the given labels as length-prefixed msgpack frames.
+
+    Frames are a `header`, then per label its `nodes` and `embeddings` in batches of
+    TRANSFER_BATCH_SIZE rows, the id `counters`, the outgoing `relationships` of every label
+    (as [start label, start id, type, end label, end id] rows) and an `end` frame with the
+    totals. Rows come from store cursors, so memory is bounded by one batch whatever the graph size.
+    """
+    store = store or get_store()
+    batch_size = settings.transfer_batch_size
+    totals = {"nodes": 0, "embeddings": 0, "relationships": 0}
+    yield _frame({"type": "header", "version": FORMAT_VERSION, "labels": labels})
+
+    async def batches(kind: str, label: Optional[str], rows: AsyncIterator) -> AsyncIterator[bytes]:
+        batch = []
+        async for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield _frame({"type": kind, "label": label, "rows": batch})
+                totals[kind] += len(batch)
+                transfer_rows_counter.labels(direction="export", kind=kind).inc(len(batch))
+                batch = []
+        if batch:
+            yield _frame({"type": kind, "label": label, "rows": batch})
+            totals[kind] += len(batch)
+            transfer_rows_counter.labels(direction="export", kind=kind).inc(len(batch))
+
+    async def embeddings(label: str) -> AsyncIterator[list]:
+        async for node_id, vector in store.embeddings(label):
+            yield [node_id, list(vector)]
+
+    async def relationships(label: str) -> AsyncIterator[list]:
+        async for start_id, rel_type, end_label, end_id in store.stream_relationships(label):
+            yield [label, start_id, rel_type, end_label, end_id]
+
+    for label in labels:
+        async for frame in batches("nodes", label, store.stream(label)):
+            yield frame
+        async for frame in batches("embeddings", label, embeddings(label)):
+            yield frame
+    counters = await store.id_counters()
+    yield _frame({"type": "counters", "counters": {label: value for label, value in counters.items() if label in labels}})
+    for label in labels:
+        async for frame in batches("relationships", None, relationships(label)):
+            yield frame
+    yield _frame({"type": "end", **totals})
+
+
+async def read_frames(chunks: AsyncIterable[bytes]) -> AsyncIterator[dict]:
+    """
+    Split a byte stream into decoded frames. Raises ValueError on a malformed stream.
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        offset = 0
+        while len(buffer) - offset >= _LENGTH.size:
+            (length,) = _LENGTH.unpack_from(buffer, offset)
+            if len(buffer) - offset - _LENGTH.size < length:
+                break
+            start = offset + _LENGTH.size
+            try:
+                frame = msgpack.unpackb(bytes(buffer[start:start + length]), raw=False)
+            except Exception as e:
+                raise ValueError(f"Malformed frame: {e}")
+            if not isinstance(frame, dict) or "type" not in frame:
+                raise ValueError("Malformed frame: expected a map with a type")
+            offset = start + length
+            yield frame
+        del buffer[:offset]
+    if buffer:
+        raise ValueError("Truncated stream")
+
+
+class _LabelWriter:
+    """
+    Writes one label's node and embedding batches in arrival order on its own task.
+
+    The queue is bounded, so a slow label holds back the reader instead of buffering the stream.
+    """
+
+    def __init__(self, label: str, store: GraphStore, semaphore: asyncio.Semaphore, counts: dict):
+        self.label = label
+        self.store = store
+        self.semaphore = semaphore
+        self.counts = counts
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+        self.error: Optional[Exception] = None
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            frame = await self.queue.get()
+            if frame is None:
+                return
+            # After a failure the remaining frames are drained so the reader never blocks
+            if self.error is not None:
+                continue
+            try:
+                async with self.semaphore:
+                    await self._write(frame["type"], frame["rows"])
+            except Exception as e:
+                self.error = e
+
+    async def _write(self, kind: str, rows: list) -> None:
+        if kind == "nodes":
+            await self.store.upsert_many(self.label, rows)
+            if node_cache is not None:
+                await node_cache.invalidate_nodes(self.label, [row["id"] for row in rows])
+        else:
+            await self.store.set_embeddings(self.label, [{"id": node_id, "vector": vector} for node_id, vector in rows])
+        self.counts[kind] += len(rows)
+        transfer_rows_counter.labels(direction="import", kind=kind).inc(len(rows))
+
+    async def finish(self) -> None:
+        await self.queue.put(None)
+        await self.task
+        if self.error is not None:
+            raise self.error
+
+
+async def import_graph(chunks: AsyncIterable[bytes], store: Optional[GraphStore] = None) -> dict:
+    """
+    Load a stream written by `export_graph`, upserting nodes by id so a repeated import is harmless.
+
+    Each label's batches are written by its own task with at most IMPORT_CONCURRENCY writes in
+    flight across labels. Relationships follow once every node is written, as concurrent
+    batched merges; relationships to nodes that are in neither the stream nor the graph are
+    skipped. Id counters only move forward, so ids allocated later never collide.
+
+    Returns:
+        dict: Counts of `labels`, `nodes`, `embeddings`, `relationships` and `skipped_relationships`.
+    """
+    store = store or get_store()
+    semaphore = asyncio.Semaphore(settings.import_concurrency)
+    counts = {"nodes": 0, "embeddings": 0, "relationships": 0, "skipped_relationships": 0}
+    writers: dict[str, _LabelWriter] = {}
+    pending: set[asyncio.Task] = set()
+    nodes_done = header = False
+
+    async def relate(rows: list) -> None:
+        async with semaphore:
+            written = await store.relate_many(rows)
+        counts["relationships"] += written
+        counts["skipped_relationships"] += len(rows) - written
+        transfer_rows_counter.labels(direction="import", kind="relationships").inc(len(rows))
+
+    async def finish_nodes() -> None:
+        errors = []
+        for writer in writers.values():
+            try:
+                await writer.finish()
+            except Exception as e:
+                errors.append(e)
+        for label in writers:
+            if node_cache is not None:
+                await node_cache.invalidate_lists(label)
+            vector_store.reset(label)
+        if errors:
+            raise errors[0]
+
+    try:
+        async for frame in read_frames(chunks):
+            kind = frame["type"]
+            if not header:
+                if kind != "header" or frame.get("version") != FORMAT_VERSION:
+                    raise ValueError(f"Unsupported stream: expected a version {FORMAT_VERSION} header")
+                header = True
+            elif kind in ("nodes", "embeddings"):
+                if nodes_done:
+                    raise ValueError(f"{kind} frame after relationships")
+                label = validate_label(frame["label"])
+                if label not in writers:
+                    await store.ensure_label(label)
+                    writers[label] = _LabelWriter(label, store, semaphore, counts)
+                await writers[label].queue.put(frame)
+            elif kind == "counters":
+                await store.restore_id_counters({validate_label(label): value for label, value in frame["counters"].items()})
+            elif kind == "relationships":
+                if not nodes_done:
+                    await finish_nodes()
+                    nodes_done = True
+                # Bound the batches held in memory to the write concurrency
+                while len(pending) >= settings.import_concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                pending.add(asyncio.create_task(relate(frame["rows"])))
+            elif kind == "end":
+                break
+            elif kind != "header":
+                raise ValueError(f"Unknown frame type: {kind}")
+        if not header:
+            raise ValueError("Empty stream")
+        if not nodes_done:
+            nodes_done = True
+            await finish_nodes()
+        if pending:
+            await asyncio.gather(*pending)
+            pending = set()
+    finally:
+        for task in pending:
+            task.cancel()
+        if not nodes_done:
+            for writer in writers.values():
+                writer.task.cancel()
+
+    counts["labels"] = len(writers)
+    logger.info("Imported %d nodes, %d embeddings and %d relationships across %d labels",
+                counts["nodes"], counts["embeddings"], counts["relationships"], counts["labels"])
+    return counts
@@ -0,0 +1,98 @@
+from typing import AsyncIterator, Optional
+
+from prometheus_client import Counter
+
+from ..config import settings
+from ..models.models import TraversalRequest
+from .schema import validate_label
+from .store import GraphStore, get_store
+
+# Initialize the Prometheus Counters
+traversal_truncated_counter = Counter("traversal_truncated", "Traversals cut off by their node or fan-out budget")
+
+
+def traversal_limits(request: TraversalRequest) -> tuple[int, int, int]:
+    """
+    Clamp the requested depth, node budget and fan-out to the configured maximums.
+    """
+    max_depth = min(request.max_depth, settings.traversal_max_depth)
+    max_nodes = min(request.max_nodes or settings.traversal_max_nodes, settings.traversal_max_nodes)
+    fan_out = min(request.max_fan_out or settings.traversal_max_fan_out, settings.traversal_max_fan_out)
+    return max_depth, max_nodes, fan_out
+
+
+async def traverse(request: TraversalRequest, store: Optional[GraphStore] = None) -> AsyncIterator[dict]:
+    """
+    Breadth-first traversal from the start nodes, yielding the deduplicated subgraph as it is found.
+
+    Each hop is one batched `expand` over the whole frontier, so the cost is one store round
+    trip per level however many nodes it holds. Nodes are yielded once, with the depth they
+    were first reached at, and relationships once per (start, type, end). Relationships to
+    nodes left out by the node budget are not yielded, so the subgraph stays closed. The
+    remaining node budget also caps the rows each hop reads, so the store never fetches more
+    relationships than the budget could take in.
+
+    Yields:
+        dict: `{"kind": "node", ...}` and `{"kind": "relationship", ...}` items, then one
+        `{"kind": "summary", "truncated": ...}` item.
+    """
+    store = store or get_store()
+    max_depth, max_nodes, fan_out = traversal_limits(request)
+    relationship_types = [validate_label(rel_type) for rel_type in request.relationship_types or []]
+    seen_nodes: set[tuple[str, str]] = set()
+    seen_relationships: set[tuple[str, str, str, str, str]] = set()
+    truncated = False
+
+    def project(properties: dict) -> dict:
+        if not request.fields:
+            return properties
+        return {field: properties.get(field) for field in dict.fromkeys(["id", *request.fields])}
+
+    frontier = []
+    for ref in request.start:
+        key = (validate_label(ref.label), ref.id)
+        if key in seen_nodes:
+            continue
+        properties = await store.get(*key)
+        if properties is None:
+            continue
+        seen_nodes.add(key)
+        frontier.append(key)
+        yield {"kind": "node", "label": key[0], "id": key[1], "depth": 0, "properties": project(properties)}
+
+    for depth in range(1, max_depth + 1):
+        if not frontier:
+            break
+        remaining = max_nodes - len(seen_nodes)
+        if remaining <= 0:
+            truncated = True
+            break
+        rows = await store.expand(frontier, request.direction, relationship_types, fan_out, request.fields, remaining)
+        # A full page of rows may have left relationships of the frontier unread
+        truncated = truncated or len(rows) >= remaining
+        followed: dict[tuple[str, str], int] = {}
+        next_frontier = []
+        for row in rows:
+            followed[row["source"]] = followed.get(row["source"], 0) + 1
+            neighbour = (row["label"], row["node"]["id"])
+            if neighbour not in seen_nodes:
+                if len(seen_nodes) >= max_nodes:
+                    truncated = True
+                    continue
+                seen_nodes.add(neighbour)
+                next_frontier.append(neighbour)
+                yield {"kind": "node", "label": neighbour[0], "id": neighbour[1], "depth": depth,
+                       "properties": project(row["node"])}
+            start, end = (row["source"], neighbour) if row["outgoing"] else (neighbour, row["source"])
+            relationship = (*start, row["type"], *end)
+            if relationship not in seen_relationships:
+                seen_relationships.add(relationship)
+                yield {"kind": "relationship", "type": row["type"], "start_label": start[0], "start_id": start[1],
+                       "end_label": end[0], "end_id": end[1]}
+        # A node that used its whole fan-out may have had more relationships
+        truncated = truncated or any(count >= fan_out for count in followed.values())
+        frontier = next_frontier
+
+    if truncated:
+        traversal_truncated_counter.inc()
+    yield {"kind": "summary", "nodes": len(seen_nodes), "relationships": len(seen_relationships), "truncated": truncated}
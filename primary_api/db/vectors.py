@@ -0,0 +1,172 @@
+import asyncio
+from typing import Iterable, Optional
+
+import numpy as np
+
+from ..config import settings
+from ..utils.embeddings import embed, node_text
+from .schema import validate_label
+from .store import get_store
+
+# Labels whose descriptions are embedded on create and update
+EMBEDDED_LABELS = ("Capability", "Task")
+
+
+class InMemoryVectorIndex:
+    """
+    Brute-force cosine k-NN over a float32 matrix that grows in place.
+
+    Rows are unit vectors, so one matrix-vector product scores every node. Updates overwrite
+    a row and removals swap the last row into the hole, so writes are O(dimensions).
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self._ids: list[str] = []
+        self._rows: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, ids: list[str], vectors: np.ndarray) -> None:
+        for node_id, vector in zip(ids, vectors):
+            row = self._rows.get(node_id)
+            if row is None:
+                row = len(self._ids)
+                if row == len(self._vectors):
+                    # Double the capacity so appends stay amortized O(1)
+                    grown = np.zeros((max(16, 2 * row), self.dimensions), dtype=np.float32)
+                    grown[:row] = self._vectors[:row]
+                    self._vectors = grown
+                self._ids.append(node_id)
+                self._rows[node_id] = row
+            self._vectors[row] = vector
+
+    def remove(self, node_id: str) -> None:
+        row = self._rows.pop(node_id, None)
+        if row is None:
+            return
+        last = len(self._ids) - 1
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._ids[row] = self._ids[last]
+            self._rows[self._ids[row]] = row
+        self._ids.pop()
+
+    def get(self, node_id: str) -> Optional[np.ndarray]:
+        row = self._rows.get(node_id)
+        return None if row is None else self._vectors[row]
+
+    def search(self, vector: np.ndarray, k: int, exclude: Optional[str] = None) -> list[tuple[str, float]]:
+        size = len(self._ids)
+        if size == 0:
+            return []
+        scores = self._vectors[:size] @ vector.astype(np.float32)
+        if exclude is not None and exclude in self._rows:
+            scores[self._rows[exclude]] = -np.inf
+        k = min(k, size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[row], float(scores[row])) for row in top if np.isfinite(scores[row])]
+
+
+class VectorStore:
+    """
+    Stores node embeddings in the graph store and answers nearest-neighbour queries.
+
+    On Neo4j, embeddings are written with db.create.setNodeVectorProperty, which stores them
+    as a float32 array. Queries use the label's native vector index when the backend has one,
+    otherwise an InMemoryVectorIndex that is loaded from the store on first use and then
+    kept current by this process's writes.
+    """
+
+    def __init__(self, labels: Iterable[str] = EMBEDDED_LABELS, dimensions: Optional[int] = None):
+        self.labels = [validate_label(label) for label in labels]
+        self.dimensions = dimensions or settings.embedding_dimensions
+        self.native: dict[str, bool] = {label: False for label in self.labels}
+        self._indexes: dict[str, InMemoryVectorIndex] = {}
+        self._lock = asyncio.Lock()
+
+    async def ensure_indexes(self) -> None:
+        """
+        Create a native vector index per label where the backend supports it (Neo4j 5.11+).
+        """
+        if settings.vector_backend == "memory":
+            return
+        for label in self.labels:
+            self.native[label] = await get_store().ensure_vector_index(label, self.dimensions)
+
+    async def upsert(self, label: str, nodes: list[dict]) -> None:
+        """
+        Embed the nodes' name and description and store the vectors.
+        """
+        nodes = [node for node in nodes if node.get("id")]
+        if label not in self.labels or not nodes:
+            return
+        vectors = await asyncio.to_thread(embed, [node_text(node) for node in nodes])
+        rows = [{"id": node["id"], "vector": vector.tolist()} for node, vector in zip(nodes, vectors)]
+        await get_store().set_embeddings(label, rows)
+        index = self._indexes.get(label)
+        if index is not None:
+            index.upsert([row["id"] for row in rows], vectors)
+
+    def reset(self, label: str) -> None:
+        """
+        Drop a label's in-process index so it is reloaded from the store, e.g. after an import.
+        """
+        self._indexes.pop(label, None)
+
+    def remove(self, label: str, node_id: str) -> None:
+        index = self._indexes.get(label)
+        if index is not None:
+            index.remove(node_id)
+
+    async def similar(self, label: str, text: Optional[str] = None, node_id: Optional[str] = None, k: int = 10) -> list[dict]:
+        """
+        Find the k nodes of a label closest to a text or to an existing node.
+
+        Returns:
+            list[dict]: Hits with `label`, `score` (cosine similarity) and `node`, best first.
+        """
+        if label not in self.labels:
+            raise ValueError(f"{label} nodes are not embedded")
+        if self.native[label]:
+            return await self._similar_native(label, text, node_id, k)
+        index = await self._memory_index(label)
+        if node_id is not None:
+            vector = index.get(node_id)
+            if vector is None:
+                return []
+        else:
+            vector = (await asyncio.to_thread(embed, [text]))[0]
+        matches = index.search(vector, k, exclude=node_id)
+        nodes = await self._fetch(label, [match_id for match_id, _ in matches])
+        return [
+            {"label": label, "score": score, "node": nodes[match_id]}
+            for match_id, score in matches if match_id in nodes
+        ]
+
+    async def _similar_native(self, label: str, text: Optional[str], node_id: Optional[str], k: int) -> list[dict]:
+        if node_id is not None:
+            return await get_store().vector_query(label, k, node_id=node_id)
+        vector = (await asyncio.to_thread(embed, [text]))[0]
+        return await get_store().vector_query(label, k, vector=vector.tolist())
+
+    async def _memory_index(self, label: str) -> InMemoryVectorIndex:
+        if label in self._indexes:
+            return self._indexes[label]
+        async with self._lock:
+            if label not in self._indexes:
+                index = InMemoryVectorIndex(self.dimensions)
+                async for node_id, vector in get_store().embeddings(label):
+                    index.upsert([node_id], np.asarray([vector], dtype=np.float32))
+                self._indexes[label] = index
+        return self._indexes[label]
+
+    async def _fetch(self, label: str, ids: list[str]) -> dict[str, dict]:
+        return await get_store().get_many(label, ids)
+
+
+# Shared by the NodeManager and the similarity routes
+vector_store = VectorStore()
@@ -1,22 +1,71 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from prometheus_fastapi_instrumentator import Instrumentator
 
-from .routes import tasks, neo4j, agents, capabilities
+from .db.store import get_store
+from .db.vectors import vector_store
+from .routes import tasks, neo4j, agents, capabilities, search, results, changes
+from .services.assignment import assignment_scheduler
+from .services.dispatch import task_dispatcher
+from .services.results import result_cache
+from .services.stats import stats_service
+from .services.write_behind import write_behind
+from .utils.admission import AdmissionControlMiddleware
+from .utils.instrumentation import InstrumentedJSONResponse
+from .utils.logger import get_logger
 
 DEBUG: bool = True
 
+logger = get_logger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One graph store for the whole process (a pooled Neo4j driver by default), shared by every route
+    store = get_store()
+    await store.start()
+    try:
+        await store.ensure_schema()
+        await vector_store.ensure_indexes()
+    except Exception as e:
+        # Neo4j may still be starting; /neo4j/health reports the schema state
+        logger.warning("Schema bootstrap failed: %s", e)
+    try:
+        await task_dispatcher.start()
+    except Exception as e:
+        logger.warning("Message broker unavailable, assigned tasks will not be dispatched: %s", e)
+    stats_service.start()
+    assignment_scheduler.start()
+    result_cache.start()
+    write_behind.start()
+    yield
+    await write_behind.stop()
+    await result_cache.stop()
+    await assignment_scheduler.stop()
+    await task_dispatcher.stop()
+    await stats_service.stop()
+    await store.close()
+
 app = FastAPI(title="Primary API", 
               version="0.1.0",
               openapi_tags=[
                   {"name": "Tasks"},
                   {"name": "Neo4j"},
                   {"name": "Agents"},
-                  {"name": "Capabilities"}
+                  {"name": "Capabilities"},
+                  {"name": "Search"},
+                  {"name": "Results"},
+                  {"name": "Changes"}
               ],
               openapi_url="/openapi.json",
               servers=[{"url": "http://10.20.0.40:8100"}],
-              debug=DEBUG)
+              debug=DEBUG,
+              default_response_class=InstrumentedJSONResponse,
+              lifespan=lifespan)
+
+# Admission control runs inside the instrumentator, so rejected requests show up in its metrics
+app.add_middleware(AdmissionControlMiddleware)
 
 # Register Prometheus Instrumentator
 Instrumentator().instrument(app).expose(app)
@@ -26,6 +75,9 @@ app.include_router(tasks.router       , prefix="/tasks"       , tags=["Tasks"])
 app.include_router(neo4j.router       , prefix="/neo4j"       , tags=["Neo4j"])
 app.include_router(agents.router      , prefix="/agents"      , tags=["Agents"])
 app.include_router(capabilities.router, prefix="/capabilities", tags=["Capabilities"])
+app.include_router(search.router      , prefix="/search"      , tags=["Search"])
+app.include_router(results.router     , prefix="/results"     , tags=["Results"])
+app.include_router(changes.router     , prefix="/changes"     , tags=["Changes"])
 
 @app.get("/")
 async def read_root():
@@ -1,14 +1,16 @@
 from enum import Enum
-import re
-from pydantic import BaseModel, Field, ValidationError, model_validator
-from typing import Dict, Literal, Optional
-
-from ..db.neo4j import get_like_nodes, get_neo4j_driver
+from pydantic import AliasChoices, BaseModel, Field, model_validator
+from typing import Any, Dict, Literal, Optional
 
 
 class CypherQuery(BaseModel):
     query: str
     parameters: Dict[str, Optional[str]] = {}
+    access_mode: Literal["read", "write"] = "write"  # "read" routes to a read session and rejects writes
+    timeout: Optional[float] = Field(default=None, gt=0, description="Transaction timeout in seconds, capped by QUERY_TIMEOUT")
+    max_rows: Optional[int] = Field(default=None, gt=0, description="Row cap, capped by QUERY_MAX_ROWS")
+    cache: bool = Field(default=False, description="Serve read queries from the result cache")
+    cache_ttl: Optional[float] = Field(default=None, gt=0, description="Seconds to keep a cached result")
       
 class Relationship(BaseModel):
     start_node_label: str  # e.g., "Agent"
@@ -18,69 +20,150 @@ class Relationship(BaseModel):
     relationship_type: str # e.g., "ASSIGNED_TO"
     created_at: Optional[str] = None  # ISO 8601 timestamp
 
+class NodeRef(BaseModel):
+    label: str  # e.g., "Agent"
+    id: str     # e.g., "agent1"
+
+class TraversalRequest(BaseModel):
+    start: list[NodeRef] = Field(..., min_length=1, description="Nodes to start from")
+    direction: Literal["out", "in", "both"] = "out"
+    relationship_types: Optional[list[str]] = Field(default=None, description="Only follow these relationship types")
+    max_depth: int = Field(default=2, ge=1, description="Hops from the start nodes, capped by TRAVERSAL_MAX_DEPTH")
+    max_nodes: Optional[int] = Field(default=None, gt=0, description="Node budget, capped by TRAVERSAL_MAX_NODES")
+    max_fan_out: Optional[int] = Field(default=None, gt=0, description="Relationships followed per node, capped by TRAVERSAL_MAX_FAN_OUT")
+    fields: Optional[list[str]] = Field(default=None, description="Only return these node properties (plus id)")
+
+class SubgraphNode(BaseModel):
+    label: str
+    id: str
+    depth: int  # Hops from the nearest start node
+    properties: Dict = {}
+
+class SubgraphRelationship(BaseModel):
+    type: str
+    start_label: str
+    start_id: str
+    end_label: str
+    end_id: str
+
+class Subgraph(BaseModel):
+    nodes: list[SubgraphNode] = []
+    relationships: list[SubgraphRelationship] = []
+    truncated: bool = False  # True when the node or fan-out budget left parts of the neighbourhood out
+
 class NodeBase(BaseModel):
     name: str = Field(..., description="Human readable name for Node")
-    id: Optional[str] = None
+    id: Optional[str] = None  # Allocated on create by db.ids.IdAllocator when omitted
     description: Optional[str] = None
 
     class Config:
         from_attributes = True
         extra = 'allow'
-        
-    @model_validator(mode="before")
-    @classmethod
-    def generate_id(cls, values):
-        if not values.get('id'):
-            # Generate ID by converting name
-            base_id = re.sub(r"\W+", "_", values["name"].strip().lower())
-            values["id"] = base_id
-            
-            existing_ids = cls.check_existing_ids(base_id)
-            if existing_ids:
-                count = len(existing_ids) + 1
-                values["id"] = f"{base_id}_{count}"
-                
-        return values
-            
-            
-    @staticmethod
-    def check_existing_ids(base_id) -> list[str]:
-        existing_ids = []
-        for node in get_like_nodes("id", base_id):
-            if node["n"]["id"] == base_id:
-                existing_ids.append(node["n"]["id"])
-        return existing_ids
 
 class Agent(NodeBase):
     capabilities: list[str] = []  # A list of capabilities the agent can perform
     base_prompt: str = "You are an agent"
+    base_prompt_version: Optional[int] = None  # Set by services.prompts.PromptHistory once the prompt has history
+
+class AgentEvolution(BaseModel):
+    base_prompt: Optional[str] = Field(default=None, description="New base prompt, or keep the current one")
+    capabilities: Optional[list[str]] = Field(default=None, description="New capabilities, or keep the current ones")
+    reason: Optional[str] = Field(default=None, description="Why the agent changed, kept with the version")
+    task_id: Optional[str] = Field(default=None, description="Completed task that led to the change")
+
+class AgentVersionInfo(BaseModel):
+    agent_id: str
+    version: int
+    kind: str                            # checkpoint | delta, or "current" for an agent without history
+    checkpoint: Optional[int] = None     # Version the content is rebuilt from
+    size: Optional[int] = None           # Compressed bytes stored
+    created_at: Optional[float] = None
+    reason: Optional[str] = None
+    task_id: Optional[str] = None
+
+class AgentVersion(AgentVersionInfo):
+    base_prompt: str
+    capabilities: list[str] = []
+
+class AgentVersionDiff(BaseModel):
+    agent_id: str
+    from_version: int
+    to_version: int
+    diff: str                            # Unified diff of the base prompt
+    capabilities_added: list[str] = []
+    capabilities_removed: list[str] = []
+
+class AgentHeartbeat(BaseModel):
+    in_flight: int = 0      # Tasks the agent is executing right now
+    completed: int = 0      # Tasks completed since the agent process started
+    failed: int = 0         # Task attempts that failed since the agent process started
+    queue_depth: int = 0    # Messages waiting in the agent's queues
 
 class TaskStatus(str, Enum):
     UNASSIGNED  = "UNASSIGNED" # Default Status
     ASSIGNED    = "ASSIGNED"   # Task is assigned to an agent, but not yet started
     IN_PROGRESS = "IN_PROGRESS"# Task is in progress
     COMPLETED   = "COMPLETED"  # Task is completed
+    FAILED      = "FAILED"     # Task failed on every attempt and was dead-lettered
 
 class Task(NodeBase):
     status: TaskStatus = TaskStatus.UNASSIGNED # Default Status
-    asignee: Optional[Agent] = None
+    required_capabilities: list[str] = []  # An agent must have all of these to be assigned the task
+    # Id of the agent the task is assigned to; "asignee" is the field's former (misspelled) name
+    assignee: Optional[str] = Field(default=None, validation_alias=AliasChoices("assignee", "asignee"))
     
     @model_validator(mode="before")
     @classmethod
     def aut_update_status(cls, values):
-        if values.get("assignee") and values.get("status") == TaskStatus.UNASSIGNED:
+        # A task given an assignee is assigned unless the body says it is further along
+        if isinstance(values, dict) and (values.get("assignee") or values.get("asignee")) \
+                and values.get("status") in (None, TaskStatus.UNASSIGNED):
             values["status"] = TaskStatus.ASSIGNED
         return values
     
     @model_validator(mode="after")
     def validate_status(self):
         if self.status in {TaskStatus.ASSIGNED, TaskStatus.IN_PROGRESS, TaskStatus.COMPLETED} and not self.assignee:
-            raise ValidationError(f"Cannot set status to {self.status} without an assignee.")
+            raise ValueError(f"Cannot set status to {self.status} without an assignee.")
         return self
     
 class Capability(NodeBase):
     valid_relationships: list[str] = Field(default_factory=list, description="List of valid relationships for this capability", examples=["ASSIGNED_TO", "CAN_EXECUTE", "USES"])
 
+# Response models of the labels served by the node routes; other labels read as NodeBase
+NODE_MODELS: dict[str, type[NodeBase]] = {"Agent": Agent, "Task": Task, "Capability": Capability}
+
 class NodeUpdate(BaseModel):
     updates: Dict[str, Optional[str]] = Field(default=None, description="Dictionary of updates to apply to the node", examples={"name": "New Name", "description": "New Description"})
     operation: Literal["overwrite", "append", "remove"] = "overwrite"
+
+class BulkItemResult(BaseModel):
+    index: int                  # Position of the item in the request body
+    id: Optional[str] = None
+    status: Literal["created", "failed"]
+    error: Optional[str] = None
+    unresolved_links: list[str] = []  # Linked names that matched no node, so no relationship was created
+
+class BulkResult(BaseModel):
+    created: int = 0
+    failed: int = 0
+    items: list[BulkItemResult] = []
+
+class ResultClaim(BaseModel):
+    task_id: str
+    agent_id: str
+    wait: Optional[float] = Field(default=None, ge=0, description="Seconds to wait for an identical running task")
+
+class ResultClaimResponse(BaseModel):
+    key: str
+    status: Literal["hit", "miss", "pending"]
+    result: Optional[Any] = None
+
+class ResultSubmission(BaseModel):
+    task_id: Optional[str] = None
+    result: Any
+
+class SearchHit(BaseModel):
+    label: str
+    score: float
+    node: Dict = Field(default_factory=dict, description="Properties of the matching node")
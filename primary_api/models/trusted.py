@@ -0,0 +1,114 @@
+import copy
+import functools
+from enum import Enum
+from typing import Iterable, Optional, Type, Union
+
+from pydantic import BaseModel, TypeAdapter
+
+from .models import NODE_MODELS, NodeBase
+
+
+class TrustedModel:
+    """
+    Builds and serializes one model class from properties the store already validated on write.
+
+    `construct` fills in the model's fields like `model_construct`, but from defaults resolved
+    once per class and without running the field or model validators; enum values are turned
+    back into members so serialization stays exact. `dump_json` encodes in pydantic-core
+    straight to bytes, so the response is not validated and encoded a second time by FastAPI.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        fields = model.model_fields
+        # (name, default, factory) in declaration order, which is the serialization order
+        self.fields = []
+        for name, field in fields.items():
+            factory = field.default_factory
+            if factory is None and isinstance(field.default, (list, dict, set)):
+                # Mutable defaults are copied per instance, as pydantic does
+                factory = functools.partial(copy.copy, field.default)
+            self.fields.append((name, field.default, factory))
+        self.enums = {
+            name: field.annotation for name, field in fields.items()
+            if isinstance(field.annotation, type) and issubclass(field.annotation, Enum)
+        }
+        self.extra_allowed = model.model_config.get("extra") == "allow"
+        self._field_adapters = {name: TypeAdapter(field.annotation) for name, field in fields.items()}
+        self._adapter = TypeAdapter(model)
+        self._list_adapter = TypeAdapter(list[model])
+
+    def construct(self, properties: dict) -> BaseModel:
+        values = {name: default if factory is None else factory() for name, default, factory in self.fields}
+        fields_set, extra = set(), {}
+        for name, value in properties.items():
+            if name in values:
+                enum = self.enums.get(name)
+                values[name] = enum(value) if enum is not None and value is not None else value
+                fields_set.add(name)
+            elif self.extra_allowed:
+                extra[name] = value
+        instance = self.model.__new__(self.model)
+        # The same attributes model_construct sets; the node models have no private attributes
+        object.__setattr__(instance, "__dict__", values)
+        object.__setattr__(instance, "__pydantic_fields_set__", fields_set)
+        object.__setattr__(instance, "__pydantic_extra__", extra if self.extra_allowed else None)
+        object.__setattr__(instance, "__pydantic_private__", None)
+        return instance
+
+    def validate_update(self, current: BaseModel, updates: dict, operation: str = "overwrite") -> dict:
+        """
+        Check that a node is still a valid model after an update, before it is written.
+
+        The update is applied as the stores apply it (`remove` and null values unset a
+        property), and the result is validated with the model's field and model validators.
+
+        Returns:
+            dict: The node's properties after the update. Raises ValueError if they are invalid.
+        """
+        properties = current.model_dump(exclude_none=True)
+        for key, value in (updates or {}).items():
+            if operation == "remove" or value is None:
+                properties.pop(key, None)
+            else:
+                properties[key] = value
+        self._adapter.validate_python(properties)
+        return properties
+
+    def validate_properties(self, properties: dict) -> dict:
+        """
+        Validate property updates that skip the model (e.g. buffered ones) against the field types.
+
+        Returns the values in stored form, enum members as their values; properties the model
+        does not declare pass unchanged. Raises ValueError on a bad value.
+        """
+        validated = {}
+        for name, value in properties.items():
+            adapter = self._field_adapters.get(name)
+            if adapter is not None:
+                value = adapter.validate_python(value)
+            validated[name] = value.value if isinstance(value, Enum) else value
+        return validated
+
+    def construct_many(self, rows: Iterable[dict]) -> list[BaseModel]:
+        return [self.construct(properties) for properties in rows]
+
+    def dump_json(self, content: Union[BaseModel, list[BaseModel]]) -> bytes:
+        if isinstance(content, list):
+            return self._list_adapter.dump_json(content)
+        return self._adapter.dump_json(content)
+
+
+@functools.cache
+def trusted(model: Type[BaseModel]) -> TrustedModel:
+    """
+    The cached TrustedModel of a model class; adapters are built once per class.
+    """
+    return TrustedModel(model)
+
+
+def trusted_node_model(label: Optional[str]) -> TrustedModel:
+    """
+    The TrustedModel of a label's response model, NodeBase for labels without one.
+    """
+    return trusted(NODE_MODELS.get(label, NodeBase))
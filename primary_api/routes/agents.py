@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+import time
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional
 from prometheus_client import Counter
 
+from ..config import settings
 from ..db.NodeManager import NodeManager
-from ..db.neo4j import get_neo4j_driver
-from ..models.models import Agent, NodeUpdate
+from ..models.models import Agent, AgentEvolution, AgentHeartbeat, AgentVersion, AgentVersionDiff, AgentVersionInfo, NodeUpdate, BulkResult
+from ..models.trusted import trusted
+from ..services.prompts import VersionConflictError, prompt_history
+from ..utils.streaming import model_response, ndjson_response, set_next_cursor, wants_ndjson
 
 # Initialize the APIRouter
 router = APIRouter()
@@ -13,10 +17,11 @@ router = APIRouter()
 agent_creation_counter = Counter("agent_creation_count", "Number of agents")
 agent_deletion_counter = Counter("agent_deletion_count", "Number of agents")
 
-# Neo4j driver (replace with your driver instance)
-driver = get_neo4j_driver()
-# Instantiate the NodeManager
-manager = NodeManager(driver)
+# Instantiate the NodeManager (uses the shared store owned by the app lifespan)
+manager = NodeManager()
+
+# Agent properties that change only as a new prompt version, so cached results stay keyed to their prompt
+VERSIONED_PROPERTIES = ("base_prompt", "capabilities")
 
 # Create
 @router.post("/", response_model=Agent)
@@ -24,33 +29,49 @@ async def create_agent(data: Agent):
     """
     Create a new agent.
     """
-    result = manager.create_node("Agent", data)
+    result = await manager.create_node("Agent", data)
     if not result:
         raise HTTPException(status_code=400, detail="Failed to create agent")
-    # Add capabilities as relationships
-    for capability_name in data.capabilities:
-        capability_id = capability_name.replace(" ", "_")
-        manager.create_relationship("Agent", data.id, "Capability", capability_id, capability_name)
-    return {"Agent created successfully": data}
+    agent_creation_counter.inc()
+    # Add capabilities as relationships, matched by capability id or name
+    await manager.link_node("Agent", data.id, data.capabilities)
+    return data
+
+@router.post("/bulk", response_model=BulkResult)
+async def create_agents_bulk(data: List[Agent], batch_size: Optional[int] = Query(default=None, gt=0)) -> BulkResult:
+    """
+    Create many agents in batched UNWIND transactions.
+    """
+    result = await manager.create_nodes("Agent", data, link_property="capabilities", batch_size=batch_size)
+    agent_creation_counter.inc(result.created)
+    return result
 
 # Read
 @router.get("/", response_model=List[Agent])
-async def get_agents() -> List[Agent]:
+async def get_agents(request: Request, response: Response,
+        after: Optional[str] = Query(default=None, description="Return nodes with an id after this cursor"),
+        limit: int = Query(default=settings.page_size, gt=0, le=settings.max_page_size)):
     """
-    Get all agents.
+    List agents ordered by id, one page at a time.
+
+    Follow the `X-Next-Cursor` response header with `?after=` to read the next page, or send
+    `Accept: application/x-ndjson` to stream every agent.
     """
-    agents = manager.get_nodes("Agent")
-    return [Agent(**agent["n"]) for agent in agents]
+    if wants_ndjson(request):
+        return ndjson_response(manager.stream_nodes("Agent", after), Agent)
+    agents = await manager.get_page("Agent", after, limit)
+    set_next_cursor(response, agents, limit)
+    return model_response(Agent, agents, response)
 
 @router.get("/{agent_id}", response_model=Agent)
-async def get_agent(agent_id: str) -> Agent:
+async def get_agent(agent_id: str):
     """
     Get an agent by ID.
     """
-    agent = manager.get_node("Agent", agent_id)
+    agent = await manager.get_node("Agent", agent_id)
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found.")
-    return Agent(**agent["n"])
+    return model_response(Agent, agent)
 
 # Update
 @router.put("/{agent_id}", response_model=Agent)
@@ -65,14 +86,117 @@ async def update_agent(agent_id: str, update: NodeUpdate) -> dict:
         - `overwrite`: Replace existing capabilities with the provided list.
         - `append`: Add the provided capabilities to the existing ones.
         - `remove`: Remove the provided capabilities from the existing ones.
+
+    A change to `base_prompt` or `capabilities` is stored as a new version (see
+    `/agents/{agent_id}/versions`), so they cannot be removed, and `base_prompt_version` is
+    set by the version history only.
     """
-    agent = manager.update_node("Agent", agent_id, update.updates, update.operation)
+    updates = dict(update.updates or {})
+    versioned = {key: updates.pop(key) for key in VERSIONED_PROPERTIES if key in updates}
+    if "base_prompt_version" in updates:
+        raise HTTPException(status_code=400, detail="base_prompt_version is set by the agent's version history.")
+    if versioned and (update.operation == "remove" or None in versioned.values()):
+        raise HTTPException(status_code=400, detail="base_prompt and capabilities can be changed, not removed.")
+    if versioned:
+        current = await manager.get_node("Agent", agent_id)
+        if not current:
+            raise HTTPException(status_code=404, detail="Agent not found.")
+        try:
+            trusted(Agent).validate_update(current, update.updates, update.operation)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid update: {e}")
+        agent = await _evolve(agent_id, reason="update", properties=updates, **versioned)
+        return model_response(Agent, trusted(Agent).construct(agent))
+    try:
+        agent = await manager.update_node("Agent", agent_id, update.updates, update.operation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid update: {e}")
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found.")
-    return {"Agent updated successfully": agent}
+    # Validated before the write, so the stored node is built without validating it again
+    return model_response(Agent, trusted(Agent).construct(agent))
+
+@router.post("/{agent_id}/heartbeat")
+async def agent_heartbeat(agent_id: str, heartbeat: AgentHeartbeat) -> dict:
+    """
+    Record an agent's liveness and load, sent periodically by the agent runtime.
+    """
+    # Stores the latest heartbeat on the agent node
+    row = {"id": agent_id, "set": {"last_heartbeat": time.time(), **heartbeat.model_dump()}}
+    updated = await manager.update_nodes("Agent", [row])
+    if not updated:
+        raise HTTPException(status_code=404, detail="Agent not found.")
+    return {"message": "Heartbeat recorded", "last_heartbeat": row["set"]["last_heartbeat"]}
+
+# Versions
+async def _evolve(agent_id: str, **change) -> dict:
+    try:
+        return await prompt_history.commit(agent_id, **change)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Agent not found.")
+    except VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.post("/{agent_id}/versions", response_model=Agent)
+async def evolve_agent(agent_id: str, evolution: AgentEvolution) -> Agent:
+    """
+    Change an agent's base prompt and/or capabilities as a new version, e.g. after a completed task.
+
+    Answers 409 if the agent changed concurrently; re-read it and retry.
+    """
+    agent = await _evolve(agent_id, base_prompt=evolution.base_prompt, capabilities=evolution.capabilities,
+                          reason=evolution.reason, task_id=evolution.task_id)
+    return Agent(**agent)
+
+@router.get("/{agent_id}/versions", response_model=List[AgentVersionInfo])
+async def get_agent_versions(agent_id: str,
+        before: Optional[int] = Query(default=None, gt=1, description="Return versions older than this one"),
+        limit: int = Query(default=20, gt=0, le=settings.max_page_size)):
+    """
+    List an agent's prompt versions, newest first.
+    """
+    try:
+        return await prompt_history.versions(agent_id, before, limit)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Agent not found.")
+
+@router.get("/{agent_id}/versions/{version}", response_model=AgentVersion)
+async def get_agent_version(agent_id: str, version: int):
+    """
+    Get the base prompt and capabilities of one version of an agent.
+    """
+    try:
+        return await prompt_history.get(agent_id, version)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/{agent_id}/versions/{version}/diff", response_model=AgentVersionDiff)
+async def diff_agent_version(agent_id: str, version: int,
+        against: Optional[int] = Query(default=None, ge=1, description="Version to compare with, by default the previous one")):
+    """
+    Diff a version's base prompt and capabilities against another version.
+    """
+    try:
+        return await prompt_history.diff(agent_id, version, against)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/{agent_id}/versions/{version}/rollback", response_model=Agent)
+async def rollback_agent(agent_id: str, version: int, reason: Optional[str] = Query(default=None)) -> Agent:
+    """
+    Make the content of an earlier version current again, recorded as a new version.
+    """
+    try:
+        agent = await prompt_history.rollback(agent_id, version, reason)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Agent(**agent)
 
 # Delete
 @router.delete("/{agent_id}")
 async def delete_agent(agent_id: str) -> dict:
-    manager.delete_node("Agent", agent_id)
+    await manager.delete_node("Agent", agent_id)
+    agent_deletion_counter.inc()
     return {"message": "Agent deleted"}
\ No newline at end of file
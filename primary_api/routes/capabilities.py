@@ -1,10 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional
 from prometheus_client import Counter
 
+from ..config import settings
 from ..db.NodeManager import NodeManager
-from ..db.neo4j import get_neo4j_driver
-from ..models.models import Capability, NodeUpdate
+from ..db.vectors import vector_store
+from ..models.models import Capability, NodeUpdate, BulkResult, SearchHit
+from ..models.trusted import trusted
+from ..utils.streaming import model_response, ndjson_response, set_next_cursor, wants_ndjson
 
 # Initialize the FastAPI router
 router = APIRouter()
@@ -13,35 +16,66 @@ router = APIRouter()
 capability_creation_counter = Counter("capability_creation_count", "Number of capabilities")
 capability_deletion_counter = Counter("capability_deletion_count", "Number of capabilities")
 
-# Neo4j driver (replace with your driver instance)
-driver = get_neo4j_driver()
-# Instantiate the NodeManager
-manager = NodeManager(driver)
+# Instantiate the NodeManager (uses the shared store owned by the app lifespan)
+manager = NodeManager()
 
 # Create
 @router.post("/", response_model=Capability)
 async def create_capability(data: Capability) -> dict:
-    result = manager.create_node("Capability", data)
+    result = await manager.create_node("Capability", data)
     if not result:
         raise HTTPException(status_code=400, detail="Failed to create capability")
     capability_creation_counter.inc()
-    return {"Capability created successfully": data}
+    return data
+
+@router.post("/bulk", response_model=BulkResult)
+async def create_capabilities_bulk(data: List[Capability], batch_size: Optional[int] = Query(default=None, gt=0)) -> BulkResult:
+    """
+    Create many capabilities in batched UNWIND transactions.
+    """
+    result = await manager.create_nodes("Capability", data, batch_size=batch_size)
+    capability_creation_counter.inc(result.created)
+    return result
 
 # Read
 @router.get("/", response_model=List[Capability])
-async def list_capabilities() -> List[Capability]:
-    results = manager.get_nodes("Capability")
-    return [Capability(**record["n"]) for record in results]
+async def list_capabilities(request: Request, response: Response,
+        after: Optional[str] = Query(default=None, description="Return nodes with an id after this cursor"),
+        limit: int = Query(default=settings.page_size, gt=0, le=settings.max_page_size)):
+    """
+    List capabilities ordered by id, one page at a time.
+
+    Follow the `X-Next-Cursor` response header with `?after=` to read the next page, or send
+    `Accept: application/x-ndjson` to stream every capability.
+    """
+    if wants_ndjson(request):
+        return ndjson_response(manager.stream_nodes("Capability", after), Capability)
+    results = await manager.get_page("Capability", after, limit)
+    set_next_cursor(response, results, limit)
+    return model_response(Capability, results, response)
+
+@router.get("/similar", response_model=List[SearchHit])
+async def similar_capabilities(
+        q: Optional[str] = Query(default=None, min_length=1, description="Text to match capability descriptions against"),
+        id: Optional[str] = Query(default=None, description="Find capabilities similar to this one instead"),
+        k: int = Query(default=10, gt=0, le=100)) -> List[SearchHit]:
+    """
+    Find the k capabilities whose embedded name and description are closest to a text or to another capability.
+    """
+    if (q is None) == (id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of 'q' or 'id'")
+    hits = await vector_store.similar("Capability", text=q, node_id=id, k=k)
+    return [SearchHit(**hit) for hit in hits]
 
 @router.get("/{id}", response_model=Capability)
-async def get_capability(id: str) -> Capability:
+async def get_capability(id: str):
     """
     Get a capability by ID.
     """
-    result = manager.get_node("Capability", id)
+    result = await manager.get_node("Capability", id)
     if not result:
         raise HTTPException(status_code=404, detail="Capability not found")
-    return Capability(**result["n"])
+    return model_response(Capability, result)
 
 # Update
 @router.put("/{id}", response_model=Capability)
@@ -56,14 +90,18 @@ async def update_capability(id: str, update_data: NodeUpdate) -> dict:
         - `append`: Add the provided capabilities to the existing ones.
         - `remove`: Remove the provided capabilities from the existing ones.
     """
-    capability = manager.update_node("Capability", id, update_data.updates, update_data.operation)
+    try:
+        capability = await manager.update_node("Capability", id, update_data.updates, update_data.operation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid update: {e}")
     if not capability:
         raise HTTPException(status_code=400, detail="Failed to update capability")
-    return {"Capability updated successfully": capability}
+    # Validated before the write, so the stored node is built without validating it again
+    return model_response(Capability, trusted(Capability).construct(capability))
 
 # DELETE endpoint
 @router.delete("/{id}")
 async def delete_capability(id: str) -> dict:
-    manager.delete_node("Capability", id)
+    await manager.delete_node("Capability", id)
     capability_deletion_counter.inc()
     return {"message": "Capability deleted"}
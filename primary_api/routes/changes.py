@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from ..config import settings
+from ..models.models import TaskStatus
+from ..services.changes import Subscription, change_feed
+
+router = APIRouter()
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+def _subscribe(labels: Optional[List[str]], ids: Optional[List[str]], status: Optional[List[TaskStatus]],
+               after: Optional[int]) -> Subscription:
+    return change_feed.subscribe(labels, ids, [value.value for value in status or []], after)
+
+@router.get("/stream")
+async def stream_changes(request: Request,
+        labels: Optional[List[str]] = Query(default=None, description="Only changes of nodes with these labels"),
+        ids: Optional[List[str]] = Query(default=None, description="Only changes of these node ids"),
+        status: Optional[List[TaskStatus]] = Query(default=None, description="Only changes leaving a node in these statuses"),
+        after: Optional[int] = Query(default=None, ge=0, description="Resume after this sequence number"),
+        last_event_id: Optional[str] = Header(default=None)):
+    """
+    Server-sent events feed of writes made through the API, instead of polling `GET /tasks`.
+
+    Every event's `id` is its sequence number, and its `data` a JSON change with `seq`, `event`
+    (create, update, delete, relationship), `label`, `id` and, when set, the node's `status`.
+    Reconnecting EventSource clients resume through `Last-Event-ID`; others pass `?after=`.
+    A `reset` change means the resume point was lost and state should be re-read; an
+    `overflow` change ends a stream that fell too far behind, to be resumed from its `seq`.
+    """
+    if after is None and last_event_id:
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID must be a sequence number")
+    subscription = _subscribe(labels, ids, status, after)
+
+    async def events():
+        try:
+            while True:
+                change = await subscription.next(settings.change_feed_keepalive)
+                if change is None:
+                    # Keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {change['seq']}\ndata: {json.dumps(change)}\n\n"
+                if change["event"] == "overflow":
+                    return
+        finally:
+            change_feed.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type=SSE_MEDIA_TYPE, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/ws")
+async def websocket_changes(websocket: WebSocket,
+        labels: Optional[List[str]] = Query(default=None),
+        ids: Optional[List[str]] = Query(default=None),
+        status: Optional[List[TaskStatus]] = Query(default=None),
+        after: Optional[int] = Query(default=None, ge=0)):
+    """
+    The change feed of `/changes/stream` over a WebSocket, one JSON change per message.
+    """
+    await websocket.accept()
+    subscription = _subscribe(labels, ids, status, after)
+
+    async def send():
+        while True:
+            change = await subscription.next()
+            await websocket.send_json(change)
+            if change["event"] == "overflow":
+                return
+
+    async def receive():
+        # Notices a client that went away while the feed is idle
+        while True:
+            await websocket.receive_text()
+
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        change_feed.unsubscribe(subscription)
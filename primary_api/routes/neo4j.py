@@ -1,51 +1,78 @@
-from fastapi import APIRouter, HTTPException
-from ..db.neo4j import get_neo4j_driver
-from ..models.models import CypherQuery, Relationship
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from neo4j.exceptions import ClientError
+from ..config import settings
+from ..db.NodeManager import NodeManager
+from ..db.query import run_query, stream_query
+from ..db.store import get_store
+from ..db.transfer import MEDIA_TYPE, export_graph, export_labels, import_graph
+from ..db.traversal import traverse
+from ..models.models import CypherQuery, Relationship, Subgraph, SubgraphNode, SubgraphRelationship, TraversalRequest
+from ..services.assignment import assignment_scheduler
+from ..services.stats import stats_service
+from ..utils.streaming import ndjson_response, wants_ndjson
 
 router = APIRouter()
 
+# Instantiate the NodeManager (uses the shared store owned by the app lifespan)
+manager = NodeManager()
+
 #region Metadata
 @router.get("/stats")
 async def get_database_stats():
     """
-    Retrieve basic statistics about the Neo4j database.
+    Retrieve statistics about the Neo4j database: total, per-label and per-relationship-type
+    counts plus task counts per status. Results are cached for STATS_TTL seconds.
     """
-    driver = get_neo4j_driver()
-    with driver.session() as session:
-        node_count = session.run("MATCH (n) RETURN COUNT(n) AS count").single()["count"]
-        relationship_count = session.run("MATCH ()-[r]->() RETURN COUNT(r) AS count").single()["count"]
-    return {
-        "node_count": node_count,
-        "relationship_count": relationship_count
-    }
+    return await stats_service.get()
     
 @router.get("/health")
 async def health_check():
     """
-    Check the health of the Neo4j database connection.
+    Check the health of the graph backend: the Neo4j connection and the population state of
+    its indexes, or the size and snapshot state of the embedded graph.
     """
-    driver = get_neo4j_driver()
     try:
-        with driver.session() as session:
-            session.run("RETURN 1")
-        return {"status": "healthy"}
+        return {"status": "healthy", **await get_store().health()}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
 
+@router.post("/labels/{label}")
+async def register_label(label: str):
+    """
+    Register a node label, creating its id constraint and status/name indexes.
+    """
+    store = get_store()
+    try:
+        await store.ensure_label(label)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": f"Label {label} registered", "labels": store.labels}
+
 #endregion
 
 @router.post("/query")
-async def run_custom_query(query: CypherQuery):
+async def run_custom_query(query: CypherQuery, request: Request):
     """
     Execute a custom Cypher query against the Neo4j database.
+
+    The query runs with a transaction timeout and stops after a maximum number of rows.
+    Set `access_mode` to `read` to run it in a read session, and `cache` to serve repeated
+    read queries from the result cache. Send `Accept: application/x-ndjson` to stream the rows.
+    Only available with the Neo4j graph backend.
     """
-    driver = get_neo4j_driver()
+    if not get_store().supports_cypher:
+        raise HTTPException(status_code=501, detail="Cypher queries need GRAPH_BACKEND=neo4j")
     try:
-        with driver.session() as session:
-            result = session.run(query.query, query.parameters)
-            # Return the query results as a list of dictionaries
-            records = [record.data() for record in result]
-        return {"result": records}
+        if wants_ndjson(request):
+            return ndjson_response(await stream_query(query))
+        return await run_query(query)
+    except ClientError as e:
+        if "TransactionTimedOut" in (e.code or ""):
+            raise HTTPException(status_code=408, detail=f"Query timed out: {e.message}")
+        raise HTTPException(status_code=400, detail=f"Query failed: {e.message}")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Query failed: {str(e)}")
 
@@ -54,58 +81,93 @@ async def create_relationship(relationship: Relationship):
     """
     Create a relationship between two nodes in Neo4j.
     """
-    driver = get_neo4j_driver()
-    with driver.session() as session:
-        # Validate that both nodes exist
-        start_node_exists = session.run(
-            f"MATCH (n:{relationship.start_node_label} {{id: $id}}) RETURN n",
-            {"id": relationship.start_node_id}
-        ).single()
-        end_node_exists = session.run(
-            f"MATCH (n:{relationship.end_node_label} {{id: $id}}) RETURN n",
-            {"id": relationship.end_node_id}
-        ).single()
-
-        if not start_node_exists or not end_node_exists:
-            raise HTTPException(
-                status_code=404,
-                detail="Start or end node not found in the database."
-            )
-
-        # Create the relationship
-        session.run(
-            f"""
-            MATCH (a:{relationship.start_node_label} {{id: $start_id}})
-            MATCH (b:{relationship.end_node_label} {{id: $end_id}})
-            MERGE (a)-[r:{relationship.relationship_type}]->(b)
-            """,
-            {
-                "start_id": relationship.start_node_id,
-                "end_id": relationship.end_node_id,
-            }
+    # Merged, so an existing identical relationship is not duplicated; the NodeManager tells
+    # the caches, the change feed and the assignment index about it
+    created = await manager.create_relationship(
+        relationship.start_node_label, relationship.start_node_id,
+        relationship.end_node_label, relationship.end_node_id,
+        relationship.relationship_type, merge=True
+    )
+    if not created:
+        raise HTTPException(
+            status_code=404,
+            detail="Start or end node not found in the database."
         )
     return {"message": "Relationship created successfully"}
 
+@router.post("/traverse", response_model=Subgraph)
+async def traverse_subgraph(traversal: TraversalRequest, request: Request):
+    """
+    Return the subgraph reachable from the start nodes in one request.
+
+    The traversal is breadth-first, follows relationships in `direction` (optionally only of
+    `relationship_types`) up to `max_depth` hops, and stops adding nodes at `max_nodes` and
+    following relationships of a node at `max_fan_out`; `truncated` tells whether a budget was hit.
+    Send `Accept: application/x-ndjson` to stream nodes and relationships as they are found,
+    followed by a summary line.
+    """
+    try:
+        items = traverse(traversal)
+        if wants_ndjson(request):
+            # Fail before the response starts if the request is invalid
+            first = await anext(items)
+
+            async def stream():
+                yield first
+                async for item in items:
+                    yield item
+            return ndjson_response(stream())
+        subgraph = Subgraph()
+        async for item in items:
+            kind = item.pop("kind")
+            if kind == "node":
+                subgraph.nodes.append(SubgraphNode(**item))
+            elif kind == "relationship":
+                subgraph.relationships.append(SubgraphRelationship(**item))
+            else:
+                subgraph.truncated = item["truncated"]
+        return subgraph
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/relationships/{node_label}/{node_id}")
 async def get_relationships(node_label: str, node_id: str):
     """
     Retrieve all relationships for a given node.
     """
-    driver = get_neo4j_driver()
-    with driver.session() as session:
-        result = session.run(
-            f"""
-            MATCH (n:{node_label} {{id: $id}})-[r]->(m)
-            RETURN type(r) AS relationship_type, labels(m) AS end_node_labels, m.id AS end_node_id
-            """,
-            {"id": node_id}
-        )
-        relationships = [
-            {
-                "relationship_type": record["relationship_type"],
-                "end_node_labels": record["end_node_labels"],
-                "end_node_id": record["end_node_id"],
-            }
-            for record in result
-        ]
-    return {"relationships": relationships}
\ No newline at end of file
+    return {"relationships": await get_store().relationships(node_label, node_id)}
+
+#region Export and import
+@router.get("/export")
+async def export_graph_snapshot(labels: Optional[list[str]] = Query(default=None)):
+    """
+    Stream a snapshot of the graph, or of the given `labels`, as length-prefixed msgpack frames:
+    nodes and embeddings per label, id counters, then relationships. Memory use does not grow
+    with the graph, so the snapshot can be piped straight into `/neo4j/import` of another instance.
+    """
+    try:
+        labels = await export_labels(labels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        export_graph(labels), media_type=MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="graph.msgpack"'}
+    )
+
+@router.post("/import")
+async def import_graph_snapshot(request: Request):
+    """
+    Load a snapshot written by `/neo4j/export` from the request body as it arrives.
+
+    Nodes are upserted by id in batched writes, in parallel across labels, and relationships
+    are merged, so importing the same snapshot twice leaves the graph unchanged.
+    """
+    try:
+        counts = await import_graph(request.stream())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if settings.assignment_enabled:
+        await assignment_scheduler.reload()
+    return {"message": "Graph imported", **counts}
+
+#endregion
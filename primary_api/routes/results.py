@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException
+
+from ..db.NodeManager import NodeManager
+from ..models.models import ResultClaim, ResultClaimResponse, ResultSubmission
+from ..services.results import result_cache, result_key
+
+router = APIRouter()
+
+manager = NodeManager()
+
+@router.post("/claim", response_model=ResultClaimResponse)
+async def claim_result(claim: ResultClaim) -> ResultClaimResponse:
+    """
+    Ask for a task's result before executing it.
+
+    - `hit`: an identical task already ran; `result` holds its output and the task is linked to it.
+    - `miss`: the caller should execute the task and `PUT /results/{key}` (or release the key on failure).
+    - `pending`: an identical task is still running after `wait` seconds; claim again later.
+    """
+    task = await manager.get_node("Task", claim.task_id)
+    agent = await manager.get_node("Agent", claim.agent_id)
+    if not task or not agent:
+        raise HTTPException(status_code=404, detail="Task or agent not found.")
+    key = result_key(task.model_dump(), agent.model_dump())
+    outcome = await result_cache.claim(key, claim.task_id, claim.wait)
+    return ResultClaimResponse(key=key, **outcome)
+
+@router.put("/{key}")
+async def submit_result(key: str, submission: ResultSubmission) -> dict:
+    """
+    Store the result of a claimed key and wake the tasks waiting for it.
+    """
+    await result_cache.complete(key, submission.result, submission.task_id)
+    return {"message": "Result cached", "key": key}
+
+@router.delete("/{key}/claim")
+async def release_result(key: str) -> dict:
+    """
+    Give up a claim without a result, so a waiting identical task executes instead.
+    """
+    result_cache.release(key)
+    return {"message": "Claim released", "key": key}
+
+@router.get("/{key}")
+async def get_result(key: str) -> dict:
+    result = await result_cache.get(key)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Result not cached.")
+    return {"key": key, "result": result}
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+
+from ..db.store import get_store
+from ..models.models import SearchHit
+
+router = APIRouter()
+
+@router.get("/", response_model=List[SearchHit])
+async def search(
+        q: str = Query(..., min_length=1, description="Words to look for in node names and descriptions"),
+        labels: Optional[List[str]] = Query(default=None, description="Restrict the search to these labels"),
+        limit: int = Query(default=20, gt=0, le=1000)) -> List[SearchHit]:
+    """
+    Full-text search over node names and descriptions, best matches first.
+    """
+    try:
+        hits = await get_store().search(q, labels, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [SearchHit(**hit) for hit in hits]
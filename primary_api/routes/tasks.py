@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional
 from prometheus_client import Counter
 
+from ..config import settings
 from ..db.NodeManager import NodeManager
-from ..db.neo4j import get_neo4j_driver, node_exists
-from ..models.models import Task, NodeUpdate
+from ..models.models import Task, TaskStatus, NodeUpdate, BulkResult
+from ..models.trusted import trusted
+from ..services.assignment import assignment_scheduler
+from ..services.write_behind import write_behind
+from ..utils.streaming import model_response, ndjson_response, set_next_cursor, wants_ndjson
 
 # Initialize the APIRouter
 router = APIRouter()
@@ -12,10 +16,8 @@ router = APIRouter()
 task_creation_counter = Counter("task_creation_count", "Number of tasks")
 task_deletion_counter = Counter("task_deletion_count", "Number of tasks")
 
-# Neo4j driver (replace with your driver instance)
-driver = get_neo4j_driver()
-# Instantiate the NodeManager
-manager = NodeManager(driver)
+# Instantiate the NodeManager (uses the shared store owned by the app lifespan)
+manager = NodeManager()
 
 # Initialize the tasks list
 tasks: List[Task] = []
@@ -23,27 +25,57 @@ tasks: List[Task] = []
 # Create
 @router.post("/", response_model=Task)
 async def create_task(task: Task) -> dict:
-    result = manager.create_node("Task", task)
+    result = await manager.create_node("Task", task)
     if not result:
         raise HTTPException(status_code=400, detail="Failed to create task")
     task_creation_counter.inc()
-    return {"Task created successfully": task}
+    return task
+
+@router.post("/bulk", response_model=BulkResult)
+async def create_tasks_bulk(data: List[Task], batch_size: Optional[int] = Query(default=None, gt=0)) -> BulkResult:
+    """
+    Create many tasks in batched UNWIND transactions.
+    """
+    result = await manager.create_nodes("Task", data, batch_size=batch_size)
+    task_creation_counter.inc(result.created)
+    return result
+
+@router.post("/assign")
+async def assign_tasks() -> dict:
+    """
+    Run an assignment pass now: match every UNASSIGNED task to the least loaded agent
+    that has all of its `required_capabilities`.
+    """
+    return await assignment_scheduler.run_once()
 
 # Read
 @router.get("/", response_model=List[Task])
-async def get_tasks() -> List[Task]:
-    tasks = manager.get_nodes("Task")
-    return [Task(**task["n"]) for task in tasks]
+async def get_tasks(request: Request, response: Response,
+        after: Optional[str] = Query(default=None, description="Return nodes with an id after this cursor"),
+        limit: int = Query(default=settings.page_size, gt=0, le=settings.max_page_size),
+        status: Optional[TaskStatus] = None):
+    """
+    List tasks ordered by id, one page at a time.
+
+    Follow the `X-Next-Cursor` response header with `?after=` to read the next page, or send
+    `Accept: application/x-ndjson` to stream every matching task.
+    """
+    filters = {"status": status.value} if status else {}
+    if wants_ndjson(request):
+        return ndjson_response(manager.stream_nodes("Task", after, filters), Task)
+    tasks = await manager.get_page("Task", after, limit, filters)
+    set_next_cursor(response, tasks, limit)
+    return model_response(Task, tasks, response)
 
 @router.get("/{task_id}", response_model=Task)
-async def get_task(task_id: str) -> Task:
+async def get_task(task_id: str):
     """
     Get a specific task by ID.
     """
-    task = manager.get_node("Task", task_id)
+    task = await manager.get_node("Task", task_id)
     if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return Task(**task["n"])
+    return model_response(Task, task)
 
 # Update
 @router.put("/{task_id}", response_model=Task)
@@ -57,15 +89,33 @@ async def update_task(task_id: str, update: NodeUpdate):
         - `overwrite`: Replace existing capabilities with the provided list.
         - `append`: Add the provided capabilities to the existing ones.
         - `remove`: Remove the provided capabilities from the existing ones.
+
+    Overwrites of only `status` and progress properties (WRITE_BEHIND_PROPERTIES) are buffered
+    and coalesced with other updates of the task; reads return the new values right away.
     """
-    task = manager.update_node("Task", task_id, update.updates, update.operation)
+    if write_behind.accepts(update.updates, update.operation):
+        try:
+            task = await write_behind.submit("Task", task_id, update.updates)
+        except LookupError:
+            raise HTTPException(status_code=400, detail="Failed to update task")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid update: {e}")
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Update not written: {e}")
+        return model_response(Task, trusted(Task).construct(task))
+    await write_behind.settle("Task", task_id)
+    try:
+        task = await manager.update_node("Task", task_id, update.updates, update.operation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid update: {e}")
     if not task:
         raise HTTPException(status_code=400, detail="Failed to update task")
-    return {"Task updated successfully": task}
+    # Validated before the write, so the stored node is built without validating it again
+    return model_response(Task, trusted(Task).construct(task))
 
 # Delete
 @router.delete("/{task_id}")
 async def delete_task(task_id: str):
-    manager.delete_node("Task", task_id)
+    await manager.delete_node("Task", task_id)
     task_deletion_counter.inc()
     return {"message": "Task deleted"}
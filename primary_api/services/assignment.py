@@ -0,0 +1,242 @@
+import asyncio
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from ..config import settings
+from ..db.NodeManager import NodeManager, add_write_listener
+from ..db.ids import slugify
+from ..models.models import TaskStatus
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Statuses that count towards an agent's load
+ACTIVE_STATUSES = (TaskStatus.ASSIGNED.value, TaskStatus.IN_PROGRESS.value)
+
+
+
+class CapabilityIndex:
+    """
+    In-memory inverted index from capability to the agents that have it, plus each agent's load.
+
+    Capability names are compared in slug form, so "Web Search" and "web_search" match.
+    """
+
+    def __init__(self):
+        self.agents_by_capability: dict[str, set[str]] = defaultdict(set)
+        self.capabilities_by_agent: dict[str, frozenset[str]] = {}
+        self.load: dict[str, int] = {}
+
+    def upsert_agent(self, agent_id: str, capabilities: Iterable[str], load: Optional[int] = None) -> None:
+        self.remove_agent(agent_id, keep_load=True)
+        normalized = frozenset(slugify(capability) for capability in capabilities or [])
+        self.capabilities_by_agent[agent_id] = normalized
+        for capability in normalized:
+            self.agents_by_capability[capability].add(agent_id)
+        self.load[agent_id] = load if load is not None else self.load.get(agent_id, 0)
+
+    def remove_agent(self, agent_id: str, keep_load: bool = False) -> None:
+        for capability in self.capabilities_by_agent.pop(agent_id, ()):
+            agents = self.agents_by_capability[capability]
+            agents.discard(agent_id)
+            if not agents:
+                del self.agents_by_capability[capability]
+        if not keep_load:
+            self.load.pop(agent_id, None)
+
+    def pick(self, required: Iterable[str]) -> Optional[str]:
+        """
+        Choose the least loaded agent that has every required capability, and count the task against it.
+        """
+        required = {slugify(capability) for capability in required or []}
+        if required:
+            # Intersect starting from the rarest capability to keep the sets small
+            sets = sorted((self.agents_by_capability.get(capability, set()) for capability in required), key=len)
+            candidates = set(sets[0]).intersection(*sets[1:])
+        else:
+            candidates = self.capabilities_by_agent.keys()
+        if not candidates:
+            return None
+        agent_id = min(candidates, key=lambda candidate: (self.load[candidate], candidate))
+        self.load[agent_id] += 1
+        return agent_id
+
+    def release(self, agent_id: str) -> None:
+        if self.load.get(agent_id, 0) > 0:
+            self.load[agent_id] -= 1
+
+
+class AssignmentScheduler:
+    """
+    Assigns UNASSIGNED tasks to capable agents in batches.
+
+    Each pass walks the unassigned tasks in id order (an index seek on :Task(status)), matches
+    them against the CapabilityIndex in memory and commits every batch with one conditional
+    `update_nodes` transaction that sets the status and creates the ASSIGNED_TO edges; tasks
+    that are no longer UNASSIGNED by then are skipped. No graph query is made per task. The index follows agent and task writes through NodeManager write listeners.
+
+    An agent's capabilities are its `capabilities` property plus the names of the Capability
+    nodes it has a CAN_EXECUTE relationship to.
+    """
+
+    def __init__(self, manager: Optional[NodeManager] = None, batch_size: Optional[int] = None):
+        self.manager = manager or NodeManager()
+        self.batch_size = batch_size or settings.assignment_batch_size
+        self.index = CapabilityIndex()
+        # task id -> agent id for tasks counted in the agents' load
+        self.active: dict[str, str] = {}
+        # agent id -> ids and names of the capabilities it is linked to with CAN_EXECUTE; tasks may require either
+        self.linked: dict[str, set[str]] = defaultdict(set)
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        add_write_listener(self.on_write)
+
+    async def load(self) -> None:
+        """
+        Build the capability index and agent loads from the graph.
+        """
+        index, active, linked = CapabilityIndex(), {}, defaultdict(set)
+        store = self.manager.store
+        names = {capability["id"]: capability["name"] async for capability in store.stream("Capability", fields=["name"])}
+        async for agent_id, relationship_type, end_label, end_id in store.stream_relationships("Agent"):
+            if relationship_type == "CAN_EXECUTE" and end_label == "Capability" and end_id in names:
+                linked[agent_id].update(filter(None, (end_id, names[end_id])))
+        async for agent in store.stream("Agent", fields=["capabilities"]):
+            index.upsert_agent(agent["id"], [*(agent["capabilities"] or []), *linked.get(agent["id"], ())])
+        for status in ACTIVE_STATUSES:
+            async for task in store.stream("Task", filters={"status": status}, fields=["assignee"]):
+                if not task["assignee"]:
+                    continue
+                active[task["id"]] = task["assignee"]
+                if task["assignee"] in index.load:
+                    index.load[task["assignee"]] += 1
+        self.index, self.active, self.linked, self._loaded = index, active, linked, True
+        logger.info("Capability index loaded: %d agents, %d active tasks", len(index.capabilities_by_agent), len(active))
+
+    async def reload(self) -> None:
+        """
+        Rebuild the index after writes that bypassed the NodeManager, such as an import.
+        """
+        async with self._lock:
+            await self.load()
+
+    async def run_once(self) -> dict:
+        """
+        Make one pass over every unassigned task.
+
+        Returns:
+            dict: Number of tasks `assigned` and left `unmatched`.
+        """
+        async with self._lock:
+            if not self._loaded:
+                await self.load()
+            assigned = unmatched = 0
+            after = ""
+            while True:
+                tasks = await self._fetch_unassigned(after)
+                if not tasks:
+                    break
+                after = tasks[-1]["id"]
+                rows = []
+                for task in tasks:
+                    if task.get("assignee"):
+                        # Assigned by hand but stored UNASSIGNED; the manual assignee stands
+                        continue
+                    agent_id = self.index.pick(task["required_capabilities"] or [])
+                    if agent_id is None:
+                        unmatched += 1
+                    else:
+                        rows.append({"task_id": task["id"], "agent_id": agent_id})
+                assigned += await self._commit(rows)
+                if len(tasks) < self.batch_size:
+                    break
+        if assigned:
+            logger.info("Assigned %d tasks (%d without a capable agent)", assigned, unmatched)
+        return {"assigned": assigned, "unmatched": unmatched}
+
+    async def _fetch_unassigned(self, after: str) -> list[dict]:
+        return await self.manager.store.page("Task", after, self.batch_size,
+            {"status": TaskStatus.UNASSIGNED.value}, fields=["required_capabilities", "assignee"])
+
+    async def _commit(self, rows: list[dict]) -> int:
+        if not rows:
+            return 0
+        # Registered up front so the write listener does not count these tasks a second time
+        for row in rows:
+            self.active[row["task_id"]] = row["agent_id"]
+        updated = []
+        try:
+            updated = await self.manager.update_nodes("Task", [
+                {
+                    "id": row["task_id"],
+                    "set": {"status": TaskStatus.ASSIGNED.value, "assignee": row["agent_id"]},
+                    "expected": {"status": TaskStatus.UNASSIGNED.value},
+                    "link_id": row["agent_id"],
+                }
+                for row in rows
+            ], link_label="Agent", relationship_type="ASSIGNED_TO")
+        finally:
+            committed = {task["id"] for task in updated}
+            for row in rows:
+                # Tasks changed by someone else in the meantime, or a failed batch, free the agent again
+                if row["task_id"] not in committed and self.active.pop(row["task_id"], None):
+                    self.index.release(row["agent_id"])
+        return len(committed)
+
+    async def on_write(self, event: str, label: str, node_id: str, properties: Optional[dict]) -> None:
+        if not self._loaded:
+            return
+        if label == "Agent":
+            if event == "delete":
+                self.index.remove_agent(node_id)
+                self.linked.pop(node_id, None)
+            elif event in ("create", "update"):
+                self.index.upsert_agent(node_id, [*(properties.get("capabilities") or []), *self.linked.get(node_id, ())])
+            elif event == "relationship" and properties["type"] == "CAN_EXECUTE" and properties["end_label"] == "Capability":
+                capability = await self.manager.store.get("Capability", properties["end_id"])
+                agent = await self.manager.store.get("Agent", node_id)
+                if capability and agent:
+                    self.linked[node_id].update(filter(None, (capability["id"], capability.get("name"))))
+                    self.index.upsert_agent(node_id, [*(agent.get("capabilities") or []), *self.linked[node_id]])
+        elif label == "Task" and event in ("create", "update", "delete"):
+            status = (properties or {}).get("status")
+            assignee = (properties or {}).get("assignee")
+            if status in ACTIVE_STATUSES and assignee:
+                previous = self.active.get(node_id)
+                if previous != assignee:
+                    # Created assigned, or assigned or reassigned outside of the scheduler
+                    if previous:
+                        self.index.release(previous)
+                    self.active[node_id] = assignee
+                    if assignee in self.index.load:
+                        self.index.load[assignee] += 1
+            elif node_id in self.active:
+                self.index.release(self.active.pop(node_id))
+
+    def start(self) -> None:
+        """
+        Run assignment passes in the background every ASSIGNMENT_INTERVAL seconds.
+        """
+        if self._task is None and settings.assignment_enabled:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning("Assignment pass failed: %s", e)
+            await asyncio.sleep(settings.assignment_interval)
+
+
+assignment_scheduler = AssignmentScheduler()
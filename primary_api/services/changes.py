@@ -0,0 +1,136 @@
+import asyncio
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+from prometheus_client import Counter, Gauge
+
+from ..config import settings
+from ..db.NodeManager import add_write_listener
+
+# Initialize the Prometheus metrics
+change_event_counter = Counter("change_feed_events", "Change events published to the feed", ["event"])
+change_overflow_counter = Counter("change_feed_overflows", "Subscriptions closed because their buffer was full")
+change_subscriber_gauge = Gauge("change_feed_subscribers", "Open change feed subscriptions")
+
+
+class Subscription:
+    """
+    One client's filtered view of the change feed, with a bounded buffer.
+
+    Writers never wait on a subscriber: when its buffer is full, the subscription stops
+    receiving and ends with an `overflow` event, and the client resumes from the last
+    sequence number it saw.
+    """
+
+    def __init__(self, labels: Optional[Iterable[str]] = None, ids: Optional[Iterable[str]] = None,
+                 statuses: Optional[Iterable[str]] = None, buffer_size: Optional[int] = None):
+        self.labels = set(labels or ())
+        self.ids = set(ids or ())
+        self.statuses = set(statuses or ())
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size or settings.change_feed_buffer)
+        # Events replayed from history on resume, delivered before the queue
+        self.backlog: deque[dict] = deque()
+        self.overflowed = False
+        self.last_seq = 0
+
+    def matches(self, change: dict) -> bool:
+        if self.labels and change["label"] not in self.labels:
+            return False
+        if self.ids and change["id"] not in self.ids and change.get("end_id") not in self.ids:
+            return False
+        if self.statuses and change.get("status") not in self.statuses:
+            return False
+        return True
+
+    def offer(self, change: dict) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            change_overflow_counter.inc()
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        The next change, or None if nothing arrived within `timeout` seconds.
+
+        After an overflow the buffered changes are delivered first, then an
+        `{"event": "overflow", "seq": <last delivered>}` change, after which the caller closes it.
+        """
+        if self.backlog:
+            change = self.backlog.popleft()
+        elif self.overflowed and self.queue.empty():
+            return {"seq": self.last_seq, "event": "overflow", "time": time.time()}
+        else:
+            try:
+                change = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self.last_seq = max(self.last_seq, change["seq"])
+        return change
+
+
+class ChangeFeed:
+    """
+    In-process fan-out of the NodeManager's writes as compact, numbered change events.
+
+    Events carry the sequence number `seq`, the write `event` (create, update, delete or
+    relationship), the node's `label` and `id`, its `status` when it has one, and for
+    relationships the `type`, `end_label` and `end_id`. The last CHANGE_FEED_HISTORY events
+    are kept, so a client can resume after a sequence number without missing writes.
+
+    Sequence numbers are per process and restart at 1; a resume point the feed cannot serve
+    (too old, or from before a restart) is answered with a `reset` event, after which the client
+    should re-read the state it needs. With several API workers each has its own feed.
+    """
+
+    def __init__(self, history_size: Optional[int] = None):
+        self.sequence = 0
+        self.history: deque[dict] = deque(maxlen=history_size or settings.change_feed_history)
+        self._subscribers: set[Subscription] = set()
+        add_write_listener(self.on_write)
+
+    async def on_write(self, event: str, label: str, node_id: str, properties: Optional[dict]) -> None:
+        self.publish(event, label, node_id, properties)
+
+    def publish(self, event: str, label: str, node_id: str, properties: Optional[dict]) -> dict:
+        self.sequence += 1
+        change = {"seq": self.sequence, "event": event, "label": label, "id": node_id, "time": time.time()}
+        if event == "relationship":
+            change.update(type=properties["type"], end_label=properties["end_label"], end_id=properties["end_id"])
+        elif properties and properties.get("status") is not None:
+            change["status"] = properties["status"]
+        self.history.append(change)
+        change_event_counter.labels(event=event).inc()
+        for subscription in self._subscribers:
+            if subscription.matches(change):
+                subscription.offer(change)
+        return change
+
+    def subscribe(self, labels: Optional[Iterable[str]] = None, ids: Optional[Iterable[str]] = None,
+                  statuses: Optional[Iterable[str]] = None, after: Optional[int] = None) -> Subscription:
+        """
+        Open a subscription, replaying the retained changes after sequence number `after`.
+        """
+        subscription = Subscription(labels, ids, statuses)
+        if after is not None:
+            oldest = self.history[0]["seq"] if self.history else self.sequence + 1
+            if after > self.sequence or after < oldest - 1:
+                subscription.backlog.append({"seq": self.sequence, "event": "reset", "time": time.time()})
+            else:
+                subscription.backlog.extend(
+                    change for change in self.history if change["seq"] > after and subscription.matches(change)
+                )
+        # Replay and registration happen without yielding to the loop, so no write falls in between
+        self._subscribers.add(subscription)
+        change_subscriber_gauge.set(len(self._subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+        change_subscriber_gauge.set(len(self._subscribers))
+
+
+change_feed = ChangeFeed()
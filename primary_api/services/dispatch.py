@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from typing import Optional
+
+from prometheus_client import Counter
+
+from messaging import DEFAULT_TASK_QUEUE, Broker, agent_queue, get_broker, task_queue
+
+from ..config import settings
+from ..db.NodeManager import add_write_listener
+from ..db.ids import slugify
+from ..models.models import TaskStatus
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Initialize the Prometheus Counters
+task_dispatch_counter = Counter("task_dispatch_count", "Tasks published to agent queues", ["queue"])
+task_dispatch_failure_counter = Counter("task_dispatch_failure_count", "Tasks that could not be published")
+
+
+class TaskDispatcher:
+    """
+    Publishes tasks to agent queues as soon as they become ASSIGNED.
+
+    A task goes to the queue of its assignee, so it runs on the agent the assignment scheduler
+    chose and counted its load against. A task without an assignee goes to the queue of its
+    first required capability (or the default queue), where every agent with that capability
+    competes for it. Transitions are picked up from
+    NodeManager write listeners, which covers both the assignment scheduler and manual updates.
+    """
+
+    def __init__(self, broker: Optional[Broker] = None, recent_size: int = 100_000):
+        self.broker = broker
+        # Recently dispatched task id -> assignee, so later updates of an ASSIGNED task are not
+        # republished; a task that leaves ASSIGNED is dropped, so a reassignment is published again
+        self._recent: OrderedDict[str, Optional[str]] = OrderedDict()
+        self._recent_size = recent_size
+        add_write_listener(self.on_write)
+
+    async def start(self) -> None:
+        if not settings.dispatch_enabled:
+            return
+        self.broker = self.broker or get_broker(settings.broker_url)
+        await self.broker.connect()
+
+    async def stop(self) -> None:
+        if self.broker is not None:
+            await self.broker.close()
+
+    @staticmethod
+    def queue_for(task: dict) -> str:
+        if task.get("assignee"):
+            return agent_queue(task["assignee"])
+        required = task.get("required_capabilities") or []
+        return task_queue(slugify(required[0])) if required else DEFAULT_TASK_QUEUE
+
+    async def dispatch(self, task: dict) -> None:
+        """
+        Publish a task to its assignee's queue, or its capability queue when it has none.
+        """
+        queue = self.queue_for(task)
+        await self.broker.publish(queue, {
+            "task_id": task["id"],
+            "name": task.get("name"),
+            "description": task.get("description"),
+            "required_capabilities": task.get("required_capabilities") or [],
+            "assignee": task.get("assignee"),
+        })
+        task_dispatch_counter.labels(queue=queue).inc()
+
+    async def on_write(self, event: str, label: str, node_id: str, properties: Optional[dict]) -> None:
+        # Tasks created ASSIGNED (one by one or in bulk) are dispatched like tasks assigned later
+        if label != "Task" or event not in ("create", "update", "delete"):
+            return
+        if event == "delete" or properties.get("status") != TaskStatus.ASSIGNED.value:
+            self._recent.pop(node_id, None)
+            return
+        if self.broker is None:
+            return
+        if node_id in self._recent and self._recent[node_id] == properties.get("assignee"):
+            return
+        try:
+            await self.dispatch(properties)
+        except Exception as e:
+            task_dispatch_failure_counter.inc()
+            logger.warning("Dispatching task %s failed: %s", node_id, e)
+            return
+        self._recent[node_id] = properties.get("assignee")
+        self._recent.move_to_end(node_id)
+        if len(self._recent) > self._recent_size:
+            self._recent.popitem(last=False)
+
+
+task_dispatcher = TaskDispatcher()
@@ -0,0 +1,273 @@
+import asyncio
+import base64
+import difflib
+import json
+import re
+import time
+import zlib
+from typing import Optional
+
+from prometheus_client import Counter
+
+from ..config import settings
+from ..db.NodeManager import NodeManager, add_write_listener
+from ..db.store import DuplicateNodeError, get_store
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Initialize the Prometheus Counters
+prompt_version_counter  = Counter("prompt_versions_created", "Agent prompt versions stored", ["kind"])  # checkpoint | delta
+prompt_version_bytes    = Counter("prompt_version_bytes", "Compressed bytes of stored agent prompt versions", ["kind"])
+prompt_conflict_counter = Counter("prompt_version_conflicts", "Agent prompt changes rejected because another change won")
+
+VERSION_LABEL = "PromptVersion"
+
+# Words with their trailing whitespace, so a delta touches only the words that changed
+_TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+class VersionConflictError(Exception):
+    """
+    Raised when an agent's prompt changed between reading and writing a new version.
+    """
+
+
+def version_id(agent_id: str, version: int) -> str:
+    return f"{agent_id}:{version}"
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(text)
+
+
+def _pack(payload: dict) -> str:
+    # Stored as text, since node properties are primitives and the memory snapshot is JSON
+    return base64.b64encode(zlib.compress(json.dumps(payload, separators=(",", ":")).encode())).decode("ascii")
+
+
+def _unpack(data: str) -> dict:
+    return json.loads(zlib.decompress(base64.b64decode(data)))
+
+
+def _delta(old: dict, new: dict) -> dict:
+    """
+    Edits that turn the `old` content into `new`: [start, end, replacement tokens] spans of the
+    old prompt's tokens, plus the capabilities when they changed.
+    """
+    old_tokens, new_tokens = _tokens(old["base_prompt"]), _tokens(new["base_prompt"])
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    delta = {"ops": [[i1, i2, new_tokens[j1:j2]] for op, i1, i2, j1, j2 in matcher.get_opcodes() if op != "equal"]}
+    if new["capabilities"] != old["capabilities"]:
+        delta["capabilities"] = new["capabilities"]
+    return delta
+
+
+def _apply(content: dict, delta: dict) -> dict:
+    tokens, rebuilt, position = _tokens(content["base_prompt"]), [], 0
+    for start, end, replacement in delta["ops"]:
+        rebuilt.extend(tokens[position:start])
+        rebuilt.extend(replacement)
+        position = end
+    rebuilt.extend(tokens[position:])
+    return {"base_prompt": "".join(rebuilt), "capabilities": delta.get("capabilities", content["capabilities"])}
+
+
+def _lines(text: str) -> list[str]:
+    # A last line without a newline would run into the next line of the diff
+    return [line if line.endswith("\n") else line + "\n" for line in text.splitlines(keepends=True)]
+
+
+def _content(agent: dict) -> dict:
+    return {"base_prompt": agent.get("base_prompt") or "", "capabilities": list(agent.get("capabilities") or [])}
+
+
+class PromptHistory:
+    """
+    Version history of each agent's `base_prompt` and `capabilities`.
+
+    The agent node holds only the current content and its `base_prompt_version`, so reading the
+    current prompt stays a single node read. Every change is stored as a PromptVersion node
+    (id `<agent id>:<version>`) linked to the version before it with PREVIOUS: a zlib-compressed
+    delta of the prompt's words against the previous version, or every
+    PROMPT_CHECKPOINT_INTERVAL versions (and whenever a delta would not be smaller) a full
+    checkpoint. Any version is rebuilt from its checkpoint in at most PROMPT_CHECKPOINT_INTERVAL
+    node reads, fetched in one `get_many`.
+
+    A version is claimed by creating its node, whose id is unique, before the agent is updated
+    conditionally on the version it was read at; a change that loses either race raises
+    VersionConflictError, so concurrent evolutions never overwrite each other unseen.
+    """
+
+    def __init__(self, manager: Optional[NodeManager] = None, checkpoint_interval: Optional[int] = None):
+        self.manager = manager or NodeManager()
+        self.checkpoint_interval = max(checkpoint_interval or settings.prompt_checkpoint_interval, 1)
+        add_write_listener(self.on_write)
+
+    async def _agent(self, agent_id: str) -> dict:
+        agent = await get_store().get("Agent", agent_id)
+        if agent is None:
+            raise LookupError(f"Agent {agent_id} not found")
+        return agent
+
+    async def commit(self, agent_id: str, base_prompt: Optional[str] = None, capabilities: Optional[list[str]] = None,
+                     reason: Optional[str] = None, task_id: Optional[str] = None, properties: Optional[dict] = None) -> dict:
+        """
+        Store a new version of an agent's prompt and capabilities and make it current.
+
+        Omitted parts keep their current value; `properties` are other agent properties set in
+        the same update. An agent without history first gets its current content as version 1.
+
+        Returns:
+            dict: The agent's new properties.
+        """
+        store = get_store()
+        agent = await self._agent(agent_id)
+        current = agent.get("base_prompt_version")
+        content = _content(agent)
+        new = {
+            "base_prompt": content["base_prompt"] if base_prompt is None else base_prompt,
+            "capabilities": content["capabilities"] if capabilities is None else list(capabilities),
+        }
+        created = []
+        try:
+            if current is None:
+                # History starts at the content the agent had before its first versioned change
+                current = 1
+                created.append(await self._store_version(agent_id, current, None, content, "initial"))
+            version = current + 1
+            created.append(await self._store_version(agent_id, version, content, new, reason, task_id))
+        except DuplicateNodeError:
+            await self._discard(agent_id, created)
+            prompt_conflict_counter.inc()
+            raise VersionConflictError(f"Agent {agent_id} changed at version {current}, re-read and retry")
+        row = {
+            "id": agent_id,
+            "set": {**(properties or {}), **new, "base_prompt_version": version},
+            # Agents without history cannot be matched on a missing property; their version 1 node guards them
+            "expected": {"base_prompt_version": agent["base_prompt_version"]} if agent.get("base_prompt_version") is not None else {},
+        }
+        updated = await self.manager.update_nodes("Agent", [row])
+        if not updated:
+            await self._discard(agent_id, created)
+            if await store.get("Agent", agent_id) is None:
+                raise LookupError(f"Agent {agent_id} not found")
+            prompt_conflict_counter.inc()
+            raise VersionConflictError(f"Agent {agent_id} changed at version {current}, re-read and retry")
+        for node_id in created:
+            previous = int(node_id.rsplit(":", 1)[1]) - 1
+            if previous:
+                await store.relate(VERSION_LABEL, node_id, VERSION_LABEL, version_id(agent_id, previous), "PREVIOUS", merge=True)
+        return updated[0]
+
+    async def _store_version(self, agent_id: str, version: int, previous: Optional[dict], content: dict,
+                             reason: Optional[str] = None, task_id: Optional[str] = None) -> str:
+        # The checkpoint a delta rebuilds from is recorded on it, so a rebuild never walks the chain
+        checkpoint = version
+        if previous is not None and (version - 1) % self.checkpoint_interval:
+            base = await get_store().get(VERSION_LABEL, version_id(agent_id, version - 1))
+            if base is not None:
+                checkpoint = base["checkpoint"]
+        data = _pack(content)
+        if checkpoint != version:
+            delta = _pack(_delta(previous, content))
+            if len(delta) < len(data):
+                data = delta
+            else:
+                checkpoint = version
+        kind = "checkpoint" if checkpoint == version else "delta"
+        node_id = version_id(agent_id, version)
+        await get_store().create(VERSION_LABEL, {
+            "id": node_id, "agent_id": agent_id, "version": version, "kind": kind, "checkpoint": checkpoint,
+            "data": data, "size": len(data), "created_at": time.time(), "reason": reason, "task_id": task_id,
+        })
+        prompt_version_counter.labels(kind=kind).inc()
+        prompt_version_bytes.labels(kind=kind).inc(len(data))
+        return node_id
+
+    async def _discard(self, agent_id: str, node_ids: list[str]) -> None:
+        if node_ids:
+            await get_store().delete_many(VERSION_LABEL, node_ids)
+
+    async def get(self, agent_id: str, version: int) -> dict:
+        """
+        Rebuild one version of an agent: its metadata plus `base_prompt` and `capabilities`.
+        """
+        agent = await self._agent(agent_id)
+        current = agent.get("base_prompt_version")
+        if current is None and version == 1:
+            # An agent without history is at version 1
+            return {"agent_id": agent_id, "version": 1, "kind": "current", **_content(agent)}
+        if current is None or not 1 <= version <= current:
+            raise LookupError(f"Agent {agent_id} has no version {version}")
+        node = await get_store().get(VERSION_LABEL, version_id(agent_id, version))
+        if node is None:
+            raise LookupError(f"Agent {agent_id} has no version {version}")
+        if node["kind"] == "checkpoint":
+            content = _unpack(node["data"])
+        else:
+            ids = [version_id(agent_id, number) for number in range(node["checkpoint"], version)]
+            chain = await get_store().get_many(VERSION_LABEL, ids)
+            if len(chain) != len(ids):
+                raise LookupError(f"History of agent {agent_id} is missing versions before {version}")
+            content = _unpack(chain[ids[0]]["data"])
+            for node_id in ids[1:]:
+                content = _apply(content, _unpack(chain[node_id]["data"]))
+            content = _apply(content, _unpack(node["data"]))
+        return {**self._info(node), **content}
+
+    async def versions(self, agent_id: str, before: Optional[int] = None, limit: int = 20) -> list[dict]:
+        """
+        Metadata of an agent's versions, newest first, starting below version `before`.
+        """
+        agent = await self._agent(agent_id)
+        current = agent.get("base_prompt_version")
+        if current is None:
+            return [{"agent_id": agent_id, "version": 1, "kind": "current"}]
+        last = min(current, before - 1) if before is not None else current
+        numbers = range(last, max(last - limit, 0), -1)
+        nodes = await get_store().get_many(VERSION_LABEL, [version_id(agent_id, number) for number in numbers])
+        return [self._info(nodes[node_id]) for node_id in (version_id(agent_id, number) for number in numbers) if node_id in nodes]
+
+    @staticmethod
+    def _info(node: dict) -> dict:
+        return {key: node.get(key) for key in ("agent_id", "version", "kind", "checkpoint", "size", "created_at", "reason", "task_id")}
+
+    async def diff(self, agent_id: str, version: int, against: Optional[int] = None) -> dict:
+        """
+        A unified diff of the prompt and the capability changes from version `against`
+        (by default the one before) to `version`.
+        """
+        against = version - 1 if against is None else against
+        old, new = await asyncio.gather(self.get(agent_id, against), self.get(agent_id, version))
+        diff = difflib.unified_diff(
+            _lines(old["base_prompt"]), _lines(new["base_prompt"]), fromfile=f"v{against}", tofile=f"v{version}",
+        )
+        return {
+            "agent_id": agent_id,
+            "from_version": against,
+            "to_version": version,
+            "diff": "".join(diff),
+            "capabilities_added": [name for name in new["capabilities"] if name not in old["capabilities"]],
+            "capabilities_removed": [name for name in old["capabilities"] if name not in new["capabilities"]],
+        }
+
+    async def rollback(self, agent_id: str, version: int, reason: Optional[str] = None) -> dict:
+        """
+        Make an earlier version current again. History is append-only, so this stores a new
+        version with that content.
+        """
+        target = await self.get(agent_id, version)
+        agent = await self.commit(agent_id, target["base_prompt"], target["capabilities"], reason or f"rollback to v{version}")
+        logger.info("Agent %s rolled back to the content of version %d as version %d", agent_id, version, agent["base_prompt_version"])
+        return agent
+
+    async def on_write(self, event: str, label: str, node_id: str, properties: Optional[dict]) -> None:
+        # The history of a deleted agent goes with it
+        if event == "delete" and label == "Agent":
+            stale = [row["id"] async for row in get_store().stream(VERSION_LABEL, filters={"agent_id": node_id}, fields=["id"])]
+            if stale:
+                await get_store().delete_many(VERSION_LABEL, stale)
+
+
+prompt_history = PromptHistory()
@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Optional
+
+from prometheus_client import Counter
+
+from ..config import settings
+from ..db.ids import slugify
+from ..db.store import DuplicateNodeError, get_store
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Initialize the Prometheus Counters
+result_cache_hit_counter       = Counter("result_cache_hits", "Task results served from the result cache")
+result_cache_miss_counter      = Counter("result_cache_misses", "Task results that had to be computed")
+result_cache_coalesced_counter = Counter("result_cache_coalesced", "Claims that waited on an identical running task")
+result_cache_eviction_counter  = Counter("result_cache_evictions", "Cached results evicted", ["reason"])  # age | size
+
+
+def _normalize(value: Any) -> Any:
+    # Whitespace differences alone must not produce a different key
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def task_type(task: dict) -> str:
+    """
+    A task's type: its required capabilities in slug form, order-independent.
+    """
+    return ",".join(sorted({slugify(capability) for capability in task.get("required_capabilities") or []})) or "default"
+
+
+def prompt_version(agent: dict) -> str:
+    """
+    Version of the agent's base prompt, or a hash of it for agents without versioning.
+
+    Version numbers count per agent, so a versioned prompt is named by its PromptVersion node id.
+    """
+    if agent.get("base_prompt_version") is not None:
+        return f"{agent.get('id')}:{agent['base_prompt_version']}"
+    return hashlib.sha256((agent.get("base_prompt") or "").encode()).hexdigest()[:16]
+
+
+def result_key(task: dict, agent: dict) -> str:
+    """
+    Content address of a task's result: a hash of the task type, its inputs and the prompt version.
+
+    The inputs are the task's name, description and optional `inputs` property, so two tasks
+    that ask for the same thing share a key whatever their ids.
+    """
+    payload = {
+        "type": task_type(task),
+        "inputs": _normalize({key: task.get(key) for key in ("name", "description", "inputs")}),
+        "prompt": prompt_version(agent),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed cache of task results, stored as CachedResult nodes whose id is the key.
+
+    Each result is stored once per key and linked from every task that used it with
+    (:Task)-[:USES]->(:CachedResult). Identical tasks running at the same time are coalesced:
+    the first claim of a key gets a lease to compute it, and later claims wait for that result
+    instead of running the task again. If the lease holder releases the key or its lease runs
+    out, the next waiter takes over. Coalescing is per API process.
+
+    Results older than `max_age` are evicted, and the least recently used ones go whenever
+    the total stored size is over `max_bytes`.
+    """
+
+    def __init__(self, max_age: Optional[float] = None, max_bytes: Optional[int] = None, lease: Optional[float] = None):
+        self.max_age = max_age or settings.result_cache_max_age
+        self.max_bytes = max_bytes or settings.result_cache_max_bytes
+        self.lease = lease or settings.result_cache_lease
+        # key -> (future resolved with the result, or None if released; lease expiry)
+        self._inflight: dict[str, tuple[asyncio.Future, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self, key: str, task_id: Optional[str] = None) -> Optional[Any]:
+        """
+        Look up a result, recording the hit and linking the task that used it.
+        """
+        store = get_store()
+        cached = await store.get("CachedResult", key)
+        if cached is None:
+            return None
+        await store.update("CachedResult", key, {"hits": (cached.get("hits") or 0) + 1, "last_hit_at": time.time()})
+        if task_id:
+            await store.relate("Task", task_id, "CachedResult", key, "USES", merge=True)
+        return json.loads(cached["result"])
+
+    async def put(self, key: str, value: Any, task_id: Optional[str] = None) -> None:
+        serialized = json.dumps(value, default=str)
+        store = get_store()
+        now = time.time()
+        properties = {"result": serialized, "size": len(serialized), "last_hit_at": now}
+        try:
+            await store.create("CachedResult", {"id": key, "created_at": now, "hits": 0, **properties})
+        except DuplicateNodeError:
+            await store.update("CachedResult", key, properties)
+        if task_id:
+            await store.relate("Task", task_id, "CachedResult", key, "USES", merge=True)
+
+    async def claim(self, key: str, task_id: Optional[str] = None, wait: Optional[float] = None) -> dict:
+        """
+        Get a cached result, wait for an identical running task, or take the lease to compute it.
+
+        Returns:
+            dict: `status` is "hit" (with `result`), "miss" (the caller must compute and
+            `complete` or `release` the key) or "pending" (still running after `wait` seconds).
+        """
+        deadline = time.monotonic() + (settings.result_cache_wait if wait is None else wait)
+        loop = asyncio.get_running_loop()
+        while True:
+            cached = await self.get(key, task_id)
+            if cached is not None:
+                result_cache_hit_counter.inc()
+                return {"status": "hit", "result": cached}
+            inflight = self._inflight.get(key)
+            if inflight is None or inflight[1] < time.monotonic():
+                if inflight is not None:
+                    logger.warning("Lease on result %s expired, handing it to the next claim", key[:12])
+                    if not inflight[0].done():
+                        inflight[0].set_result(None)
+                self._inflight[key] = (loop.create_future(), time.monotonic() + self.lease)
+                result_cache_miss_counter.inc()
+                return {"status": "miss"}
+            result_cache_coalesced_counter.inc()
+            timeout = min(deadline, inflight[1]) - time.monotonic()
+            try:
+                value = await asyncio.wait_for(asyncio.shield(inflight[0]), max(timeout, 0))
+            except asyncio.TimeoutError:
+                if time.monotonic() >= deadline:
+                    return {"status": "pending"}
+                continue
+            if value is not None:
+                # The result was stored by the lease holder; link this task to it as well
+                return {"status": "hit", "result": await self.get(key, task_id)}
+
+    async def complete(self, key: str, value: Any, task_id: Optional[str] = None) -> None:
+        """
+        Store a computed result and hand it to the claims waiting on it.
+        """
+        await self.put(key, value, task_id)
+        inflight = self._inflight.pop(key, None)
+        if inflight is not None and not inflight[0].done():
+            inflight[0].set_result(True)
+
+    def release(self, key: str) -> None:
+        """
+        Give up a lease without a result, so a waiting claim can compute it instead.
+        """
+        inflight = self._inflight.pop(key, None)
+        if inflight is not None and not inflight[0].done():
+            inflight[0].set_result(None)
+
+    async def evict(self) -> dict:
+        """
+        Delete results older than `max_age`, then the least recently used ones until the total
+        size is under `max_bytes`.
+
+        Returns:
+            dict: Number of results evicted for `age` and for `size`.
+        """
+        cutoff = time.time() - self.max_age
+        expired, live, total = [], [], 0
+        async for cached in get_store().stream("CachedResult", fields=["created_at", "last_hit_at", "size"]):
+            if (cached["created_at"] or 0) < cutoff:
+                expired.append(cached["id"])
+            else:
+                live.append(cached)
+                total += cached["size"] or 0
+        keys = []
+        # Drop the least recently used results until enough bytes are freed
+        for cached in sorted(live, key=lambda cached: cached["last_hit_at"] or 0):
+            if total <= self.max_bytes:
+                break
+            keys.append(cached["id"])
+            total -= cached["size"] or 0
+        by_age = await get_store().delete_many("CachedResult", expired) if expired else 0
+        by_size = await get_store().delete_many("CachedResult", keys) if keys else 0
+        result_cache_eviction_counter.labels(reason="age").inc(by_age)
+        result_cache_eviction_counter.labels(reason="size").inc(by_size)
+        if by_age or by_size:
+            logger.info("Evicted %d expired and %d least recently used results", by_age, by_size)
+        return {"age": by_age, "size": by_size}
+
+    def start(self) -> None:
+        """
+        Run eviction in the background every RESULT_CACHE_EVICT_INTERVAL seconds.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.result_cache_evict_interval)
+            try:
+                await self.evict()
+            except Exception as e:
+                logger.warning("Result cache eviction failed: %s", e)
+
+
+result_cache = ResultCache()
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from typing import Optional
+
+from prometheus_client import Gauge
+
+from ..config import settings
+from ..db.store import get_store
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Initialize the Prometheus Gauges, refreshed by StatsService so scrapes never touch Neo4j
+node_count_gauge         = Gauge("neo4j_node_count", "Total number of nodes")
+relationship_count_gauge = Gauge("neo4j_relationship_count", "Total number of relationships")
+label_count_gauge        = Gauge("neo4j_label_node_count", "Number of nodes per label", ["label"])
+type_count_gauge         = Gauge("neo4j_relationship_type_count", "Number of relationships per type", ["type"])
+task_status_gauge        = Gauge("neo4j_task_status_count", "Number of tasks per status", ["status"])
+
+
+class StatsService:
+    """
+    Cached database statistics built only from count-store and index lookups.
+
+    On Neo4j, unfiltered counts (`MATCH (n:Label) RETURN count(n)`, `MATCH ()-[r:TYPE]->() RETURN count(r)`)
+    are answered by the count store in constant time, and task counts per status are index seeks
+    on :Task(status), all in one read transaction; the memory backend reads the sizes of its own
+    indexes. Results are cached for `ttl` seconds.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl or settings.stats_ttl
+        self._stats: Optional[dict] = None
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self) -> dict:
+        """
+        Return cached statistics, refreshing them if they are older than the TTL.
+        """
+        if self._stats is None or time.monotonic() - self._refreshed_at > self.ttl:
+            async with self._lock:
+                # Another request may have refreshed while this one waited
+                if self._stats is None or time.monotonic() - self._refreshed_at > self.ttl:
+                    await self.refresh()
+        return self._stats
+
+    async def refresh(self) -> dict:
+        stats = await get_store().stats()
+        self._stats = stats
+        self._refreshed_at = time.monotonic()
+        self._export(stats)
+        return stats
+
+    @staticmethod
+    def _export(stats: dict) -> None:
+        node_count_gauge.set(stats["node_count"])
+        relationship_count_gauge.set(stats["relationship_count"])
+        for label, value in stats["labels"].items():
+            label_count_gauge.labels(label=label).set(value)
+        for rel_type, value in stats["relationship_types"].items():
+            type_count_gauge.labels(type=rel_type).set(value)
+        for status, value in stats["task_status"].items():
+            task_status_gauge.labels(status=status).set(value)
+
+    def start(self) -> None:
+        """
+        Keep the gauges fresh in the background for Prometheus scrapes.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.get()
+            except Exception as e:
+                logger.warning("Stats refresh failed: %s", e)
+            await asyncio.sleep(self.ttl)
+
+
+stats_service = StatsService()
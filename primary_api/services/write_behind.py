@@ -0,0 +1,199 @@
+import asyncio
+from typing import Optional
+
+from prometheus_client import Counter, Gauge
+
+from ..config import settings
+from ..db.NodeManager import NodeManager, add_read_overlay, add_write_listener
+from ..models.trusted import trusted_node_model
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Initialize the Prometheus metrics
+write_behind_update_counter = Counter("write_behind_updates", "Updates accepted by the write-behind buffer", ["outcome"])  # buffered | coalesced
+write_behind_flush_counter = Counter("write_behind_flushed_nodes", "Nodes written by write-behind flushes")
+write_behind_failure_counter = Counter("write_behind_flush_failures", "Write-behind flushes that failed")
+write_behind_pending_gauge = Gauge("write_behind_pending", "Nodes with buffered updates")
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces frequent property updates (task status and progress) and writes them in batches.
+
+    Updates to the same node are merged, so only the latest value of each property is written,
+    and each flush is one `update_nodes` (UNWIND) transaction per label and BULK_BATCH_SIZE nodes.
+    A flush runs every WRITE_BEHIND_INTERVAL seconds, or as soon as WRITE_BEHIND_MAX_PENDING
+    nodes wait. Reads through the NodeManager see buffered values (read-your-writes within the
+    process), although label filters such as `?status=` match the stored values until the flush.
+
+    WRITE_BEHIND_DURABILITY chooses when an update is acknowledged: `commit` waits for the
+    flush transaction that contains it, `memory` returns once it is buffered, so updates of the
+    last interval are lost if the process dies.
+    """
+
+    def __init__(self, manager: Optional[NodeManager] = None):
+        self.manager = manager or NodeManager()
+        self.properties = {key.strip() for key in settings.write_behind_properties.split(",") if key.strip()}
+        # label -> node id -> latest value of every buffered property
+        self._pending: dict[str, dict[str, dict]] = {}
+        # Updates taken by the running flush, still shown to reads until they are committed
+        self._flushing: dict[str, dict[str, dict]] = {}
+        # Resolved when the updates buffered since the last flush are committed
+        self._committed: Optional[asyncio.Future] = None
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        add_read_overlay(self.overlay)
+        add_write_listener(self.on_write)
+
+    def accepts(self, updates: dict, operation: str = "overwrite") -> bool:
+        """
+        Whether an update may be buffered: an overwrite of buffered properties only.
+        """
+        return settings.write_behind_enabled and operation == "overwrite" and bool(updates) and updates.keys() <= self.properties
+
+    def overlay(self, label: Optional[str], rows: list[dict]) -> list[dict]:
+        pending, flushing = self._pending.get(label), self._flushing.get(label)
+        if not pending and not flushing:
+            return rows
+        patched = []
+        for row in rows:
+            node_id = row.get("id")
+            updates = {**(flushing or {}).get(node_id, {}), **(pending or {}).get(node_id, {})}
+            patched.append({**row, **updates} if updates else row)
+        return patched
+
+    def has_pending(self, label: str, node_id: str) -> bool:
+        return node_id in self._pending.get(label, {}) or node_id in self._flushing.get(label, {})
+
+    async def submit(self, label: str, node_id: str, updates: dict) -> dict:
+        """
+        Buffer an update, returning when it is as durable as WRITE_BEHIND_DURABILITY asks.
+
+        The node with the update applied (including updates still buffered) is validated
+        against the label's model first, since buffered values are written without it.
+
+        Returns:
+            dict: The node's properties after the update. Raises LookupError if the node does
+            not exist and ValueError if the update would make it invalid.
+        """
+        current = await self.manager.get_node(label, node_id)
+        if current is None:
+            raise LookupError(f"{label} {node_id} not found")
+        model = trusted_node_model(label)
+        properties = model.validate_update(current, model.validate_properties(updates))
+        updates = {key: properties.get(key) for key in updates}
+        nodes = self._pending.setdefault(label, {})
+        if node_id in nodes:
+            nodes[node_id].update(updates)
+            write_behind_update_counter.labels(outcome="coalesced").inc()
+        else:
+            nodes[node_id] = dict(updates)
+            write_behind_update_counter.labels(outcome="buffered").inc()
+        write_behind_pending_gauge.set(self._count())
+        if self._committed is None:
+            self._committed = asyncio.get_running_loop().create_future()
+        committed = self._committed
+        if self._count() >= settings.write_behind_max_pending or self._task is None:
+            self._wake.set()
+        if self._task is None:
+            # Not running in the background (e.g. outside the app lifespan): write through
+            await self.flush()
+        elif settings.write_behind_durability == "commit":
+            await asyncio.shield(committed)
+        return properties
+
+    async def settle(self, label: str, node_id: str) -> None:
+        """
+        Flush buffered updates of a node before it is written directly, so they are not
+        applied after (and over) the newer write.
+        """
+        if self.has_pending(label, node_id):
+            await self.flush()
+
+    async def on_write(self, event: str, label: str, node_id: str, properties: Optional[dict]) -> None:
+        # Updates of a deleted node are dropped rather than flushed to nothing
+        if event == "delete":
+            self._pending.get(label, {}).pop(node_id, None)
+            write_behind_pending_gauge.set(self._count())
+
+    def _count(self) -> int:
+        return sum(len(nodes) for nodes in self._pending.values())
+
+    async def flush(self) -> int:
+        """
+        Write every buffered update now.
+
+        Returns:
+            int: Number of nodes written.
+        """
+        async with self._lock:
+            if not self._pending:
+                return 0
+            self._flushing, self._pending = self._pending, {}
+            committed, self._committed = self._committed, None
+            write_behind_pending_gauge.set(0)
+            written = 0
+            try:
+                for label, nodes in self._flushing.items():
+                    rows = [{"id": node_id, "set": updates} for node_id, updates in nodes.items()]
+                    for start in range(0, len(rows), settings.bulk_batch_size):
+                        written += len(await self.manager.update_nodes(label, rows[start:start + settings.bulk_batch_size]))
+            except Exception as e:
+                write_behind_failure_counter.inc()
+                if settings.write_behind_durability == "memory":
+                    # Already acknowledged, so the updates go back under any newer ones for the next flush;
+                    # with `commit` the submitters get the error instead and may retry
+                    for label, nodes in self._flushing.items():
+                        pending = self._pending.setdefault(label, {})
+                        for node_id, updates in nodes.items():
+                            pending[node_id] = {**updates, **pending.get(node_id, {})}
+                self._flushing = {}
+                write_behind_pending_gauge.set(self._count())
+                if committed is not None and not committed.done():
+                    committed.set_exception(e)
+                    # Retrieved here, so an update acknowledged from memory leaves no unhandled error
+                    committed.exception()
+                raise
+            self._flushing = {}
+            write_behind_flush_counter.inc(written)
+            if committed is not None and not committed.done():
+                committed.set_result(written)
+            return written
+
+    def start(self) -> None:
+        """
+        Flush in the background every WRITE_BEHIND_INTERVAL seconds, or when the buffer fills.
+        """
+        if settings.write_behind_enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Whatever is still buffered is written before shutdown
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning("Final write-behind flush failed, %d nodes not written: %s", self._count(), e)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.write_behind_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("Write-behind flush failed: %s", e)
+
+
+write_behind = WriteBehindBuffer()
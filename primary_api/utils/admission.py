@@ -0,0 +1,208 @@
+import asyncio
+import math
+import re
+from collections import deque
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter, Gauge, Histogram
+
+from ..config import settings
+
+# Initialize the Prometheus metrics
+admission_in_flight_gauge = Gauge("admission_in_flight", "Requests running per admission pool", ["pool"])
+admission_queue_gauge = Gauge("admission_queue_depth", "Requests waiting for a slot per admission pool", ["pool"])
+admission_rejection_counter = Counter(
+    "admission_rejections", "Requests turned away by admission control", ["pool", "reason"]  # client_limit | queue_full | timeout
+)
+admission_wait_histogram = Histogram(
+    "admission_wait_seconds", "Time admitted requests waited for a slot", ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+# Requests that never wait: metrics scrapes, health checks, docs and long-lived change feeds
+EXEMPT_PATHS = re.compile(r"^/(metrics|docs|redoc|openapi|neo4j/health|changes/)")
+
+# Heavy endpoints get their own pools, so they cannot take the slots of cheap node reads and writes
+ROUTE_POOLS = (
+    ("POST", re.compile(r"^/neo4j/(query|traverse)/?$"), "query"),
+    ("GET", re.compile(r"^/neo4j/stats/?$"), "stats"),
+    ("GET", re.compile(r"^/(tasks|agents|capabilities|search)/?$"), "list"),
+    (None, re.compile(r"^/neo4j/(export|import)/?$"), "transfer"),
+)
+
+
+def _parse_pools(value: str) -> dict[str, tuple[int, int]]:
+    # "default=200:400,query=8:16" -> {"default": (200, 400), "query": (8, 16)}
+    pools = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, sizes = item.split("=", 1)
+        limit, queue = sizes.split(":", 1)
+        pools[name.strip()] = (int(limit), int(queue))
+    return pools
+
+
+class Rejected(Exception):
+    """
+    Raised when a request is not admitted; `reason` is the rejection metric label.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionPool:
+    """
+    A concurrency limit with a bounded FIFO queue of waiting requests.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self, timeout: float) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            admission_in_flight_gauge.labels(pool=self.name).set(self.active)
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise Rejected("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        admission_queue_gauge.labels(pool=self.name).set(len(self._waiters))
+        try:
+            # A released slot is handed over by resolving the waiter, so `active` stays counted
+            await asyncio.wait_for(waiter, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # The wait ended (timed out or the client went away) just as a slot was handed
+            # over; give it back, or it stays counted as active for good
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                raise Rejected("timeout")
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            admission_queue_gauge.labels(pool=self.name).set(len(self._waiters))
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        admission_in_flight_gauge.labels(pool=self.name).set(self.active)
+
+    @property
+    def depth(self) -> int:
+        return len(self._waiters)
+
+
+class AdmissionController:
+    """
+    Decides which requests run now, which wait, and which are turned away.
+
+    Each request is counted against its client (X-Client-Id header or peer address) and
+    against the pool of its route (ADMISSION_POOLS). A client over ADMISSION_CLIENT_LIMIT
+    concurrent requests gets 429 at once. A full pool queues the request for up to
+    ADMISSION_QUEUE_TIMEOUT seconds, and answers 503 when the queue is full or the wait runs
+    out. Both carry Retry-After, so well-behaved clients back off instead of retrying hot.
+    """
+
+    def __init__(self, pools: Optional[dict[str, tuple[int, int]]] = None, client_limit: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        pools = pools or _parse_pools(settings.admission_pools)
+        pools.setdefault("default", (200, 400))
+        self.pools = {name: AdmissionPool(name, limit, queue) for name, (limit, queue) in pools.items()}
+        self.client_limit = client_limit or settings.admission_client_limit
+        self.queue_timeout = queue_timeout or settings.admission_queue_timeout
+        self._clients: dict[str, int] = {}
+
+    def pool_for(self, method: str, path: str) -> Optional[AdmissionPool]:
+        """
+        The pool of a request, or None if it is exempt from admission control.
+        """
+        if EXEMPT_PATHS.match(path):
+            return None
+        for route_method, pattern, name in ROUTE_POOLS:
+            if (route_method is None or route_method == method) and pattern.match(path) and name in self.pools:
+                return self.pools[name]
+        return self.pools["default"]
+
+    async def admit(self, pool: AdmissionPool, client: str) -> None:
+        if self._clients.get(client, 0) >= self.client_limit:
+            raise Rejected("client_limit")
+        # The client slot is held while waiting, so one client cannot fill the queues either
+        self._clients[client] = self._clients.get(client, 0) + 1
+        started = asyncio.get_running_loop().time()
+        try:
+            await pool.acquire(self.queue_timeout)
+        except BaseException:
+            self._release_client(client)
+            raise
+        admission_wait_histogram.labels(pool=pool.name).observe(asyncio.get_running_loop().time() - started)
+
+    def release(self, pool: AdmissionPool, client: str) -> None:
+        pool.release()
+        self._release_client(client)
+
+    def _release_client(self, client: str) -> None:
+        remaining = self._clients.get(client, 0) - 1
+        if remaining > 0:
+            self._clients[client] = remaining
+        else:
+            self._clients.pop(client, None)
+
+    def retry_after(self, pool: AdmissionPool, reason: str) -> int:
+        # Scale the hint with the backlog, so a deep queue spreads retries out further
+        if reason == "client_limit":
+            return math.ceil(settings.admission_retry_after)
+        return math.ceil(settings.admission_retry_after * (1 + pool.depth / max(pool.limit, 1)))
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to every HTTP request.
+
+    The slot is held until the response, including a streamed body, has been sent.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or AdmissionController()
+
+    @staticmethod
+    def client_of(scope) -> str:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-client-id":
+                return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.admission_enabled:
+            return await self.app(scope, receive, send)
+        pool = self.controller.pool_for(scope["method"], scope["path"])
+        if pool is None:
+            return await self.app(scope, receive, send)
+        client = self.client_of(scope)
+        try:
+            await self.controller.admit(pool, client)
+        except Rejected as e:
+            admission_rejection_counter.labels(pool=pool.name, reason=e.reason).inc()
+            status_code = 429 if e.reason == "client_limit" else 503
+            response = JSONResponse(
+                {"detail": f"Too many requests ({e.reason}), retry later", "pool": pool.name},
+                status_code=status_code, headers={"Retry-After": str(self.controller.retry_after(pool, e.reason))}
+            )
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(pool, client)
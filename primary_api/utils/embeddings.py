@@ -0,0 +1,64 @@
+import hashlib
+import importlib
+import re
+from typing import Callable, Sequence
+
+import numpy as np
+
+from ..config import settings
+
+# Takes a batch of texts and returns a (len(texts), dimensions) float32 matrix
+EmbeddingFunction = Callable[[Sequence[str]], np.ndarray]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def hashing_embedding(texts: Sequence[str], dimensions: int = 256) -> np.ndarray:
+    """
+    Offline embedding based on feature hashing of words and character trigrams.
+
+    It needs no model download, is deterministic across processes and gives useful lexical
+    similarity until a real model is configured through EMBEDDING_FUNCTION.
+    """
+    vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = _TOKEN_PATTERN.findall(text.lower())
+        features = words + [
+            word[i:i + 3] for word in words if len(word) > 3 for i in range(len(word) - 2)
+        ]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % dimensions
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vectors[row, bucket] += sign
+    return normalize(vectors)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale each row to unit length so a dot product is the cosine similarity.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+def load_embedding_function() -> EmbeddingFunction:
+    """
+    Resolve settings.embedding_function ("package.module:callable"), or the hashing embedding.
+    """
+    if not settings.embedding_function:
+        return lambda texts: hashing_embedding(texts, settings.embedding_dimensions)
+    module_name, _, attribute = settings.embedding_function.partition(":")
+    function = getattr(importlib.import_module(module_name), attribute)
+    return lambda texts: normalize(np.asarray(function(texts), dtype=np.float32))
+
+
+def node_text(properties: dict) -> str:
+    """
+    The text embedded for a node: its name and description.
+    """
+    return "\n".join(filter(None, [properties.get("name"), properties.get("description")]))
+
+
+embed: EmbeddingFunction = load_embedding_function()
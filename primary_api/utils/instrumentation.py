@@ -0,0 +1,220 @@
+import contextvars
+import functools
+import inspect
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Mapping, Optional
+
+from fastapi.responses import ORJSONResponse, Response
+from prometheus_client import Gauge, Histogram
+
+from ..config import settings
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from opentelemetry import trace
+except ImportError:  # Tracing is optional
+    trace = None
+
+_tracer = trace.get_tracer("primary_api") if trace is not None and settings.tracing_enabled else None
+
+# Initialize the Prometheus Histograms
+method_latency_histogram = Histogram(
+    "nodemanager_method_seconds", "Latency of NodeManager methods", ["method", "label"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+query_latency_histogram = Histogram(
+    "neo4j_query_seconds", "Time until Neo4j answers a Cypher statement, by calling method", ["source"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+validation_histogram = Histogram(
+    "model_validation_seconds", "Time spent building pydantic models from records", ["label"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+serialization_histogram = Histogram(
+    "response_serialization_seconds", "Time spent encoding JSON response bodies",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+
+# Initialize the Prometheus pool metrics, measured through the driver's public API only
+session_gauge = Gauge("neo4j_sessions_open", "Open Neo4j sessions, each holding at most one pooled connection")
+acquisition_histogram = Histogram(
+    "neo4j_pool_acquisition_seconds",
+    "Time from starting a managed transaction until it runs, mostly waiting for a pooled connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60),
+)
+
+# The NodeManager method running in the current task, so queries are attributed to it
+_current_method: contextvars.ContextVar[str] = contextvars.ContextVar("current_method", default="other")
+
+
+def span(name: str, **attributes):
+    """
+    Open an OpenTelemetry span when TRACING_ENABLED is set and opentelemetry is installed.
+    """
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes={key: str(value) for key, value in attributes.items()})
+
+
+def _label_position(function) -> tuple[int, Optional[str]]:
+    # NodeManager methods name their label parameter node_type (start_node_label for relationships)
+    parameters = list(inspect.signature(function).parameters)
+    for name in ("node_type", "start_node_label"):
+        if name in parameters:
+            return parameters.index(name), name
+    return len(parameters), None
+
+
+def timed(function):
+    """
+    Record a NodeManager method's latency per label, and open a span around it.
+
+    Async generators are timed from the first to the last record they yield; their queries
+    are not attributed to the method, since the generator may be resumed from other tasks.
+    """
+    method = function.__name__
+    position, name = _label_position(function)
+
+    def label_of(args, kwargs) -> str:
+        label = args[position] if len(args) > position else kwargs.get(name)
+        return label or "all"
+
+    if inspect.isasyncgenfunction(function):
+        @functools.wraps(function)
+        async def generator_wrapper(*args, **kwargs):
+            label = label_of(args, kwargs)
+            started = time.perf_counter()
+            try:
+                async for item in function(*args, **kwargs):
+                    yield item
+            finally:
+                method_latency_histogram.labels(method=method, label=label).observe(time.perf_counter() - started)
+        return generator_wrapper
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        label = label_of(args, kwargs)
+        token = _current_method.set(method)
+        started = time.perf_counter()
+        try:
+            with span(f"NodeManager.{method}", label=label):
+                return await function(*args, **kwargs)
+        finally:
+            method_latency_histogram.labels(method=method, label=label).observe(time.perf_counter() - started)
+            _current_method.reset(token)
+    return wrapper
+
+
+@contextmanager
+def timed_validation(label: Optional[str]):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        validation_histogram.labels(label=label or "all").observe(time.perf_counter() - started)
+
+
+def _observe_query(query: Any, parameters: Optional[dict], kwargs: dict, elapsed: float) -> None:
+    query_latency_histogram.labels(source=_current_method.get()).observe(elapsed)
+    if settings.slow_query_threshold and elapsed >= settings.slow_query_threshold:
+        text = " ".join(str(getattr(query, "text", query)).split())
+        params = repr({**(parameters or {}), **kwargs})
+        logger.warning(
+            "Slow query (%.3fs) from %s: %s | parameters: %s",
+            elapsed, _current_method.get(), text[:2000], params[:1000] + ("..." if len(params) > 1000 else "")
+        )
+
+
+class _TimedRunner:
+    """
+    Proxy for a session or transaction that times every `run` call.
+    """
+
+    def __init__(self, inner):
+        self._inner = inner
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    async def run(self, query, parameters: Optional[dict] = None, **kwargs):
+        started = time.perf_counter()
+        with span("neo4j.run", **{"db.statement": " ".join(str(getattr(query, "text", query)).split())[:500]}):
+            result = await self._inner.run(query, parameters, **kwargs)
+        _observe_query(query, parameters, kwargs, time.perf_counter() - started)
+        return result
+
+
+class InstrumentedSession(_TimedRunner):
+    """
+    AsyncSession wrapper whose queries, including those in managed transactions, are timed.
+
+    The measured time is until Neo4j returns the result header, which covers planning and,
+    for eager queries, execution; records streamed afterwards are not included.
+
+    Open sessions are counted, and a managed transaction's wait until its function is first
+    called (acquiring a pooled connection and beginning the transaction) is recorded as the
+    pool acquisition time.
+    """
+
+    async def __aenter__(self):
+        await self._inner.__aenter__()
+        session_gauge.inc()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        try:
+            return await self._inner.__aexit__(*exc_info)
+        finally:
+            session_gauge.dec()
+
+    async def execute_read(self, transaction_function, *args, **kwargs):
+        return await self._inner.execute_read(self._wrap(transaction_function), *args, **kwargs)
+
+    async def execute_write(self, transaction_function, *args, **kwargs):
+        return await self._inner.execute_write(self._wrap(transaction_function), *args, **kwargs)
+
+    @staticmethod
+    def _wrap(transaction_function):
+        started = time.perf_counter()
+        attempts = 0
+
+        async def wrapped(tx, *args, **kwargs):
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                # Retries after a transient error would add their back-off to the measurement
+                acquisition_histogram.observe(time.perf_counter() - started)
+            return await transaction_function(_TimedRunner(tx), *args, **kwargs)
+        return wrapped
+
+
+class InstrumentedJSONResponse(ORJSONResponse):
+    """
+    orjson response that records how long encoding the body takes.
+    """
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            serialization_histogram.observe(time.perf_counter() - started)
+
+
+def encoded_json_response(encode: Callable[[], bytes], headers: Optional[Mapping[str, str]] = None,
+                          status_code: int = 200) -> Response:
+    """
+    Respond with a body encoded by the caller, timed like InstrumentedJSONResponse.
+
+    Returning a Response makes FastAPI skip validating and encoding the result against the
+    route's response_model, which stays declared for the OpenAPI schema.
+    """
+    started = time.perf_counter()
+    try:
+        body = encode()
+    finally:
+        serialization_histogram.observe(time.perf_counter() - started)
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,15 @@
+import logging
+import os
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+logging.basicConfig(
+    level=LOG_LEVEL,
+    format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+)
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Return a module logger configured with the project-wide format and level.
+    """
+    return logging.getLogger(name)
@@ -0,0 +1,58 @@
+import json
+from typing import AsyncIterator, Optional, Sequence, Type, Union
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from ..models.trusted import trusted
+from .instrumentation import encoded_json_response
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def wants_ndjson(request: Request) -> bool:
+    """
+    Check whether the client asked for newline-delimited JSON.
+    """
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def ndjson_response(records: AsyncIterator[dict], model: Optional[Type[BaseModel]] = None) -> StreamingResponse:
+    """
+    Stream records as one JSON document per line while they are read from the database.
+
+    Records are serialized through `model` when given (as trusted store rows, see
+    models.trusted), otherwise dumped as they are.
+    """
+    async def lines():
+        if model is None:
+            async for record in records:
+                yield json.dumps(record, default=str) + "\n"
+        else:
+            serializer = trusted(model)
+            async for record in records:
+                yield serializer.dump_json(serializer.construct(record)) + b"\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+def set_next_cursor(response: Response, page: Sequence[BaseModel], limit: int) -> Optional[str]:
+    """
+    Expose the keyset cursor for the next page in the X-Next-Cursor header.
+
+    A page shorter than `limit` is the last one, so no cursor is set.
+    """
+    if len(page) < limit:
+        return None
+    cursor = page[-1].id
+    response.headers["X-Next-Cursor"] = cursor
+    return cursor
+
+def model_response(model: Type[BaseModel], content: Union[BaseModel, list[BaseModel]],
+                   response: Optional[Response] = None) -> Response:
+    """
+    Encode models read from the store straight to JSON bytes, skipping FastAPI's re-validation
+    against the response_model. Headers set on the injected `response` are kept.
+    """
+    return encoded_json_response(
+        lambda: trusted(model).dump_json(content),
+        headers=dict(response.headers) if response is not None else None
+    )